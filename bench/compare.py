@@ -0,0 +1,42 @@
+# bench/compare.py
+
+# -------------------------------------------------------
+# Compare deux résultats de bench/run_bench.py
+# Usage : python bench/compare.py bench/results/base.json bench/results/new.json
+# -------------------------------------------------------
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate")
+
+
+def _delta(old: float, new: float) -> str:
+    if not old:
+        return "   n/a"
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare deux fichiers de benchmark.")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    args = parser.parse_args()
+
+    base = json.loads(args.base.read_text(encoding="utf-8"))
+    new = json.loads(args.new.read_text(encoding="utf-8"))
+    print(f"base : {base['meta']['commit']}  →  new : {new['meta']['commit']}")
+
+    for name, sc in new["scenarios"].items():
+        old_sc = base["scenarios"].get(name, {}).get("endpoints", {})
+        for label, st in sc["endpoints"].items():
+            old = old_sc.get(label)
+            if old is None:
+                print(f"{name:<15} {label:<30} (nouveau)")
+                continue
+            cols = "  ".join(f"{m}={st[m]} ({_delta(old[m], st[m])})" for m in METRICS)
+            print(f"{name:<15} {label:<30} {cols}")
+
+
+if __name__ == "__main__":
+    main()
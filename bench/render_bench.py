@@ -0,0 +1,88 @@
+# bench/render_bench.py
+
+# -------------------------------------------------------
+# Micro-benchmark du rendu des e-mails (service sports)
+# - reparse     : Environment sans cache, les modèles sont relus
+#                 et compilés pour chaque message
+# - precompiled : email_templates.render (modèles compilés une fois)
+# Chaque message = texte + HTML, langues fr/es/en en alternance.
+#
+# Usage : python bench/render_bench.py -n 2000 [--json]
+# -------------------------------------------------------
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from jinja2 import Environment
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "services" / "sports_service_fastapi"))
+
+from app import email_templates
+from app.email_templates import LANGS, SUBJECTS, render
+
+
+def _context(i: int) -> dict:
+    return {
+        "client_name": f"Client <{i}>",
+        "checklist": ["Échauffement 10 min", "3 x 12 squats", "Étirements", f"Marche {i % 40} min"],
+        "evolution": "Poids : -0,3 kg\nTour de taille : -0,5 cm",
+    }
+
+
+def bench_reparse(n: int) -> float:
+    # mêmes réglages que email_templates.env, sans cache de modèles
+    env = Environment(
+        loader=email_templates.env.loader,
+        autoescape=email_templates.env.autoescape,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        cache_size=0,
+    )
+    t0 = time.perf_counter()
+    for i in range(n):
+        lang = LANGS[i % len(LANGS)]
+        ctx = dict(_context(i), lang=lang, subject=SUBJECTS["daily_summary"][lang])
+        env.get_template(f"daily_summary.{lang}.txt").render(ctx)
+        env.get_template(f"daily_summary.{lang}.html").render(ctx)
+    return time.perf_counter() - t0
+
+
+def bench_precompiled(n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        render("daily_summary", LANGS[i % len(LANGS)], **_context(i))
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du rendu des e-mails (texte + HTML).")
+    parser.add_argument("-n", type=int, default=2000, help="nombre de messages")
+    parser.add_argument("--json", action="store_true", help="résultat au format JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in (("reparse", bench_reparse), ("precompiled", bench_precompiled)):
+        fn(min(args.n, 50))  # échauffement
+        duration = fn(args.n)
+        results[name] = {
+            "messages": args.n,
+            "duration_s": round(duration, 4),
+            "us_per_message": round(duration / args.n * 1e6, 1),
+            "messages_per_s": round(args.n / duration),
+        }
+    results["speedup"] = round(results["reparse"]["duration_s"] / results["precompiled"]["duration_s"], 1)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    for name in ("reparse", "precompiled"):
+        r = results[name]
+        print(f"{name:12s} {r['us_per_message']:9.1f} µs/message  {r['messages_per_s']:8d} messages/s")
+    print(f"précompilé : x{results['speedup']}")
+
+
+if __name__ == "__main__":
+    main()
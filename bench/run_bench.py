@@ -0,0 +1,446 @@
+# bench/run_bench.py
+
+# -------------------------------------------------------
+# Benchmark de charge / latence des 4 microservices
+#
+# 1) démarre les stand-ins locaux (LLM HF/OpenAI, SMTP) et les
+#    services auth, sports, reco (Firestore en mémoire) et chatbot
+#    sur des bases SQLite temporaires
+# 2) joue des scénarios (login storm, polling /auth/me, /chat/ask,
+#    /reco/generate, écritures de mesures, mix réaliste) avec une
+#    concurrence configurable
+# 3) écrit p50/p95/p99, débit et erreurs par endpoint dans un JSON
+#    comparable entre commits (voir bench/compare.py)
+#
+# Usage (depuis la racine du dépôt) :
+#   python bench/run_bench.py --concurrency 16 --duration 15
+#   python bench/run_bench.py --scenarios me_polling,chat_ask -o bench/results/base.json
+#   # reco → chatbot : HTTP (client persistant) vs dans le même processus
+#   python bench/run_bench.py --scenarios reco_llm --chatbot-mode http -o bench/results/http.json
+#   python bench/run_bench.py --scenarios reco_llm --chatbot-mode inprocess -o bench/results/inproc.json
+#   python bench/compare.py bench/results/http.json bench/results/inproc.json
+# -------------------------------------------------------
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVICES_DIR = ROOT / "services"
+
+# -------------------------------------------------------
+# Scénarios : poids relatifs de chaque opération
+# -------------------------------------------------------
+SCENARIOS = {
+    "login_storm": {"login": 1},
+    "me_polling": {"me": 1},
+    "chat_ask": {"chat_ask": 1},
+    "reco_generate": {"reco_generate": 1},
+    # force=true : contourne le cache de recommandations → toujours un appel au chatbot
+    "reco_llm": {"reco_generate_force": 1},
+    "measurements": {"measurement_write": 3, "measurement_read": 1},
+    "sports_search": {"sports_search": 1},
+    # moteur de plans local (sans LLM)
+    "plans": {"plan_generate": 1},
+    # clients qui gardent l'ETag (If-None-Match → 304)
+    "revalidate": {"sports_revalidate": 3, "sports_search_revalidate": 3, "me_revalidate": 4},
+    "mixed": {
+        "me": 30,
+        "sports": 10,
+        "login": 3,
+        "chat_ask": 10,
+        "reco_generate": 5,
+        "measurement_write": 20,
+        "measurement_read": 10,
+        "daily_summary": 2,
+    },
+}
+
+
+# =======================================================
+#           Démarrage des processus (stand-ins + services)
+# =======================================================
+class Stack:
+    def __init__(self, base_port: int, llm_latency_ms: float, workdir: Path, chatbot_mode: str = "http"):
+        self.workdir = workdir
+        self.chatbot_mode = chatbot_mode
+        self.procs: list[subprocess.Popen] = []
+        self.ports = {
+            "llm": base_port,
+            "smtp": base_port + 1,
+            "auth": base_port + 2,
+            "sports": base_port + 3,
+            "reco": base_port + 4,
+            "chatbot": base_port + 5,
+        }
+        self.llm_latency_ms = llm_latency_ms
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.ports[name]}"
+
+    def _spawn(self, name: str, args: list[str], cwd: Path, env: dict):
+        log = open(self.workdir / f"{name}.log", "w")
+        full_env = {**os.environ, **env, "PYTHONUNBUFFERED": "1"}
+        proc = subprocess.Popen(args, cwd=cwd, env=full_env, stdout=log, stderr=subprocess.STDOUT)
+        self.procs.append(proc)
+
+    def _uvicorn(self, name: str, service_dir: str, env: dict):
+        args = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(self.ports[name]),
+            "--log-level", "warning", "--no-access-log",
+        ]
+        self._spawn(name, args, SERVICES_DIR / service_dir, env)
+
+    def start(self):
+        stubs = str(ROOT / "bench" / "stubs.py")
+        self._spawn("llm", [sys.executable, stubs, "llm", "--port", str(self.ports["llm"]),
+                            "--latency-ms", str(self.llm_latency_ms)], ROOT, {})
+        self._spawn("smtp", [sys.executable, stubs, "smtp", "--port", str(self.ports["smtp"])], ROOT, {})
+
+        w = self.workdir
+        self._uvicorn("auth", "auth_service_fastapi", {
+            "AUTH_DATABASE_URL": f"sqlite:///{w / 'auth.db'}",
+            "JWT_SECRET": "bench-secret",
+        })
+        self._uvicorn("sports", "sports_service_fastapi", {
+            "SMTP_HOST": "127.0.0.1",
+            "SMTP_PORT": str(self.ports["smtp"]),
+            "SMTP_USER": "bench@example.com",
+            "SMTP_PASSWORD": "bench",
+            "SMTP_STARTTLS": "false",
+            "SPORTS_DB_PATH": str(w / "sports.db"),
+        })
+        chatbot_env = {
+            "DB_URL": f"sqlite:///{w / 'coach.db'}",
+            "HF_API_TOKEN": "bench-token",
+            "HF_CHAT_URL": f"{self.url('llm')}/v1/chat/completions",
+            "OPENAI_API_KEY": "bench-key",
+            "OPENAI_API_BASE": self.url("llm"),
+        }
+        self._uvicorn("chatbot", "chatbot_service_fastapi", chatbot_env)
+        reco_env = {
+            "FIRESTORE_BACKEND": "memory",
+            "TRACKING_DB_PATH": str(w / "tracking.db"),
+            "CHATBOT_URL": f"{self.url('chatbot')}/chat/ask",
+            "CHATBOT_MODE": self.chatbot_mode,
+            "SPORTS_URL": self.url("sports"),
+        }
+        if self.chatbot_mode == "inprocess":
+            # le chatbot chargé dans reco a besoin de sa propre config
+            reco_env.update(chatbot_env, DB_URL=f"sqlite:///{w / 'coach-inprocess.db'}")
+        self._uvicorn("reco", "reco_service_fastapi", reco_env)
+
+    async def wait_ready(self, timeout: float = 60.0):
+        checks = {
+            "llm": "/health",
+            "auth": "/auth/health",
+            "sports": "/sports",
+            "reco": "/reco/health",
+            "chatbot": "/chat/health",
+        }
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(timeout=2) as client:
+            for name, path in checks.items():
+                while True:
+                    try:
+                        if (await client.get(self.url(name) + path)).status_code == 200:
+                            break
+                    except httpx.HTTPError:
+                        pass
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f"service {name} non prêt (voir {self.workdir / (name + '.log')})")
+                    await asyncio.sleep(0.2)
+
+    def stop(self):
+        for p in self.procs:
+            p.terminate()
+        for p in self.procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+# =======================================================
+#                 Opérations élémentaires
+# Chaque opération retourne (libellé endpoint, réponse)
+# =======================================================
+class Ops:
+    def __init__(self, stack: Stack, users: list[dict]):
+        self.s = stack
+        self.users = users
+        # ETag reçus, comme le cache d'un navigateur
+        self.etags: dict[tuple, str] = {}
+
+    def _user(self) -> dict:
+        return random.choice(self.users)
+
+    async def login(self, c: httpx.AsyncClient):
+        u = self._user()
+        r = await c.post(f"{self.s.url('auth')}/auth/login", json={"email": u["email"], "password": u["password"]})
+        return "POST /auth/login", r
+
+    async def me(self, c):
+        u = self._user()
+        r = await c.get(f"{self.s.url('auth')}/auth/me", headers={"Authorization": f"Bearer {u['token']}"})
+        return "GET /auth/me", r
+
+    async def sports(self, c):
+        r = await c.get(f"{self.s.url('sports')}/sports")
+        return "GET /sports", r
+
+    async def sports_search(self, c):
+        q = random.choice(["natacion", "foot", "equipe", "yo", "run", "ball", "fuerza", "tennis"])
+        r = await c.get(f"{self.s.url('sports')}/sports/search", params={"q": q})
+        return "GET /sports/search", r
+
+    async def _revalidate(self, c, label: str, url: str, params=None, headers=None):
+        key = (url, tuple(sorted((params or {}).items())), (headers or {}).get("Authorization"))
+        headers = dict(headers or {})
+        if key in self.etags:
+            headers["If-None-Match"] = self.etags[key]
+        r = await c.get(url, params=params, headers=headers)
+        if "etag" in r.headers:
+            self.etags[key] = r.headers["etag"]
+        return f"{label} ({r.status_code})", r
+
+    async def sports_revalidate(self, c):
+        return await self._revalidate(c, "GET /sports", f"{self.s.url('sports')}/sports")
+
+    async def sports_search_revalidate(self, c):
+        q = random.choice(["natacion", "foot", "equipe", "yo", "run", "ball", "fuerza", "tennis"])
+        return await self._revalidate(c, "GET /sports/search", f"{self.s.url('sports')}/sports/search", params={"q": q})
+
+    async def me_revalidate(self, c):
+        u = self._user()
+        return await self._revalidate(
+            c, "GET /auth/me", f"{self.s.url('auth')}/auth/me", headers={"Authorization": f"Bearer {u['token']}"},
+        )
+
+    async def plan_generate(self, c):
+        body = {
+            "goal": random.choice(["Perte de poids", "ganar masa muscular", "marathon", "yoga", "Rester en forme"]),
+            "level": random.choice(["beginner", "intermediate", "advanced"]),
+            "days_per_week": random.randint(2, 6),
+            "equipment": random.choice([[], ["dumbbells"], ["pool", "bike"]]),
+            "lang": random.choice(["fr", "es", "en"]),
+        }
+        r = await c.post(f"{self.s.url('sports')}/plans/generate", json=body)
+        return "POST /plans/generate", r
+
+    async def chat_ask(self, c):
+        msg = random.choice([
+            "Rutina de gym para principiante, 3 días por semana",
+            "Quel entraînement cardio pour améliorer mon endurance ?",
+            "How much protein should I eat after a workout?",
+        ])
+        r = await c.post(f"{self.s.url('chatbot')}/chat/ask", json={"message": msg, "lang": "es"})
+        return "POST /chat/ask", r
+
+    async def reco_generate(self, c):
+        u = self._user()
+        r = await c.post(f"{self.s.url('reco')}/reco/generate", json={"user_id": u["uid"], "lang": "fr"})
+        return "POST /reco/generate", r
+
+    async def reco_generate_force(self, c):
+        u = self._user()
+        r = await c.post(f"{self.s.url('reco')}/reco/generate", json={"user_id": u["uid"], "lang": "fr", "force": True})
+        return "POST /reco/generate (force)", r
+
+    async def measurement_write(self, c):
+        u = self._user()
+        day = datetime(2025, 1, 1).toordinal() + random.randint(0, 365)
+        body = {
+            "date": datetime.fromordinal(day).strftime("%Y-%m-%d"),
+            "weight_kg": round(random.uniform(55, 95), 1),
+            "waist_cm": round(random.uniform(65, 105), 1),
+        }
+        r = await c.post(f"{self.s.url('reco')}/tracking/measurements", params={"email": u["email"]}, json=body)
+        return "POST /tracking/measurements", r
+
+    async def measurement_read(self, c):
+        u = self._user()
+        r = await c.get(f"{self.s.url('reco')}/tracking/measurements", params={"email": u["email"]})
+        return "GET /tracking/measurements", r
+
+    async def daily_summary(self, c):
+        u = self._user()
+        body = {
+            "email": u["email"],
+            "client_name": u["email"].split("@")[0],
+            "checklist": ["Échauffement 10 min", "Cardio 30 min", "Étirements"],
+            "evolution": "-0,4 kg cette semaine",
+        }
+        r = await c.post(f"{self.s.url('sports')}/send-daily-summary", json=body)
+        return "POST /send-daily-summary", r
+
+
+async def register_users(stack: Stack, n: int) -> list[dict]:
+    users = []
+    async with httpx.AsyncClient(timeout=30) as c:
+        for i in range(n):
+            email = f"bench{i}@example.com"
+            password = f"bench-pass-{i}"
+            await c.post(f"{stack.url('auth')}/auth/register", json={"email": email, "password": password, "name": f"Bench {i}"})
+            r = await c.post(f"{stack.url('auth')}/auth/login", json={"email": email, "password": password})
+            r.raise_for_status()
+            users.append({"email": email, "password": password, "token": r.json()["access_token"], "uid": f"bench-uid-{i}"})
+    return users
+
+
+# =======================================================
+#                 Exécution d'un scénario
+# =======================================================
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples: list[tuple[str, float, bool]], elapsed: float) -> dict:
+    by_endpoint: dict[str, list[tuple[float, bool]]] = {}
+    for label, ms, ok in samples:
+        by_endpoint.setdefault(label, []).append((ms, ok))
+
+    out = {}
+    for label, values in sorted(by_endpoint.items()):
+        lat = sorted(ms for ms, _ in values)
+        errors = sum(1 for _, ok in values if not ok)
+        out[label] = {
+            "count": len(values),
+            "errors": errors,
+            "error_rate": round(errors / len(values), 4),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(lat) / len(lat), 2),
+            "p50_ms": round(percentile(lat, 50), 2),
+            "p95_ms": round(percentile(lat, 95), 2),
+            "p99_ms": round(percentile(lat, 99), 2),
+            "max_ms": round(lat[-1], 2),
+        }
+    return out
+
+
+async def run_scenario(ops: Ops, weights: dict, concurrency: int, duration: float) -> dict:
+    names = list(weights)
+    cum = list(weights.values())
+    samples: list[tuple[str, float, bool]] = []
+    deadline = time.monotonic() + duration
+
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+
+        async def worker():
+            while time.monotonic() < deadline:
+                op = getattr(ops, random.choices(names, weights=cum)[0])
+                t0 = time.perf_counter()
+                try:
+                    label, resp = await op(client)
+                    ok = resp.status_code < 400
+                except httpx.HTTPError:
+                    label, ok = f"{op.__name__} (transport)", False
+                samples.append((label, (time.perf_counter() - t0) * 1000, ok))
+
+        t_start = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - t_start
+
+    return {
+        "duration_s": round(elapsed, 2),
+        "total_requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "endpoints": summarize(samples, elapsed),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_table(results: dict):
+    print(f"{'scénario':<15} {'endpoint':<30} {'n':>6} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, sc in results["scenarios"].items():
+        for label, st in sc["endpoints"].items():
+            print(
+                f"{name:<15} {label:<30} {st['count']:>6} {st['errors']:>5} {st['throughput_rps']:>8} "
+                f"{st['p50_ms']:>8} {st['p95_ms']:>8} {st['p99_ms']:>8}"
+            )
+
+
+async def main_async(args):
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"scénarios inconnus : {unknown} (disponibles : {', '.join(SCENARIOS)})")
+
+    random.seed(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="sportconnect-bench-"))
+    stack = Stack(args.base_port, args.llm_latency_ms, workdir, args.chatbot_mode)
+    print(f"[BENCH] démarrage des services (logs : {workdir})")
+    stack.start()
+    try:
+        await stack.wait_ready()
+        users = await register_users(stack, args.users)
+        ops = Ops(stack, users)
+
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "concurrency": args.concurrency,
+                "duration_s": args.duration,
+                "users": args.users,
+                "llm_latency_ms": args.llm_latency_ms,
+                "chatbot_mode": args.chatbot_mode,
+                "seed": args.seed,
+            },
+            "scenarios": {},
+        }
+        for name in scenarios:
+            print(f"[BENCH] scénario {name} ({args.concurrency} clients, {args.duration}s)…")
+            results["scenarios"][name] = await run_scenario(ops, SCENARIOS[name], args.concurrency, args.duration)
+    finally:
+        stack.stop()
+
+    out = Path(args.output or ROOT / "bench" / "results" / f"bench-{results['meta']['commit']}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    print_table(results)
+    print(f"[BENCH] résultats → {out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de charge des microservices SportConnectIA.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="liste séparée par des virgules")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="durée de chaque scénario (s)")
+    parser.add_argument("--users", type=int, default=20, help="nombre d'utilisateurs créés")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--base-port", type=int, default=9100)
+    parser.add_argument("--chatbot-mode", choices=["http", "inprocess"], default="http",
+                        help="appel reco → chatbot (CHATBOT_MODE du service reco)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="fichier JSON de sortie (défaut : bench/results/bench-<commit>.json)")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
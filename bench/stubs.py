@@ -0,0 +1,146 @@
+# bench/stubs.py
+
+# -------------------------------------------------------
+# Stand-ins locaux pour les dépendances externes du benchmark
+# - llm  : API "chat/completions" compatible HuggingFace Router
+#          et OpenAI, avec une latence simulée configurable
+# - smtp : petit serveur SMTP (sans TLS) qui accepte tout
+#          message et le jette
+#
+# Usage :
+#   python bench/stubs.py llm  --port 9100 --latency-ms 200
+#   python bench/stubs.py smtp --port 9125
+# -------------------------------------------------------
+import argparse
+import asyncio
+import json
+
+
+# =======================================================
+#                 Stand-in LLM (HTTP)
+# =======================================================
+def make_llm_app(latency_ms: float):
+    from fastapi import FastAPI, Request
+
+    app = FastAPI(title="LLM stand-in")
+    state = {"calls": 0}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "calls": state["calls"]}
+
+    async def completion(request: Request):
+        body = await request.json()
+        state["calls"] += 1
+        await asyncio.sleep(latency_ms / 1000)
+
+        last = (body.get("messages") or [{}])[-1].get("content", "")
+        if "Return strict JSON only" in json.dumps(body.get("messages", [])):
+            content = json.dumps({"diet_style": ["omnivorous"], "meals_per_day": 4})
+        else:
+            content = (
+                "Plan (stand-in) : 3 séances par semaine, 30 min de cardio modéré, "
+                "renforcement léger, hydratation et 8 h de sommeil. "
+                f"[{len(last)} caractères reçus]"
+            )
+        return {
+            "id": f"stub-{state['calls']}",
+            "object": "chat.completion",
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+        }
+
+    # HF Router : /v1/chat/completions ; OpenAI : {base}/chat/completions
+    app.add_api_route("/v1/chat/completions", completion, methods=["POST"])
+    app.add_api_route("/chat/completions", completion, methods=["POST"])
+    return app
+
+
+# =======================================================
+#                 Stand-in SMTP (asyncio)
+# =======================================================
+class SmtpStandIn(asyncio.Protocol):
+    """
+    Implémente juste assez de SMTP pour smtplib :
+    EHLO/HELO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT.
+    """
+
+    received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.buffer = b""
+        self.in_data = False
+        self.auth_login_step = 0
+        self._reply("220 smtp-stand-in ESMTP ready")
+
+    def _reply(self, line: str):
+        self.transport.write(line.encode() + b"\r\n")
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        while b"\r\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\r\n", 1)
+            self._handle(line.decode("utf-8", "replace"))
+
+    def _handle(self, line: str):
+        if self.in_data:
+            if line == ".":
+                self.in_data = False
+                SmtpStandIn.received += 1
+                self._reply("250 OK queued")
+            return
+
+        if self.auth_login_step:
+            self.auth_login_step -= 1
+            self._reply("334 UGFzc3dvcmQ6" if self.auth_login_step else "235 Authentication successful")
+            return
+
+        cmd = line.split(" ", 1)[0].upper()
+        if cmd == "EHLO":
+            self.transport.write(b"250-smtp-stand-in\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+        elif cmd == "HELO":
+            self._reply("250 smtp-stand-in")
+        elif cmd == "AUTH":
+            if line.upper().startswith("AUTH LOGIN"):
+                self.auth_login_step = 2
+                self._reply("334 VXNlcm5hbWU6")
+            else:
+                self._reply("235 Authentication successful")
+        elif cmd in ("MAIL", "RCPT", "RSET", "NOOP"):
+            self._reply("250 OK")
+        elif cmd == "DATA":
+            self.in_data = True
+            self._reply("354 End data with <CR><LF>.<CR><LF>")
+        elif cmd == "QUIT":
+            self._reply("221 Bye")
+            self.transport.close()
+        else:
+            self._reply("502 Command not implemented")
+
+
+async def serve_smtp(host: str, port: int):
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(SmtpStandIn, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-ins locaux (LLM, SMTP) pour le benchmark.")
+    parser.add_argument("kind", choices=["llm", "smtp"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="latence simulée du LLM")
+    args = parser.parse_args()
+
+    if args.kind == "llm":
+        import uvicorn
+
+        uvicorn.run(make_llm_app(args.latency_ms), host=args.host, port=args.port, log_level="warning")
+    else:
+        asyncio.run(serve_smtp(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ from sqlalchemy.orm import sessionmaker, declarative_base
 from pathlib import Path
 import os
 
+from .metrics import instrument_sqlalchemy
+
 # -------------------------------------------------------
 # Dossier courant (app) et chemin du fichier SQLite
 # Exemple : services/auth_service_fastapi/app/auth.db
@@ -16,7 +18,8 @@ BASE_DIR = Path(__file__).resolve().parent
 DB_FILE = BASE_DIR / "auth.db"
 
 # URL de connexion SQLite (fichier local)
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_FILE}"
+# AUTH_DATABASE_URL permet de pointer ailleurs (tests, benchmark)
+SQLALCHEMY_DATABASE_URL = os.getenv("AUTH_DATABASE_URL") or f"sqlite:///{DB_FILE}"
 
 # -------------------------------------------------------
 # Création du moteur SQLAlchemy
@@ -24,8 +27,13 @@ SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_FILE}"
 # -------------------------------------------------------
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
+    connect_args=(
+        {"check_same_thread": False}
+        if SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+        else {}
+    ),
 )
+instrument_sqlalchemy(engine, "auth")
 
 # -------------------------------------------------------
 # SessionLocal : fabrique de sessions pour interagir avec la BD
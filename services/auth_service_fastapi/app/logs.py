@@ -0,0 +1,236 @@
+# app/logs.py
+
+# -------------------------------------------------------
+# Logs structurés (JSON, une ligne par événement), non bloquants
+# Module identique dans les 4 services (auth, sports, reco, chatbot) :
+# - le thread de la requête ne fait qu'un queue.put() ; l'écriture
+#   sur stdout est faite par un QueueListener dans un autre thread
+# - request_id (header X-Request-ID ou généré) et trace_id ajoutés
+#   à chaque ligne
+# - échantillonnage du log d'accès pour les routes très sollicitées
+#   (LOG_SAMPLE_ROUTES="/auth/me:0.05,/tracking/measurements:0.2")
+# - troncature des champs volumineux (LOG_MAX_FIELD_LEN)
+#
+# Usage :
+#   logger = logging.getLogger(__name__)
+#   logger.info("chatbot answered", extra={"answer_len": len(answer)})
+# Copies vérifiées par services/check_shared_modules.py (--sync pour les réaligner).
+# -------------------------------------------------------
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+try:
+    from .tracing import current_span
+except ImportError:  # service sans traçage (auth, sports)
+    current_span = None
+
+# -------------------------------------------------------
+# Configuration
+# -------------------------------------------------------
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
+LOG_MAX_FIELD_LEN = int(os.getenv("LOG_MAX_FIELD_LEN", "500"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+
+def _parse_sample_routes(raw: str) -> Dict[str, float]:
+    rates = {}
+    for part in (raw or "").split(","):
+        if ":" not in part:
+            continue
+        path, rate = part.rsplit(":", 1)
+        try:
+            rates[path.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+LOG_SAMPLE_ROUTES = _parse_sample_routes(os.getenv("LOG_SAMPLE_ROUTES", ""))
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+_STD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+_service = "unknown"
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def truncate(value, limit: int = LOG_MAX_FIELD_LEN):
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}…(+{len(value) - limit})"
+    return value
+
+
+# =======================================================
+#                 Formatage JSON
+# =======================================================
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "service": _service,
+            "logger": record.name,
+            "msg": truncate(record.getMessage()),
+        }
+        rid = getattr(record, "request_id", None)
+        if rid:
+            entry["request_id"] = rid
+        tid = getattr(record, "trace_id", None)
+        if tid:
+            entry["trace_id"] = tid
+        for key, value in record.__dict__.items():
+            if key not in _STD_ATTRS and key not in ("request_id", "trace_id") and not key.startswith("_"):
+                entry[key] = truncate(value)
+        if record.exc_text:
+            entry["exc"] = truncate(record.exc_text, 4000)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Capture request_id / trace_id dans le thread appelant (avant la
+    file d'attente : le QueueListener n'a pas le contexte de la requête).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        if current_span is not None:
+            span = current_span()
+            record.trace_id = span.trace_id if span else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Ignore une partie des logs marqués extra={"sample_rate": 0.1}."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        return rate is None or random.random() < rate
+
+
+def configure_logging(service: str) -> None:
+    """
+    Installe le handler non bloquant sur le logger racine
+    (QueueHandler → QueueListener → stdout en JSON).
+    """
+    global _service, _listener
+    if _listener is not None:
+        return
+    root = logging.getLogger()
+    # un autre service chargé dans le même processus (reco + chatbot en
+    # CHATBOT_MODE=inprocess) a déjà installé son handler : on le garde
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        return
+    _service = service
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+
+    q: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = _DroppingQueueHandler(q)
+    handler.addFilter(SamplingFilter())
+    handler.addFilter(ContextFilter())
+
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+    # httpx / httpcore journalisent chaque appel sortant en INFO
+    for noisy in ("httpx", "httpcore"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """File pleine → on perd la ligne plutôt que de bloquer la requête."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def prepare(self, record):
+        # on fige le message et la trace d'exception dans le thread appelant,
+        # sans les fusionner (contrairement à QueueHandler.prepare)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# =======================================================
+#                 Middleware : request_id + log d'accès
+# =======================================================
+access_logger = logging.getLogger("access")
+
+
+class RequestLogMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _sample_rate(self, path: str) -> float:
+        for prefix, rate in LOG_SAMPLE_ROUTES.items():
+            if path.startswith(prefix):
+                return rate
+        return 1.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        rid = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        token = _request_id.set(rid)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", rid.encode())]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = round((time.perf_counter() - t0) * 1000, 2)
+            rate = self._sample_rate(scope["path"])
+            # erreurs et requêtes lentes : toujours journalisées
+            if status["code"] >= 500 or duration_ms > 1000:
+                rate = 1.0
+            extra = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status["code"],
+                "duration_ms": duration_ms,
+            }
+            if rate < 1.0:
+                extra["sample_rate"] = rate
+            access_logger.info("request", extra=extra)
+            _request_id.reset(token)
+
+
+def setup_logging(app, service: str) -> None:
+    """Logs JSON non bloquants + middleware request_id / accès."""
+    configure_logging(service)
+    app.add_middleware(RequestLogMiddleware)
@@ -3,7 +3,7 @@
 # -------------------------------------------------------
 # Importations nécessaires pour FastAPI et gestion d’erreurs
 # -------------------------------------------------------
-from fastapi import FastAPI, HTTPException, Depends, Header, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 
 # -------------------------------------------------------
@@ -47,6 +47,9 @@ from .security import (
 # =======================================================
 from .db import Base, engine, get_db
 from .models import User, Notification
+from .metrics import setup_metrics
+from .logs import setup_logging
+from .http_cache import dumps, json_response, make_etag
 
 # =======================================================
 # Importation des schémas Pydantic (DTO)
@@ -72,6 +75,13 @@ AUTH_PORT = int(os.getenv("AUTH_PORT") or os.getenv("PORT", "8001"))
 # -------------------------------------------------------
 app = FastAPI(title="Auth Service SportConnectIA")
 
+# -------------------------------------------------------
+# Métriques Prometheus (middleware + GET /metrics)
+# et logs JSON non bloquants (request_id, log d'accès)
+# -------------------------------------------------------
+setup_metrics(app)
+setup_logging(app, "auth")
+
 # -------------------------------------------------------
 # Création des tables dans la base de données (si non existantes)
 # -------------------------------------------------------
@@ -92,6 +102,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 
@@ -199,16 +210,23 @@ def login(body: LoginDto, db=Depends(get_db)):
 
 # -------------------------------------------------------
 # Endpoint : profil de l'utilisateur courant (token requis)
+# ETag calculé sur la réponse : le frontend revalide (If-None-Match)
+# et reçoit un 304 sans corps tant que le profil n'a pas changé.
+# Réponse propre à l'utilisateur : cache privé, revalidation à chaque fois.
 # -------------------------------------------------------
 @app.get("/auth/me", response_model=UserOut)
-def get_me(current_user: User = Depends(get_current_user_dep)):
-    return UserOut(
+def get_me(request: Request, current_user: User = Depends(get_current_user_dep)):
+    body = dumps(UserOut(
         id=current_user.id,
         name=current_user.name,
         email=current_user.email,
         is_active=current_user.is_active,
         is_admin=current_user.is_admin,
         created_at=current_user.created_at,
+    ))
+    return json_response(
+        request, body, make_etag(body), "private, no-cache", "auth_me",
+        headers={"Vary": "Authorization"},
     )
 
 
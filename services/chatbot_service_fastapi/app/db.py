@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 
+from .metrics import instrument_sqlalchemy
+from .tracing import trace_sqlalchemy
+
 # -------------------------------------------------------
 # URL de la base de données (par défaut SQLite "coach.db")
 # -------------------------------------------------------
@@ -15,8 +18,35 @@ engine = create_engine(
     DB_URL,
     connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
 )
+instrument_sqlalchemy(engine, "coach")
+trace_sqlalchemy(engine, "coach")
 
 # -------------------------------------------------------
 # Session utilisée pour interagir avec la base de données
 # -------------------------------------------------------
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+# -------------------------------------------------------
+# Initialise la base : tables, colonnes et index manquants
+# (create_all ne modifie pas une table déjà existante, d'où
+#  les ALTER TABLE / CREATE INDEX pour les anciens coach.db)
+# -------------------------------------------------------
+def init_db():
+    from .models import Base
+
+    Base.metadata.create_all(bind=engine)
+
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{col.name}" {col_type}'))
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -4,6 +4,8 @@
 # Imports : système, FastAPI, CORS, modèles, HTTP, dotenv
 # -------------------------------------------------------
 import os
+import asyncio
+import logging
 from typing import Optional
 from pathlib import Path
 
@@ -19,10 +21,43 @@ from dotenv import load_dotenv
 ROOT_ENV = Path(__file__).resolve().parents[3] / ".env"
 load_dotenv(ROOT_ENV)
 
+# Imports locaux après le .env (nutrition lit OPENAI_* à l'import)
+from .db import init_db, SessionLocal
+from .metrics import setup_metrics
+from .tracing import setup_tracing, outbound
+from .logs import setup_logging
+from .profiles import migrate_legacy_profiles
+from .nutrition import router as nutrition_router
+from .retention import INTERVAL_HOURS, retention_loop
+
 # -------------------------------------------------------
 # Création du service FastAPI pour le chatbot
 # -------------------------------------------------------
 app = FastAPI(title="ChatbotService")
+# Routes /nutrition/* (ask, plan, log : appels OpenAI facturés ; history :
+# questions / réponses de n'importe quel utilisateur par son id) sans
+# authentification : désactivées par défaut, à n'activer que derrière
+# une passerelle qui authentifie les appels
+NUTRITION_ROUTES = os.getenv("NUTRITION_ROUTES", "false").lower() == "true"
+if NUTRITION_ROUTES:
+    app.include_router(nutrition_router)
+setup_metrics(app)
+setup_logging(app, "chatbot")
+setup_tracing(app, "chatbot")
+logger = logging.getLogger("chatbot")
+
+
+# -------------------------------------------------------
+# Démarrage : tables/index SQLite, migration des profils JSON
+# et job de rétention optionnel
+# -------------------------------------------------------
+@app.on_event("startup")
+async def bootstrap():
+    init_db()
+    with SessionLocal() as db:
+        migrate_legacy_profiles(db)
+    if INTERVAL_HOURS > 0:
+        asyncio.create_task(retention_loop(INTERVAL_HOURS))
 
 # -------------------------------------------------------
 # CORS : autoriser le frontend Vite à accéder au service
@@ -56,13 +91,13 @@ TOP_P = float(os.getenv("TOP_P", "0.9"))
 
 CHAT_PORT = int(os.getenv("CHAT_PORT") or os.getenv("PORT", "8010"))
 
-print(
-    f"HF Router -> model: {HF_MODEL} | token_len: "
-    f"{len(HF_API_TOKEN) if HF_API_TOKEN else 0}"
+logger.info(
+    "HF Router configuré",
+    extra={"model": HF_MODEL, "token_len": len(HF_API_TOKEN) if HF_API_TOKEN else 0},
 )
 
 if not HF_API_TOKEN:
-    print("HF_API_TOKEN no está configurada, solo fallback local.")
+    logger.warning("HF_API_TOKEN no está configurada, solo fallback local.")
 
 
 # -------------------------------------------------------
@@ -244,10 +279,11 @@ async def call_huggingface(question: str, lang: str) -> str:
     }
 
     try:
-        async with httpx.AsyncClient(timeout=40) as client:
-            resp = await client.post(HF_CHAT_URL, headers=headers, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
+        with outbound("hf_router", "llm.hf_router", model=HF_MODEL):
+            async with httpx.AsyncClient(timeout=40) as client:
+                resp = await client.post(HF_CHAT_URL, headers=headers, json=payload)
+                resp.raise_for_status()
+                data = resp.json()
     except Exception:
         return ""
 
@@ -304,6 +340,7 @@ async def ask(req: AskRequest):
 
     # --- Si falla → fallback local ---
     if not answer:
+        logger.info("fallback local", extra={"lang": lang, "question_len": len(msg)})
         answer = fallback_answer(msg, lang)
 
     return {"answer": answer}
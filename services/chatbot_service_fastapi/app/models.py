@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Date
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Date, Index, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -17,14 +17,45 @@ class User(Base):
 
     id = Column(Integer, primary_key=True)
     external_id = Column(String(128), unique=True, index=True)  # email/id du frontend
-    profile = Column(Text, default="{}")                        # profil JSON
-
-    # Relations avec interactions, plans et logs alimentaires
+    profile = Column(Text, nullable=True)                       # ancien profil JSON (migré, voir profiles.py)
+
+    # Profil nutritionnel typé (valeurs scalaires extraites par NutriCoach)
+    budget = Column(String(16), nullable=True, index=True)     # low / medium / high
+    calorie_target = Column(Integer, nullable=True)
+    protein_target_g = Column(Integer, nullable=True)
+    carb_target_g = Column(Integer, nullable=True)
+    fat_target_g = Column(Integer, nullable=True)
+    meals_per_day = Column(Integer, nullable=True)
+
+    # Relations avec tags de profil, interactions, plans et logs alimentaires
+    tags = relationship("UserTag", back_populates="user", cascade="all,delete")
     interactions = relationship("Interaction", back_populates="user", cascade="all,delete")
     meal_plans = relationship("MealPlan", back_populates="user", cascade="all,delete")
     meal_logs = relationship("MealLog", back_populates="user", cascade="all,delete")
 
 
+# =======================================================
+#                 Modèle : UserTag
+# Attributs multi-valeurs du profil (allergies, diet_style,
+# dislikes, cultural) : une ligne par valeur, indexée pour
+# retrouver les utilisateurs "vegan" ou "allergie gluten"
+# =======================================================
+class UserTag(Base):
+    __tablename__ = "coach_user_tags"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("coach_users.id"), nullable=False)
+    kind = Column(String(16), nullable=False)       # allergies / diet_style / dislikes / cultural
+    value = Column(String(64), nullable=False)      # ex: "vegan", "gluten"
+
+    user = relationship("User", back_populates="tags")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "kind", "value", name="uq_coach_user_tags"),
+        Index("ix_coach_user_tags_kind_value", "kind", "value"),
+    )
+
+
 # =======================================================
 #                 Modèle : Interaction
 # Historique des questions/réponses du coach IA
@@ -42,6 +73,13 @@ class Interaction(Base):
 
     user = relationship("User", back_populates="interactions")
 
+    # Index composites : historique par utilisateur (user_id, date)
+    # et purge / archivage par date (job de rétention)
+    __table_args__ = (
+        Index("ix_coach_interactions_user_created", "user_id", "created_at"),
+        Index("ix_coach_interactions_created", "created_at"),
+    )
+
 
 # =======================================================
 #                 Modèle : MealPlan
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from datetime import date
+from sqlalchemy import select, tuple_
+from datetime import date, datetime
 import os, json, httpx, re
 
 from .db import SessionLocal
+from .tracing import outbound
 from .models import User, Interaction, MealPlan, MealLog
+from .profiles import merge_profile, load_profile
 
 # -------------------------------------------------------
 # Router FastAPI pour la partie nutrition
@@ -63,7 +65,7 @@ def _is_nutrition(text:str)->bool:
 def _openai(messages, temperature=0.2, max_tokens=1200):
     headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type":"application/json"}
     payload = {"model": MODEL, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
-    with httpx.Client(timeout=60) as c:
+    with outbound("openai", "llm.openai", model=MODEL), httpx.Client(timeout=60) as c:
         r = c.post(f"{OPENAI_API_BASE}/chat/completions", headers=headers, json=payload)
         r.raise_for_status()
         return r.json()["choices"][0]["message"]["content"]
@@ -105,18 +107,10 @@ def ask(in_: AskIn):
     with SessionLocal() as db:
         u = db.execute(select(User).where(User.external_id==in_.user_id)).scalar_one_or_none()
         if not u:
-            u = User(external_id=in_.user_id, profile="{}"); db.add(u); db.flush()
-
-        # fusion du profil existant avec les nouveaux datos
-        try: base = json.loads(u.profile) if u.profile else {}
-        except: base = {}
-        for k,v in (bits or {}).items():
-            if v in [None,"",[],{}]: continue
-            if isinstance(v,list):
-                base[k]=sorted(list(set((base.get(k,[]) or [])+v)))
-            else:
-                base[k]=v
-        u.profile = json.dumps(base, ensure_ascii=False)
+            u = User(external_id=in_.user_id); db.add(u); db.flush()
+
+        # fusion des nouveaux datos : UPDATE des scalaires + INSERT des tags
+        merge_profile(db, u.id, bits if isinstance(bits, dict) else {})
 
         inter = Interaction(
             user_id=u.id,
@@ -147,7 +141,7 @@ def plan(in_: PlanIn):
         u = db.execute(select(User).where(User.external_id==in_.user_id)).scalar_one_or_none()
         if not u: raise HTTPException(404, "user not found")
 
-        profile = u.profile or "{}"
+        profile = json.dumps(load_profile(db, u), ensure_ascii=False)
         prompt = (
             "Create a 7-day athlete nutrition plan from this JSON profile:\n"
             f"{profile}\n\nRules:\n"
@@ -215,3 +209,57 @@ def log_meal(in_: LogIn):
         )
         db.add(entry); db.commit()
     return {"ok": True}
+
+# -------------------------------------------------------
+# Curseur de pagination : "<created_at ISO>|<id>"
+# -------------------------------------------------------
+def _encode_cursor(inter: Interaction) -> str:
+    return f"{inter.created_at.isoformat()}|{inter.id}"
+
+def _decode_cursor(cursor: str):
+    try:
+        ts, id_ = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(id_)
+    except ValueError:
+        raise HTTPException(400, "invalid cursor")
+
+# -------------------------------------------------------
+# Endpoint : /nutrition/history/{user_id} → historique paginé
+# Utilise l'index (user_id, created_at) : pas de scan de table
+# -------------------------------------------------------
+@router.get("/history/{user_id}")
+def history(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    kind: str | None = None,
+):
+    with SessionLocal() as db:
+        u = db.execute(select(User).where(User.external_id==user_id)).scalar_one_or_none()
+        if not u: raise HTTPException(404, "user not found")
+
+        q = select(Interaction).where(Interaction.user_id==u.id)
+        if kind:
+            q = q.where(Interaction.kind==kind)
+        if cursor:
+            ts, last_id = _decode_cursor(cursor)
+            q = q.where(tuple_(Interaction.created_at, Interaction.id) < (ts, last_id))
+        q = q.order_by(Interaction.created_at.desc(), Interaction.id.desc()).limit(limit + 1)
+
+        rows = db.execute(q).scalars().all()
+        page = rows[:limit]
+        items = []
+        for it in page:
+            try: extracted = json.loads(it.extracted) if it.extracted else {}
+            except: extracted = {}
+            items.append({
+                "id": it.id,
+                "kind": it.kind,
+                "question": it.question,
+                "answer": it.answer,
+                "extracted": extracted,
+                "created_at": it.created_at.isoformat() if it.created_at else None,
+            })
+
+    next_cursor = _encode_cursor(page[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
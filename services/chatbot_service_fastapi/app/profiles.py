@@ -0,0 +1,136 @@
+# services/chatbot_service_fastapi/app/profiles.py
+
+# -------------------------------------------------------
+# Profil nutritionnel typé d'un utilisateur du coach IA
+# - scalaires (budget, objectifs kcal/macros, repas/jour)
+#   → colonnes de coach_users, fusion = un seul UPDATE
+# - listes (allergies, diet_style, dislikes, cultural)
+#   → lignes de coach_user_tags, fusion = INSERT ... ON CONFLICT DO NOTHING
+# -------------------------------------------------------
+import json
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import User, UserTag
+
+SCALAR_FIELDS = {
+    "budget": str,
+    "calorie_target": int,
+    "protein_target_g": int,
+    "carb_target_g": int,
+    "fat_target_g": int,
+    "meals_per_day": int,
+}
+TAG_FIELDS = ("allergies", "diet_style", "dislikes", "cultural")
+BUDGETS = {"low", "medium", "high"}
+
+
+# -------------------------------------------------------
+# Nettoie les attributs extraits par le LLM (JSON libre)
+# → (scalaires typés, tags normalisés)
+# -------------------------------------------------------
+def _clean(bits: dict) -> tuple[dict, list[tuple[str, str]]]:
+    scalars: dict = {}
+    tags: list[tuple[str, str]] = []
+
+    for k, cast in SCALAR_FIELDS.items():
+        v = (bits or {}).get(k)
+        if v in [None, "", [], {}]:
+            continue
+        try:
+            v = cast(v)
+        except (TypeError, ValueError):
+            continue
+        if k == "budget":
+            v = v.strip().lower()
+            if v not in BUDGETS:
+                continue
+        scalars[k] = v
+
+    for k in TAG_FIELDS:
+        values = (bits or {}).get(k)
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list):
+            continue
+        for v in values:
+            if not isinstance(v, str) or not v.strip():
+                continue
+            tags.append((k, v.strip().lower()[:64]))
+
+    return scalars, sorted(set(tags))
+
+
+def _insert_ignore(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(UserTag).on_conflict_do_nothing()
+    return sqlite.insert(UserTag).on_conflict_do_nothing()
+
+
+# -------------------------------------------------------
+# Fusion des nouveaux attributs dans le profil (sans relire
+# ni resérialiser le profil existant)
+# -------------------------------------------------------
+def merge_profile(db: Session, user_id: int, bits: dict) -> None:
+    scalars, tags = _clean(bits)
+    if scalars:
+        db.execute(update(User).where(User.id == user_id).values(**scalars))
+    if tags:
+        db.execute(
+            _insert_ignore(db),
+            [{"user_id": user_id, "kind": k, "value": v} for k, v in tags],
+        )
+
+
+# -------------------------------------------------------
+# Lecture du profil sous forme de dict (prompt /nutrition/plan)
+# -------------------------------------------------------
+def load_profile(db: Session, user: User) -> dict:
+    profile: dict = {}
+    for k in SCALAR_FIELDS:
+        v = getattr(user, k)
+        if v is not None:
+            profile[k] = v
+
+    rows = db.execute(
+        select(UserTag.kind, UserTag.value)
+        .where(UserTag.user_id == user.id)
+        .order_by(UserTag.kind, UserTag.value)
+    ).all()
+    for kind, value in rows:
+        profile.setdefault(kind, []).append(value)
+    return profile
+
+
+# -------------------------------------------------------
+# Utilisateurs ayant un tag donné (ex: diet_style=vegan),
+# pour les traitements par lots — utilise l'index (kind, value)
+# -------------------------------------------------------
+def find_users_by_tag(db: Session, kind: str, value: str) -> list[str]:
+    return list(db.execute(
+        select(User.external_id)
+        .join(UserTag, UserTag.user_id == User.id)
+        .where(UserTag.kind == kind, UserTag.value == value.strip().lower())
+        .order_by(User.external_id)
+    ).scalars())
+
+
+# -------------------------------------------------------
+# Migration : anciens profils JSON (coach_users.profile)
+# → colonnes typées + tags, puis vidage de la colonne JSON
+# -------------------------------------------------------
+def migrate_legacy_profiles(db: Session) -> int:
+    rows = db.execute(
+        select(User.id, User.profile)
+        .where(User.profile.is_not(None), User.profile != "", User.profile != "{}")
+    ).all()
+    for user_id, raw in rows:
+        try: bits = json.loads(raw)
+        except ValueError: bits = {}
+        merge_profile(db, user_id, bits if isinstance(bits, dict) else {})
+        db.execute(update(User).where(User.id == user_id).values(profile=None))
+    db.commit()
+    return len(rows)
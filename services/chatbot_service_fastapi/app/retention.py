@@ -0,0 +1,131 @@
+# services/chatbot_service_fastapi/app/retention.py
+
+# -------------------------------------------------------
+# Job de rétention des interactions du coach IA
+# - archive les interactions plus anciennes que N jours
+#   dans des fichiers JSONL compressés (gzip)
+# - supprime ces lignes de coach.db par lots
+# - compacte la base (VACUUM) si demandé
+#
+# Exécution manuelle :
+#   python -m app.retention --days 180 --vacuum
+# -------------------------------------------------------
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import select, delete, text
+
+from .db import SessionLocal, engine, init_db
+from .models import Interaction, User
+
+logger = logging.getLogger("chatbot.retention")
+
+# -------------------------------------------------------
+# Configuration (variables d'environnement)
+# -------------------------------------------------------
+RETENTION_DAYS = int(os.getenv("INTERACTIONS_RETENTION_DAYS", "180"))
+ARCHIVE_DIR = Path(os.getenv("INTERACTIONS_ARCHIVE_DIR", "./archives"))
+BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+# 0 = pas de job périodique dans le service (CLI / cron uniquement)
+INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "0"))
+
+
+def _as_record(inter: Interaction, external_id: str | None) -> dict:
+    return {
+        "id": inter.id,
+        "user_id": inter.user_id,
+        "external_id": external_id,
+        "kind": inter.kind,
+        "question": inter.question,
+        "answer": inter.answer,
+        "extracted": inter.extracted,
+        "created_at": inter.created_at.isoformat() if inter.created_at else None,
+    }
+
+
+def archive_interactions(
+    days: int = RETENTION_DAYS,
+    archive_dir: Path = ARCHIVE_DIR,
+    batch_size: int = BATCH_SIZE,
+    vacuum: bool = False,
+) -> dict:
+    """
+    Archive puis supprime les interactions plus anciennes que `days` jours.
+    Chaque lot est écrit (et flushé) dans l'archive avant d'être supprimé,
+    donc une interruption ne perd jamais de données.
+    Retourne un petit résumé { archived, file }.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archive_dir = Path(archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    out_path = archive_dir / f"coach_interactions-{datetime.utcnow():%Y%m%d-%H%M%S}.jsonl.gz"
+
+    archived = 0
+    with gzip.open(out_path, "wt", encoding="utf-8") as out, SessionLocal() as db:
+        while True:
+            rows = db.execute(
+                select(Interaction, User.external_id)
+                .join(User, User.id == Interaction.user_id, isouter=True)
+                .where(Interaction.created_at < cutoff)
+                .order_by(Interaction.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            for inter, external_id in rows:
+                out.write(json.dumps(_as_record(inter, external_id), ensure_ascii=False) + "\n")
+            out.flush()
+
+            ids = [inter.id for inter, _ in rows]
+            db.execute(delete(Interaction).where(Interaction.id.in_(ids)))
+            db.commit()
+            db.expunge_all()
+            archived += len(ids)
+
+    # aucun lot → pas de fichier vide dans le dossier d'archives
+    if archived == 0:
+        out_path.unlink(missing_ok=True)
+
+    if vacuum and archived and engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+
+    return {"archived": archived, "file": str(out_path) if archived else None}
+
+
+# -------------------------------------------------------
+# Boucle périodique lancée au démarrage du service
+# (seulement si RETENTION_INTERVAL_HOURS > 0)
+# -------------------------------------------------------
+async def retention_loop(interval_hours: float = INTERVAL_HOURS):
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            res = await asyncio.to_thread(archive_interactions, vacuum=True)
+            logger.info("rétention interactions", extra=res)
+        except Exception:
+            logger.exception("erreur job de rétention")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive les anciennes interactions du coach IA.")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS)
+    parser.add_argument("--archive-dir", type=Path, default=ARCHIVE_DIR)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--vacuum", action="store_true", help="compacter coach.db après l'archivage")
+    args = parser.parse_args()
+
+    init_db()
+    res = archive_interactions(args.days, args.archive_dir, args.batch_size, args.vacuum)
+    print(f"✅ {res['archived']} interactions archivées → {res['file']}")
+
+
+if __name__ == "__main__":
+    main()
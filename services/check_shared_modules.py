@@ -0,0 +1,80 @@
+# services/check_shared_modules.py
+
+# -------------------------------------------------------
+# Vérifie que les modules partagés sont identiques d'un service à l'autre
+# Chaque service est construit seul (Dockerfile : COPY app ./app), les
+# modules communs sont donc copiés dans chaque app/ :
+#   metrics.py, logs.py         → auth, sports, reco, chatbot
+#   tracing.py                  → reco, chatbot
+#   http_cache.py               → auth, sports, reco
+# Usage :
+#   python services/check_shared_modules.py          (code 1 si une copie diverge)
+#   python services/check_shared_modules.py --sync reco
+#       recopie la version du service reco dans les autres services
+# -------------------------------------------------------
+import argparse
+import difflib
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent
+SERVICES = {
+    "auth": "auth_service_fastapi",
+    "sports": "sports_service_fastapi",
+    "reco": "reco_service_fastapi",
+    "chatbot": "chatbot_service_fastapi",
+}
+SHARED: Dict[str, List[str]] = {
+    "metrics.py": ["auth", "sports", "reco", "chatbot"],
+    "logs.py": ["auth", "sports", "reco", "chatbot"],
+    "tracing.py": ["reco", "chatbot"],
+    "http_cache.py": ["auth", "sports", "reco"],
+}
+
+
+def path_of(service: str, module: str) -> Path:
+    return ROOT / SERVICES[service] / "app" / module
+
+
+def check() -> int:
+    drift = 0
+    for module, services in SHARED.items():
+        ref = services[0]
+        ref_lines = path_of(ref, module).read_text(encoding="utf-8").splitlines(keepends=True)
+        for other in services[1:]:
+            lines = path_of(other, module).read_text(encoding="utf-8").splitlines(keepends=True)
+            if lines == ref_lines:
+                continue
+            drift += 1
+            print(f"[diverge] {module} : {ref} ≠ {other}")
+            sys.stdout.writelines(difflib.unified_diff(
+                ref_lines, lines, f"{SERVICES[ref]}/app/{module}", f"{SERVICES[other]}/app/{module}", n=1
+            ))
+    if not drift:
+        print(f"{len(SHARED)} modules partagés : copies identiques")
+    return 1 if drift else 0
+
+
+def sync(source: str) -> None:
+    for module, services in SHARED.items():
+        if source not in services:
+            continue
+        for other in services:
+            if other != source:
+                shutil.copyfile(path_of(source, module), path_of(other, module))
+                print(f"{module} : {source} → {other}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie les copies des modules partagés entre services.")
+    parser.add_argument("--sync", choices=sorted(SERVICES), help="recopie la version de ce service dans les autres")
+    args = parser.parse_args()
+    if args.sync:
+        sync(args.sync)
+    sys.exit(check())
+
+
+if __name__ == "__main__":
+    main()
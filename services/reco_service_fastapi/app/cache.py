@@ -0,0 +1,80 @@
+# services/reco_service_fastapi/app/cache.py
+
+# -------------------------------------------------------
+# Cache en mémoire TTL + LRU (thread-safe)
+# - entrée expirée après `ttl` secondes
+# - au-delà de `maxsize` entrées, la moins récemment utilisée sort
+# - compteurs hit / miss / eviction exposés sur /metrics
+# Les callbacks Firestore (on_snapshot) tournent dans un autre
+# thread, d'où le verrou.
+# -------------------------------------------------------
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Hashable, Optional
+
+from .metrics import REGISTRY, Counter
+
+CACHE_EVENTS = Counter(
+    "cache_events_total", "Événements des caches en mémoire (hit, miss, eviction…).", ("cache", "event")
+)
+REGISTRY.append(CACHE_EVENTS)
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retourne une copie de la valeur, ou None si absente / expirée."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                CACHE_EVENTS.inc(self.name, "miss")
+                return None
+            expires_at, value = item
+            if expires_at < now:
+                del self._data[key]
+                CACHE_EVENTS.inc(self.name, "expired")
+                return None
+            self._data.move_to_end(key)
+        CACHE_EVENTS.inc(self.name, "hit")
+        return deepcopy(value)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, deepcopy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                CACHE_EVENTS.inc(self.name, "eviction")
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                CACHE_EVENTS.inc(self.name, "invalidation")
+
+    def invalidate_where(self, predicate) -> None:
+        """Invalide toutes les clés pour lesquelles predicate(key) est vrai."""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+        if keys:
+            CACHE_EVENTS.inc(self.name, "invalidation", amount=len(keys))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,71 @@
+# services/reco_service_fastapi/app/chatbot_local.py
+
+# -------------------------------------------------------
+# Mode "inprocess" (CHATBOT_MODE=inprocess) : le service chatbot
+# est chargé dans le même processus que reco
+# - son package `app` est importé sous le nom `chatbot_app`
+#   (les deux services s'appellent `app`)
+# - son application FastAPI est montée sous /chatbot
+#   (/chatbot/chat/ask, /chatbot/metrics, /chatbot/nutrition/... si NUTRITION_ROUTES)
+# - reco appelle directement la logique de /chat/ask, sans HTTP
+# Le chatbot garde ses propres métriques / traces ; le span serveur
+# de l'appel reprend le traceparent de reco comme pour un appel HTTP.
+# -------------------------------------------------------
+import importlib
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+from .tracing import traceparent, parse_traceparent
+
+CHATBOT_SERVICE_DIR = Path(
+    os.getenv("CHATBOT_SERVICE_DIR")
+    or Path(__file__).resolve().parents[2] / "chatbot_service_fastapi"
+)
+PACKAGE = "chatbot_app"
+
+_main = None
+_tracing = None
+
+
+def load():
+    """Importe le service chatbot (une seule fois) et retourne son module main."""
+    global _main, _tracing
+    if _main is not None:
+        return _main
+
+    # la base du chatbot reste dans son dossier, quel que soit le cwd de reco
+    os.environ.setdefault("DB_URL", f"sqlite:///{CHATBOT_SERVICE_DIR / 'coach.db'}")
+
+    pkg_dir = CHATBOT_SERVICE_DIR / "app"
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, pkg_dir / "__init__.py", submodule_search_locations=[str(pkg_dir)]
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = package
+    spec.loader.exec_module(package)
+
+    _main = importlib.import_module(f"{PACKAGE}.main")
+    _tracing = importlib.import_module(f"{PACKAGE}.tracing")
+    return _main
+
+
+async def startup() -> None:
+    """Démarrage du chatbot (tables coach.db…) : une app montée n'a pas de lifespan."""
+    await load().bootstrap()
+
+
+async def ask(message: str, lang: str) -> Dict[str, Any]:
+    main = load()
+    span = _tracing.open_span(
+        "POST /chat/ask", kind="server", parent=parse_traceparent(traceparent()), mode="inprocess"
+    )
+    try:
+        data = await main.ask(main.AskRequest(message=message, lang=lang))
+    except BaseException as e:
+        _tracing.close_span(span, e)
+        raise
+    _tracing.close_span(span)
+    return data
@@ -1,6 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import firebase_admin
-from firebase_admin import credentials, firestore
+import asyncio
+import contextvars
+import functools
+import os
+
+from dotenv import load_dotenv
 
 # -------------------------------------------------------
 # Chemin vers le dossier du service (racine du module)
@@ -8,22 +13,63 @@ from firebase_admin import credentials, firestore
 BASE_DIR = Path(__file__).resolve().parents[1]  # .../reco_service_fastapi
 
 # -------------------------------------------------------
-# Chemin du fichier de clé Firebase Admin
+# Charger le .env racine (ce module est importé avant main)
 # -------------------------------------------------------
-CRED_PATH = BASE_DIR / "firebase-admin-key.json"
+load_dotenv(Path(__file__).resolve().parents[3] / ".env")
 
 # -------------------------------------------------------
-# Initialisation de Firebase avec les identifiants du service
+# Backend Firestore : "firebase" (défaut) ou "memory"
+# (stand-in local en mémoire pour le dev et le benchmark)
 # -------------------------------------------------------
-cred = credentials.Certificate(str(CRED_PATH))
-firebase_admin.initialize_app(cred)
+FIRESTORE_BACKEND = os.getenv("FIRESTORE_BACKEND", "firebase").strip().lower()
+# Taille du pool de threads dédié aux appels Firestore
+FIRESTORE_THREADS = int(os.getenv("FIRESTORE_THREADS", "16"))
 
-# -------------------------------------------------------
-# Client Firestore pour lire/écrire dans la base
-# -------------------------------------------------------
-db = firestore.client()
+if FIRESTORE_BACKEND == "memory":
+    from . import memory_firestore as firestore
+
+    db = firestore.client()
+else:
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    # -------------------------------------------------------
+    # Chemin du fichier de clé Firebase Admin
+    # -------------------------------------------------------
+    CRED_PATH = BASE_DIR / "firebase-admin-key.json"
+
+    # -------------------------------------------------------
+    # Initialisation de Firebase avec les identifiants du service
+    # -------------------------------------------------------
+    cred = credentials.Certificate(str(CRED_PATH))
+    firebase_admin.initialize_app(cred)
+
+    # -------------------------------------------------------
+    # Client Firestore pour lire/écrire dans la base
+    # -------------------------------------------------------
+    db = firestore.client()
 
 # -------------------------------------------------------
 # Raccourci pour utiliser SERVER_TIMESTAMP, Query, etc.
 # -------------------------------------------------------
 fb_firestore = firestore
+
+# -------------------------------------------------------
+# Appels Firestore hors de la boucle asyncio
+# Le SDK firebase-admin est synchrone : chaque get()/set()/stream()
+# bloque le thread pendant le RPC. On les exécute dans un pool dédié
+# (séparé du pool par défaut utilisé par les routes `def`) pour ne
+# jamais bloquer les autres requêtes du worker.
+# -------------------------------------------------------
+_executor = ThreadPoolExecutor(max_workers=FIRESTORE_THREADS, thread_name_prefix="firestore")
+
+
+async def run_firestore(fn, *args, **kwargs):
+    """
+    await run_firestore(user_ref.get)
+    Le contexte (request_id, span courant) suit l'appel dans le thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
@@ -0,0 +1,263 @@
+# services/reco_service_fastapi/app/history_writer.py
+
+# -------------------------------------------------------
+# Écriture de l'historique des recommandations en arrière-plan
+# - /reco/generate dépose le document dans une file bornée et
+#   répond sans attendre Firestore
+# - une tâche de fond regroupe les documents et les écrit avec
+#   un WriteBatch Firestore (un seul aller-retour par lot)
+# - Firestore indisponible ou file pleine : le document est gardé
+#   dans SQLite (pending_recommendations) puis rejoué plus tard
+#   (HISTORY_SPILL=false → il est perdu, compteur "dropped")
+# -------------------------------------------------------
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .firebase_client import db, run_firestore
+from .metrics import REGISTRY, Counter, Gauge
+from .tracing import outbound
+from .tracking_db import get_conn
+
+# -------------------------------------------------------
+# Configuration
+# -------------------------------------------------------
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "1000"))
+# Firestore limite un WriteBatch à 500 écritures
+HISTORY_BATCH_SIZE = max(1, min(int(os.getenv("HISTORY_BATCH_SIZE", "100")), 500))
+HISTORY_FLUSH_MS = float(os.getenv("HISTORY_FLUSH_MS", "200"))
+HISTORY_SPILL = os.getenv("HISTORY_SPILL", "true").lower() == "true"
+HISTORY_REPLAY_SECONDS = float(os.getenv("HISTORY_REPLAY_SECONDS", "30"))
+
+HISTORY_WRITES = Counter(
+    "reco_history_writes_total",
+    "Recommandations écrites dans Firestore (written, spilled, replayed, dropped).",
+    ("outcome",),
+)
+HISTORY_QUEUE = Gauge("reco_history_queue_depth", "Recommandations en attente dans la file mémoire.")
+REGISTRY.extend([HISTORY_WRITES, HISTORY_QUEUE])
+
+logger = logging.getLogger("reco.history")
+
+# (user_id, doc_id, données, date de génération ISO)
+Item = Tuple[str, str, Dict[str, Any], str]
+
+
+def _commit_batch(items: List[Item]) -> None:
+    """Écrit un lot de recommandations (appel bloquant, à lancer dans le pool)."""
+    batch = db.batch()
+    for user_id, doc_id, data, _ in items:
+        ref = db.collection("users").document(user_id).collection("recommendations").document(doc_id)
+        batch.set(ref, data)
+    batch.commit()
+
+
+# -------------------------------------------------------
+# Sauvegarde locale (SQLite) et rejeu
+# -------------------------------------------------------
+def _spill(items: List[Item]) -> None:
+    rows = []
+    for user_id, doc_id, data, created_at in items:
+        # createdAt = SERVER_TIMESTAMP (sentinelle) : remplacé au rejeu par la date de génération
+        payload = {k: v for k, v in data.items() if k != "createdAt"}
+        rows.append((user_id, doc_id, json.dumps(payload, ensure_ascii=False, default=str), created_at))
+    with get_conn() as c:
+        c.executemany(
+            "INSERT INTO pending_recommendations(user_id, doc_id, payload, created_at) VALUES(?,?,?,?)",
+            rows,
+        )
+        c.commit()
+
+
+def _load_pending(limit: int) -> List[tuple]:
+    with get_conn() as c:
+        cur = c.execute(
+            "SELECT id, user_id, doc_id, payload, created_at FROM pending_recommendations ORDER BY id LIMIT ?",
+            (limit,),
+        )
+        return [tuple(r) for r in cur.fetchall()]
+
+
+def _delete_pending(ids: List[int]) -> None:
+    with get_conn() as c:
+        c.execute(
+            f"DELETE FROM pending_recommendations WHERE id IN ({','.join('?' * len(ids))})",
+            ids,
+        )
+        c.commit()
+
+
+def _bump_attempts(ids: List[int]) -> None:
+    with get_conn() as c:
+        c.execute(
+            f"UPDATE pending_recommendations SET attempts = attempts + 1 WHERE id IN ({','.join('?' * len(ids))})",
+            ids,
+        )
+        c.commit()
+
+
+# =======================================================
+#                 Writer
+# =======================================================
+class HistoryWriter:
+    def __init__(self):
+        # appelé avec les user_id dont l'historique vient d'être écrit
+        # (invalidation du cache de /reco/history)
+        self.on_written: Optional[Callable[[Iterable[str]], None]] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._replayer: Optional[asyncio.Task] = None
+        # lot retiré de la file mais pas encore écrit (ni sauvegardé) :
+        # repris par stop() si le worker est annulé
+        self._inflight: List[Item] = []
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(HISTORY_QUEUE_SIZE)
+        self._worker = asyncio.create_task(self._run())
+        if HISTORY_SPILL and HISTORY_REPLAY_SECONDS > 0:
+            self._replayer = asyncio.create_task(self._replay_loop())
+
+    async def submit(self, user_id: str, doc_id: str, data: Dict[str, Any]) -> None:
+        """
+        N'attend jamais Firestore : file pleine (ou writer arrêté) → SQLite,
+        écrit dans un thread pour ne pas bloquer la boucle asyncio.
+        """
+        item: Item = (user_id, doc_id, data, datetime.now(timezone.utc).isoformat())
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(item)
+                HISTORY_QUEUE.inc()
+                return
+            except asyncio.QueueFull:
+                logger.warning("file de l'historique pleine", extra={"user_id": user_id})
+        await asyncio.to_thread(self._save_locally, [item])
+
+    def _save_locally(self, items: List[Item]) -> None:
+        if not HISTORY_SPILL:
+            HISTORY_WRITES.inc("dropped", amount=len(items))
+            return
+        try:
+            _spill(items)
+            HISTORY_WRITES.inc("spilled", amount=len(items))
+        except Exception:
+            HISTORY_WRITES.inc("dropped", amount=len(items))
+            logger.exception("impossible de sauvegarder l'historique dans SQLite")
+
+    async def _flush(self, items: List[Item]) -> None:
+        try:
+            with outbound("firestore", "firestore.batch", size=len(items)):
+                await run_firestore(_commit_batch, items)
+            HISTORY_WRITES.inc("written", amount=len(items))
+            self._notify(items)
+        except Exception as e:
+            logger.warning("erreur Firestore en écrivant l'historique", extra={"size": len(items), "error": repr(e)})
+            await asyncio.to_thread(self._save_locally, items)
+
+    def _notify(self, items: List[Item]) -> None:
+        if self.on_written is not None:
+            self.on_written({user_id for user_id, _, _, _ in items})
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._queue  # stop() remet self._queue à None
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            HISTORY_QUEUE.dec()
+            batch = [item]
+            self._inflight = batch
+            # on attend au plus HISTORY_FLUSH_MS pour remplir le lot
+            deadline = loop.time() + HISTORY_FLUSH_MS / 1000
+            while len(batch) < HISTORY_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                HISTORY_QUEUE.dec()
+                batch.append(nxt)
+            await self._flush(batch)
+            self._inflight = []
+
+    # -------------------------------------------------------
+    # Rejeu des recommandations sauvegardées dans SQLite
+    # -------------------------------------------------------
+    async def replay(self) -> int:
+        """Rejoue les recommandations en attente ; retourne le nombre écrit."""
+        replayed = 0
+        while True:
+            rows = await asyncio.to_thread(_load_pending, HISTORY_BATCH_SIZE)
+            if not rows:
+                break
+            ids = [r[0] for r in rows]
+            items: List[Item] = [
+                (user_id, doc_id, {**json.loads(payload), "createdAt": datetime.fromisoformat(created_at)}, created_at)
+                for _, user_id, doc_id, payload, created_at in rows
+            ]
+            try:
+                with outbound("firestore", "firestore.batch", size=len(items), replay=True):
+                    await run_firestore(_commit_batch, items)
+            except Exception as e:
+                # même doc_id au prochain essai : le rejeu est idempotent
+                await asyncio.to_thread(_bump_attempts, ids)
+                logger.warning("rejeu de l'historique impossible", extra={"pending": len(ids), "error": repr(e)})
+                break
+            await asyncio.to_thread(_delete_pending, ids)
+            self._notify(items)
+            replayed += len(ids)
+        if replayed:
+            HISTORY_WRITES.inc("replayed", amount=replayed)
+            logger.info("historique rejoué", extra={"replayed": replayed})
+        return replayed
+
+    async def _replay_loop(self) -> None:
+        while True:
+            try:
+                await self.replay()
+            except Exception:
+                logger.exception("erreur pendant le rejeu de l'historique")
+            await asyncio.sleep(HISTORY_REPLAY_SECONDS)
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Vide la file (dernier lot vers Firestore) ; le reste, et le lot en
+        cours d'écriture si le worker est annulé, part dans SQLite.
+        """
+        if self._replayer is not None:
+            self._replayer.cancel()
+        if self._queue is None:
+            return
+        queue, self._queue = self._queue, None
+        try:
+            queue.put_nowait(None)
+            await asyncio.wait_for(self._worker, timeout)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        # lot en cours d'écriture au moment de l'annulation : peut-être déjà
+        # dans Firestore, mais le rejeu réécrit le même doc_id
+        inflight, self._inflight = list(self._inflight), []
+        queued = []
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                queued.append(item)
+        HISTORY_QUEUE.dec(amount=len(queued))
+        if inflight or queued:
+            self._save_locally(inflight + queued)
+
+
+history_writer = HistoryWriter()
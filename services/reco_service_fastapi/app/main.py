@@ -1,16 +1,30 @@
 # services/reco_service_fastapi/app/main.py
 
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Any, Dict
 from pathlib import Path
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
+import asyncio
+import logging
 import httpx
 
 from .tracking_db import init_db, get_conn      # SQLite pour le suivi
-from .firebase_client import db, fb_firestore   # Firestore (Firebase)
+from .firebase_client import db, fb_firestore, run_firestore   # Firestore (Firebase)
+from .metrics import setup_metrics
+from .tracing import setup_tracing, outbound, inject
+from .logs import setup_logging, request_id
+from .cache import TTLCache
+from .http_cache import dumps, json_response, make_etag
+from .history_writer import history_writer
+from . import reco_cache
+from .series import lttb
+from .trends import apply_measurement, get_digest, get_summary, get_series, get_weekly
+from .measurements_io import QueueReader, export_csv, export_ndjson, import_stream, iter_measurements
 
 # -------------------------------------------------------
 # Charger le fichier .env à la racine du projet
@@ -23,13 +37,75 @@ CHATBOT_URL = os.getenv(
     "CHATBOT_URL",
     "http://localhost:8010/chat/ask"
 ).rstrip("/")
+# http : client HTTP persistant (pool de connexions) vers CHATBOT_URL
+# inprocess : chatbot chargé dans ce processus (voir chatbot_local.py)
+CHATBOT_MODE = os.getenv("CHATBOT_MODE", "http").strip().lower()
+CHATBOT_TIMEOUT = float(os.getenv("CHATBOT_TIMEOUT", "60"))
+CHATBOT_MAX_CONNECTIONS = int(os.getenv("CHATBOT_MAX_CONNECTIONS", "100"))
+
+# Générateur de plans local du service sports (POST /plans/generate) :
+# off | fallback (si le chatbot échoue) | prefer (objectifs reconnus, sans LLM)
+SPORTS_URL = os.getenv("SPORTS_URL", "http://localhost:8002").rstrip("/")
+PLAN_ENGINE = os.getenv("PLAN_ENGINE", "fallback").strip().lower()
+PLAN_TIMEOUT = float(os.getenv("PLAN_TIMEOUT", "5"))
+
+# Cache des profils Firestore (évite un get() à chaque /reco/generate)
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+# true = écoute Firestore (on_snapshot) pour invalider le cache dès qu'un profil change.
+# L'écoute porte sur toute la collection `users` (snapshot initial = lecture de
+# tous les profils, puis chaque modification de profil, mis en cache ou non,
+# est reçue par chaque instance) : réservé aux petits déploiements, sinon
+# garder le TTL seul.
+PROFILE_CACHE_LISTEN = os.getenv("PROFILE_CACHE_LISTEN", "false").lower() == "true"
+
+logger = logging.getLogger("reco")
 
-print(f"[RECO] CHATBOT_URL = {CHATBOT_URL}")
+# -------------------------------------------------------
+# Profil par défaut (mêmes valeurs que dans le frontend)
+# -------------------------------------------------------
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "name": "SportConnectIA",
+    "age": 39,
+    "weightKg": 64,
+    "heightCm": 160,
+    "mainGoal": "Perte de poids",
+    "lang": "fr",
+}
+
+# Cache court des pages d'historique (clé : user_id, limit, cursor, fields),
+# gardées sérialisées avec leur ETag
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "30"))
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", "2000"))
+
+# Cache-Control du détail d'une recommandation (jamais modifiée après écriture)
+HISTORY_ITEM_MAX_AGE = int(os.getenv("HISTORY_ITEM_MAX_AGE", "3600"))
+
+# Évolution des mesures ajoutée au prompt si la dernière date de moins de N jours
+TREND_MAX_AGE_DAYS = int(os.getenv("TREND_MAX_AGE_DAYS", "60"))
+
+_chatbot_client: Optional[httpx.AsyncClient] = None
+_sports_client: Optional[httpx.AsyncClient] = None
+
+profile_cache = TTLCache("profile", PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)
+history_cache = TTLCache("history", HISTORY_CACHE_SIZE, HISTORY_CACHE_TTL)
+_profile_watch = None
 
 # -------------------------------------------------------
 # Création de l’application FastAPI
 # -------------------------------------------------------
 app = FastAPI(title="Reco Service")
+setup_metrics(app)
+setup_logging(app, "reco")
+setup_tracing(app, "reco")
+
+# -------------------------------------------------------
+# Mode inprocess : le chatbot est servi par la même application
+# -------------------------------------------------------
+if CHATBOT_MODE == "inprocess":
+    from . import chatbot_local
+
+    app.mount("/chatbot", chatbot_local.load().app)
 
 # -------------------------------------------------------
 # CORS pour permettre les appels du frontend Vite
@@ -45,6 +121,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # -------------------------------------------------------
@@ -52,9 +129,70 @@ app.add_middleware(
 # -------------------------------------------------------
 @app.on_event("startup")
 def bootstrap():
-    print("[RECO] Initialisation de la base SQLite…")
+    logger.info("démarrage reco", extra={"chatbot_url": CHATBOT_URL})
     init_db()
-    print("[RECO] SQLite OK.")
+    logger.info("SQLite OK", extra={"db": "tracking"})
+    if PROFILE_CACHE_LISTEN:
+        start_profile_listener()
+
+
+def _invalidate_history(user_ids) -> None:
+    user_ids = set(user_ids)
+    history_cache.invalidate_where(lambda key: key[0] in user_ids)
+
+
+@app.on_event("startup")
+async def start_background_writers():
+    # écriture de l'historique IA en arrière-plan (+ rejeu SQLite)
+    history_writer.on_written = _invalidate_history
+    await history_writer.start()
+
+
+@app.on_event("startup")
+async def start_chatbot():
+    if CHATBOT_MODE == "inprocess":
+        await chatbot_local.startup()
+        logger.info("chatbot chargé dans le processus reco")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    global _profile_watch
+    if _profile_watch is not None:
+        _profile_watch.unsubscribe()
+        _profile_watch = None
+    await history_writer.stop()
+    await close_chatbot_client()
+
+# -------------------------------------------------------
+# Invalidation du cache de profils via Firestore (optionnel,
+# petits déploiements : voir PROFILE_CACHE_LISTEN)
+# -------------------------------------------------------
+PROFILE_LISTEN_WARN_DOCS = 5000
+_profile_snapshots = 0
+
+
+def _on_users_snapshot(docs, changes, read_time):
+    # appelé dans un thread Firestore : on se contente d'invalider
+    global _profile_snapshots
+    _profile_snapshots += 1
+    if _profile_snapshots == 1 and len(docs) > PROFILE_LISTEN_WARN_DOCS:
+        logger.warning(
+            "PROFILE_CACHE_LISTEN écoute toute la collection users : préférer le TTL seul",
+            extra={"users": len(docs)},
+        )
+    for change in changes:
+        profile_cache.invalidate(change.document.id)
+
+
+def start_profile_listener():
+    global _profile_watch
+    try:
+        _profile_watch = db.collection("users").on_snapshot(_on_users_snapshot)
+        logger.info("écoute Firestore des profils active")
+    except Exception as e:
+        # sans écoute, le TTL reste la seule invalidation
+        logger.warning("écoute Firestore impossible", extra={"error": repr(e)})
 
 # -------------------------------------------------------
 # Modèle d’entrée : demande de recommandation
@@ -62,6 +200,8 @@ def bootstrap():
 class RecoRequest(BaseModel):
     user_id: str
     lang: Optional[str] = None
+    force: bool = False      # True = ignorer le cache et rappeler le LLM
+    email: Optional[str] = None  # clé de tracking.db (défaut : user_id s'il contient "@")
 
 # -------------------------------------------------------
 # Route santé du service
@@ -73,9 +213,10 @@ async def reco_health():
 # -------------------------------------------------------
 # Construire une question selon le profil (Firestore ou défaut)
 # -------------------------------------------------------
-def build_question_from_profile(profile: Dict[str, Any]) -> str:
+def build_question_from_profile(profile: Dict[str, Any], trend: Optional[Dict[str, Any]] = None) -> str:
     """
     Construit un descriptif du profil + consigne pour le coach IA.
+    `trend` : digest des mesures (trends.get_digest), 1 ligne au plus.
     """
     name = profile.get("name", "l'utilisateur")
     age = profile.get("age")
@@ -92,6 +233,8 @@ def build_question_from_profile(profile: Dict[str, Any]) -> str:
         parts.append(f"- Taille : {height} cm")
     if goal:
         parts.append(f"- Objectif principal : {goal}")
+    if trend:
+        parts.append(trend_line(trend))
 
     parts.append(
         "\nSur ce profil, donne :\n"
@@ -104,152 +247,410 @@ def build_question_from_profile(profile: Dict[str, Any]) -> str:
     )
     return "\n".join(parts)
 
+def trend_line(trend: Dict[str, Any]) -> str:
+    changes = []
+    if "weight_change_kg" in trend:
+        changes.append(f"poids {trend['weight_change_kg']:+.1f} kg")
+    if "waist_change_cm" in trend:
+        changes.append(f"tour de taille {trend['waist_change_cm']:+.1f} cm")
+    summary = ", ".join(changes) or "pas de variation mesurée"
+    return (
+        f"- Évolution sur {trend['weeks']} semaines : {summary} "
+        f"({trend['count']} mesures, dernière le {trend['last_date']})"
+    )
+
+
+async def load_trend(email: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Digest des mesures si récent (TREND_MAX_AGE_DAYS), sinon None."""
+    if not email:
+        return None
+    def read() -> Optional[Dict[str, Any]]:
+        # connexion SQLite propre au thread qui l'utilise
+        return get_digest(get_conn(), email.lower())
+
+    try:
+        trend = await asyncio.to_thread(read)
+        if trend is None:
+            return None
+        # date stockée dans un autre format → pas d'évolution, pas d'erreur
+        last = datetime.fromisoformat(trend["last_date"][:10]).date()
+    except Exception as e:
+        logger.warning("digest des mesures indisponible", extra={"error": repr(e)})
+        return None
+    age = datetime.now().date() - last
+    return trend if age.days <= TREND_MAX_AGE_DAYS else None
+
+
+def trend_email(user_id: str, email: Optional[str] = None) -> Optional[str]:
+    """Clé de tracking.db : email fourni, sinon user_id s'il contient "@"."""
+    return email or (user_id if "@" in user_id else None)
+
+
+async def build_question(profile: Dict[str, Any], email: Optional[str]) -> str:
+    """
+    Question envoyée au chatbot (profil + évolution des mesures).
+    Utilisée par /reco/generate et par precompute : même question,
+    donc même empreinte reco_cache.
+    """
+    return build_question_from_profile(profile, await load_trend(email))
+
+# -------------------------------------------------------
+# Fusionner un document Firestore `users/{id}` avec le profil par défaut
+# -------------------------------------------------------
+# niveau sportif (optionnel dans le profil) transmis au générateur de plans
+PLAN_LEVELS = ("beginner", "intermediate", "advanced")
+PROFILE_FIELDS = list(DEFAULT_PROFILE) + ["level"]
+
+
+def profile_from_doc(data: Dict[str, Any]) -> Dict[str, Any]:
+    profile = DEFAULT_PROFILE.copy()
+    profile.update({
+        "name": data.get("name") or profile["name"],
+        "age": data.get("age", profile["age"]),
+        "weightKg": data.get("weightKg", profile["weightKg"]),
+        "heightCm": data.get("heightCm", profile["heightCm"]),
+        "mainGoal": data.get("mainGoal") or profile["mainGoal"],
+        "lang": data.get("lang") or profile["lang"],
+    })
+    if data.get("level") in PLAN_LEVELS:
+        profile["level"] = data["level"]
+    return profile
+
+# -------------------------------------------------------
+# Lire (ou créer) le profil : cache → Firestore
+# -------------------------------------------------------
+async def load_profile(user_ref) -> Dict[str, Any]:
+    """
+    Retourne le profil fusionné avec les valeurs par défaut.
+    Cache TTL + LRU devant Firestore ; écriture directe dans le cache
+    quand on crée le profil par défaut d'un nouvel utilisateur.
+    Lève l'exception Firestore en cas d'erreur.
+    """
+    cached = profile_cache.get(user_ref.id)
+    if cached is not None:
+        return cached
+
+    profile: Dict[str, Any] = DEFAULT_PROFILE.copy()
+    with outbound("firestore", "firestore.get", path=user_ref.path):
+        snap = await run_firestore(user_ref.get)
+
+    if snap.exists:
+        # on fusionne les données Firestore avec les valeurs par défaut
+        profile = profile_from_doc(snap.to_dict() or {})
+    else:
+        # si l'utilisateur n'existe pas, on le crée avec le profil par défaut
+        logger.info("utilisateur absent → profil par défaut", extra={"user_id": user_ref.id})
+        with outbound("firestore", "firestore.set", path=user_ref.path):
+            await run_firestore(user_ref.set, DEFAULT_PROFILE, merge=True)
+
+    profile_cache.set(user_ref.id, profile)
+    return profile
+
 # -------------------------------------------------------
 # Appel au microservice chatbot pour générer la réponse IA
 # -------------------------------------------------------
+def chatbot_client() -> httpx.AsyncClient:
+    """Client HTTP partagé : connexions keep-alive réutilisées entre appels."""
+    global _chatbot_client
+    if _chatbot_client is None or _chatbot_client.is_closed:
+        _chatbot_client = httpx.AsyncClient(
+            timeout=CHATBOT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=CHATBOT_MAX_CONNECTIONS,
+                max_keepalive_connections=CHATBOT_MAX_CONNECTIONS,
+            ),
+        )
+    return _chatbot_client
+
+
+async def close_chatbot_client() -> None:
+    global _chatbot_client, _sports_client
+    if _chatbot_client is not None:
+        await _chatbot_client.aclose()
+        _chatbot_client = None
+    if _sports_client is not None:
+        await _sports_client.aclose()
+        _sports_client = None
+
+
 async def call_chatbot(message: str, lang: str) -> str:
     """
-    Appelle le service /chat/ask.
+    Appelle le service /chat/ask (HTTP ou dans le processus selon CHATBOT_MODE).
     Retourne la réponse texte, ou "" en cas de problème.
     """
     try:
-        async with httpx.AsyncClient(timeout=60) as client:
-            resp = await client.post(
-                CHATBOT_URL,
-                json={"message": message, "lang": lang},
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            answer = (data.get("answer") or "").strip()
-            print(f"[RECO] Réponse chatbot (extrait) -> {answer[:80]}...")
-            return answer
+        if CHATBOT_MODE == "inprocess":
+            with outbound("chatbot", "chatbot.ask", mode="inprocess"):
+                data = await chatbot_local.ask(message, lang)
+        else:
+            with outbound("chatbot", "POST /chat/ask", url=CHATBOT_URL):
+                headers = inject({})
+                if request_id():
+                    headers["X-Request-ID"] = request_id()
+                resp = await chatbot_client().post(
+                    CHATBOT_URL,
+                    json={"message": message, "lang": lang},
+                    headers=headers,
+                )
+                resp.raise_for_status()
+                data = resp.json()
+        answer = (data.get("answer") or "").strip()
+        logger.info("réponse chatbot", extra={"answer_len": len(answer), "answer_head": answer[:80]})
+        return answer
     except Exception as e:
-        print(f"[RECO] Erreur en appelant le chatbot: {e}")
+        logger.warning("erreur en appelant le chatbot", extra={"error": repr(e)})
         return ""
 
+# -------------------------------------------------------
+# Plan d'entraînement sans LLM : moteur de règles du service sports
+# (déterministe, quelques ms). Retourne le plan ({ text, goal_matched… })
+# ou None en cas de problème.
+# -------------------------------------------------------
+def sports_client() -> httpx.AsyncClient:
+    global _sports_client
+    if _sports_client is None or _sports_client.is_closed:
+        _sports_client = httpx.AsyncClient(timeout=PLAN_TIMEOUT)
+    return _sports_client
+
+
+async def local_plan(profile: Dict[str, Any], lang: str) -> Optional[Dict[str, Any]]:
+    body = {
+        "goal": profile.get("mainGoal"),
+        "level": profile.get("level") or "beginner",
+        "age": profile.get("age"),
+        "weight_kg": profile.get("weightKg"),
+        "height_cm": profile.get("heightCm"),
+        "lang": lang,
+    }
+    try:
+        with outbound("sports", "POST /plans/generate", url=SPORTS_URL):
+            headers = inject({})
+            if request_id():
+                headers["X-Request-ID"] = request_id()
+            resp = await sports_client().post(f"{SPORTS_URL}/plans/generate", json=body, headers=headers)
+            resp.raise_for_status()
+            return resp.json()
+    except Exception as e:
+        logger.warning("erreur en appelant le générateur de plans", extra={"error": repr(e)})
+        return None
+
+# -------------------------------------------------------
+# Document d'historique `users/{id}/recommendations/{reco_id}`
+# source : llm, cache ou plan_engine
+# -------------------------------------------------------
+def recommendation_doc(
+    question: str, answer: str, profile: Dict[str, Any], lang: str, fp: str, cached: bool,
+    source: Optional[str] = None,
+) -> Dict[str, Any]:
+    return {
+        "question": question,
+        "answer": answer,
+        "createdAt": fb_firestore.SERVER_TIMESTAMP,
+        "age": profile.get("age"),
+        "weightKg": profile.get("weightKg"),
+        "heightCm": profile.get("heightCm"),
+        "mainGoal": profile.get("mainGoal"),
+        "lang": lang,
+        "fingerprint": fp,
+        "cached": cached,
+        "source": source or ("cache" if cached else "llm"),
+    }
+
 # -------------------------------------------------------
 # Endpoint principal : générer recommandation IA
 # -------------------------------------------------------
 @app.post("/reco/generate")
 async def generate_recommendation(req: RecoRequest):
     """
-    1) Lit (ou crée) un profil utilisateur dans Firestore
+    1) Lit (ou crée) un profil utilisateur (cache, puis Firestore)
     2) Construit une question détaillée pour le Coach IA
-    3) Appelle le microservice chatbot
-    4) Sauvegarde la recommandation dans Firestore (si possible)
-    5) Retourne { answer, profile } au frontend
+    3) Plan local (PLAN_ENGINE=prefer, objectif reconnu), sinon réponse
+       en cache pour ce profil, sinon chatbot (plan local s'il échoue)
+    4) Sauvegarde la recommandation dans Firestore (en arrière-plan)
+    5) Retourne { answer, profile, cached, source } au frontend
     """
 
-    # -------- Profil par défaut (mêmes valeurs que dans le frontend) --------
-    default_profile: Dict[str, Any] = {
-        "name": "SportConnectIA",
-        "age": 39,
-        "weightKg": 64,
-        "heightCm": 160,
-        "mainGoal": "Perte de poids",
-        "lang": "fr",
-    }
-
-    profile: Dict[str, Any] = default_profile.copy()
+    profile: Dict[str, Any] = DEFAULT_PROFILE.copy()
     firestore_ok = True
     user_ref = None
 
-    # -------- 1) Lire ou créer le profil dans Firestore --------
+    # -------- 1) Lire ou créer le profil (cache → Firestore) --------
     try:
         user_ref = db.collection("users").document(req.user_id)
-        snap = user_ref.get()
-
-        if snap.exists:
-            data = snap.to_dict() or {}
-            # on fusionne les données Firestore avec les valeurs par défaut
-            profile.update({
-                "name": data.get("name") or profile["name"],
-                "age": data.get("age", profile["age"]),
-                "weightKg": data.get("weightKg", profile["weightKg"]),
-                "heightCm": data.get("heightCm", profile["heightCm"]),
-                "mainGoal": data.get("mainGoal") or profile["mainGoal"],
-                "lang": data.get("lang") or profile["lang"],
-            })
-        else:
-            # si l'utilisateur n'existe pas, on le crée avec le profil par défaut
-            print(f"[RECO] Utilisateur {req.user_id} absent → création profil par défaut.")
-            user_ref.set(default_profile, merge=True)
+        profile = await load_profile(user_ref)
 
     except Exception as e:
         # Si Firestore est down ou mal configuré, on continue quand même
-        print(f"[RECO] Erreur Firestore (lecture/écriture profil) : {e}")
+        logger.warning("erreur Firestore (lecture/écriture profil)", extra={"user_id": req.user_id, "error": repr(e)})
         firestore_ok = False
 
     # langue finale (priorité : requête -> profil -> fr)
     lang = (req.lang or profile.get("lang") or "fr").lower()
 
     # -------- 2) Construire la question pour le Coach IA --------
-    question = build_question_from_profile(profile)
-    print(f"[RECO] Question envoyée au chatbot:\n{question}")
-
-    # -------- 3) Appeler le microservice chatbot --------
-    answer = await call_chatbot(question, lang)
-    if not answer:
-        # Ici on renvoie une erreur 500 au frontend
-        # (le frontend affiche ton message rouge)
-        raise HTTPException(
-            status_code=500,
-            detail="Erreur lors de la réponse IA depuis le chatbot."
-        )
+    # (+ évolution récente des mesures de tracking.db)
+    question = await build_question(profile, trend_email(req.user_id, req.email))
+    logger.debug("question envoyée au chatbot", extra={"question": question, "question_len": len(question)})
+
+    # -------- 3) Plan local, cache (même profil + langue) ou appel au chatbot --------
+    fp = reco_cache.fingerprint(question, lang)
+    answer, cached, source = None, False, "llm"
+    if PLAN_ENGINE == "prefer" and not req.force:
+        plan = await local_plan(profile, lang)
+        if plan and plan.get("goal_matched"):
+            answer, source = plan["text"], "plan_engine"
+    if answer is None and not req.force:
+        answer = await reco_cache.lookup(fp)
+        cached = answer is not None
+        if cached:
+            source = "cache"
+            logger.info("recommandation servie depuis le cache", extra={"user_id": req.user_id, "fingerprint": fp})
+    if answer is None:
+        answer = await call_chatbot(question, lang)
+        if answer:
+            reco_cache.store(fp, answer, lang)
+        elif PLAN_ENGINE != "off":
+            plan = await local_plan(profile, lang)
+            if plan:
+                logger.info("chatbot indisponible → plan local", extra={"user_id": req.user_id})
+                answer, source = plan["text"], "plan_engine"
+        if not answer:
+            # Ici on renvoie une erreur 500 au frontend
+            # (le frontend affiche ton message rouge)
+            raise HTTPException(
+                status_code=500,
+                detail="Erreur lors de la réponse IA depuis le chatbot."
+            )
 
-    # -------- 4) Sauvegarder l'historique dans Firestore (si possible) --------
+    # -------- 4) Sauvegarder l'historique dans Firestore (en arrière-plan) --------
     if firestore_ok and user_ref is not None:
         try:
+            # id généré ici : le rejeu depuis SQLite réécrit le même document
             reco_ref = user_ref.collection("recommendations").document()
-            reco_data = {
-                "question": question,
-                "answer": answer,
-                "createdAt": fb_firestore.SERVER_TIMESTAMP,
-                "age": profile.get("age"),
-                "weightKg": profile.get("weightKg"),
-                "heightCm": profile.get("heightCm"),
-                "mainGoal": profile.get("mainGoal"),
-                "lang": lang,
-            }
-            reco_ref.set(reco_data)
-            print(f"[RECO] Recommandation enregistrée pour user {req.user_id}.")
+            reco_data = recommendation_doc(question, answer, profile, lang, fp, cached, source)
+            await history_writer.submit(req.user_id, reco_ref.id, reco_data)
         except Exception as e:
             # On log l'erreur, mais on n'empêche pas la réponse au frontend
-            print(f"[RECO] Erreur Firestore en sauvegardant l'historique: {e}")
+            logger.warning("erreur en sauvegardant l'historique", extra={"user_id": req.user_id, "error": repr(e)})
 
     # -------- 5) Retourner la recommandation + le profil --------
-    return {"answer": answer, "profile": profile}
+    return {"answer": answer, "profile": profile, "cached": cached, "source": source}
 
 # -------------------------------------------------------
 # Obtenir l’historique des recommandations IA
+# - pagination par curseur "<createdAt ISO>|<id>" (start_after) :
+#   l'id départage les recommandations de même createdAt
+# - projection : la liste ne lit que les métadonnées,
+#   le texte complet est servi par /reco/history/{user_id}/{reco_id}
+# - ETag sur le corps JSON : If-None-Match → 304 (page en cache : sans
+#   Firestore ni sérialisation) ; revalidation à chaque affichage
 # -------------------------------------------------------
-@app.get("/reco/history/{user_id}")
-async def get_history(user_id: str) -> List[Dict[str, Any]]:
-    """
-    Retourne la liste des recommandations passées d'un utilisateur,
-    triées de la plus récente à la plus ancienne.
-    Si Firestore pose problème, on renvoie simplement une liste vide.
-    """
-    history: List[Dict[str, Any]] = []
+HISTORY_FIELDS = {
+    "question", "answer", "createdAt", "age", "weightKg", "heightCm", "mainGoal", "lang",
+    "fingerprint", "cached", "source",
+}
+HISTORY_LIST_FIELDS = "createdAt,mainGoal,lang"
+
+
+def _encode_history_cursor(item: Dict[str, Any]) -> Optional[str]:
+    created_at = item.get("createdAt")
+    return f"{created_at.isoformat()}|{item['id']}" if isinstance(created_at, datetime) else None
+
 
+def _decode_history_cursor(cursor: str) -> Dict[str, Any]:
     try:
-        user_ref = db.collection("users").document(user_id)
-        docs = (
-            user_ref.collection("recommendations")
-            .order_by("createdAt", direction=fb_firestore.Query.DESCENDING)
-            .stream()
-        )
+        ts, id_ = cursor.rsplit("|", 1)
+        return {"createdAt": datetime.fromisoformat(ts), "__name__": id_}
+    except ValueError:
+        raise HTTPException(400, "invalid cursor")
+
+
+def _parse_fields(fields: str) -> List[str]:
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted - HISTORY_FIELDS
+    if unknown:
+        raise HTTPException(400, f"unknown fields: {', '.join(sorted(unknown))}")
+    # createdAt sert de curseur : toujours lu
+    return sorted(wanted | {"createdAt"})
+
 
-        for d in docs:
+@app.get("/reco/history/{user_id}")
+async def get_history(
+    request: Request,
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: str = HISTORY_LIST_FIELDS,
+) -> Dict[str, Any]:
+    """
+    Retourne une page de recommandations passées d'un utilisateur,
+    triées de la plus récente à la plus ancienne : { items, next_cursor }.
+    `fields` = champs à lire (défaut : date, objectif, langue).
+    Si Firestore pose problème, on renvoie simplement une page vide.
+    """
+    field_list = _parse_fields(fields)
+    key = (user_id, limit, cursor, tuple(field_list))
+    cached = history_cache.get(key)
+    if cached is not None:
+        etag, body = cached
+        return json_response(request, body, etag, "private, no-cache", "reco_history")
+
+    query = (
+        db.collection("users").document(user_id).collection("recommendations")
+        .order_by("createdAt", direction=fb_firestore.Query.DESCENDING)
+        .order_by("__name__", direction=fb_firestore.Query.DESCENDING)
+        .select(field_list)
+    )
+    if cursor:
+        query = query.start_after(_decode_history_cursor(cursor))
+    # un document de plus pour savoir s'il existe une page suivante
+    query = query.limit(limit + 1)
+
+    def fetch() -> List[Dict[str, Any]]:
+        # le stream() itère sur le réseau : on le consomme dans le pool
+        items = []
+        for d in query.stream():
             item = d.to_dict() or {}
             item["id"] = d.id
-            history.append(item)
+            items.append(item)
+        return items
 
+    try:
+        with outbound("firestore", "firestore.stream", path=f"users/{user_id}/recommendations", limit=limit):
+            rows = await run_firestore(fetch)
     except Exception as e:
-        print(f"[RECO] Erreur Firestore get_history pour user {user_id}: {e}")
-        # on retourne quand même une liste vide pour éviter un 500
+        logger.warning("erreur Firestore get_history", extra={"user_id": user_id, "error": repr(e)})
+        # on retourne quand même une page vide pour éviter un 500 (pas mise en cache)
+        return {"items": [], "next_cursor": None}
+
+    page = rows[:limit]
+    next_cursor = _encode_history_cursor(page[-1]) if len(rows) > limit else None
+    body = dumps({"items": page, "next_cursor": next_cursor})
+    etag = make_etag(body)
+    history_cache.set(key, (etag, body))
+    return json_response(request, body, etag, "private, no-cache", "reco_history")
 
-    return history
+# -------------------------------------------------------
+# Détail d’une recommandation (question + réponse complètes)
+# Document écrit une fois : gardé HISTORY_ITEM_MAX_AGE s par le navigateur
+# -------------------------------------------------------
+@app.get("/reco/history/{user_id}/{reco_id}")
+async def get_history_item(request: Request, user_id: str, reco_id: str) -> Dict[str, Any]:
+    ref = db.collection("users").document(user_id).collection("recommendations").document(reco_id)
+    try:
+        with outbound("firestore", "firestore.get", path=ref.path):
+            snap = await run_firestore(ref.get)
+    except Exception as e:
+        logger.warning("erreur Firestore get_history_item", extra={"user_id": user_id, "error": repr(e)})
+        raise HTTPException(503, "history unavailable")
+    if not snap.exists:
+        raise HTTPException(404, "recommendation not found")
+    item = snap.to_dict() or {}
+    item["id"] = snap.id
+    body = dumps(item)
+    return json_response(
+        request, body, make_etag(body), f"private, max-age={HISTORY_ITEM_MAX_AGE}", "reco_history_item",
+    )
 
 # -------------------------------------------------------
 # Modèles pour mesures corporelles (SQLite)
@@ -266,24 +667,151 @@ class MeasurementOut(MeasurementIn):
     id: int
 
 # -------------------------------------------------------
-# Obtenir toutes les mesures pour un utilisateur
+# Obtenir les mesures d'un utilisateur
+# - from / to : bornes incluses (YYYY-MM-DD)
+# - limit + cursor : pagination par curseur "date|id" ; le curseur
+#   de la page suivante est renvoyé dans le header X-Next-Cursor
+# Sans limit : toutes les mesures de l'intervalle (comportement historique)
 # -------------------------------------------------------
+MEASUREMENT_FIELDS = ("weight_kg", "waist_cm", "hips_cm", "chest_cm")
+
+
+def _date_filters(email: str, date_from: Optional[str], date_to: Optional[str]):
+    where, params = ["email=?"], [email.lower()]
+    if date_from:
+        where.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("date <= ?")
+        params.append(date_to)
+    return where, params
+
+
 @app.get("/tracking/measurements", response_model=List[MeasurementOut])
-def get_measurements(email: str = Query(...)):
+def get_measurements(
+    response: Response,
+    email: str = Query(...),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    where, params = _date_filters(email, date_from, date_to)
+    if cursor:
+        try:
+            last_date, last_id = cursor.rsplit("|", 1)
+            params += [last_date, int(last_id)]
+        except ValueError:
+            raise HTTPException(400, "invalid cursor")
+        where.append("(date, id) < (?, ?)")
+
+    sql = f"""
+        SELECT id, date, weight_kg, waist_cm, hips_cm, chest_cm, notes
+        FROM measurements
+        WHERE {' AND '.join(where)}
+        ORDER BY date DESC, id DESC
+    """
+    if limit:
+        # une ligne de plus pour savoir s'il reste une page
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+
     with get_conn() as c:
-        cur = c.cursor()
-        cur.execute(
-            """
-            SELECT id, date, weight_kg, waist_cm, hips_cm, chest_cm, notes
-            FROM measurements
-            WHERE email=?
-            ORDER BY date DESC, id DESC
-            """,
-            (email.lower(),),
-        )
-        rows = [dict(r) for r in cur.fetchall()]
+        rows = [dict(r) for r in c.execute(sql, params).fetchall()]
+
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = f"{rows[-1]['date']}|{rows[-1]['id']}"
     return rows
 
+# -------------------------------------------------------
+# Série réduite pour les graphiques de progression
+# - mode=weekly : moyenne par semaine (lundi) de chaque mesure
+# - mode=lttb : au plus `points` mesures de `field`, choisies
+#   par LTTB pour garder la forme de la courbe
+# Triée de la plus ancienne à la plus récente.
+# -------------------------------------------------------
+@app.get("/tracking/measurements/series")
+def get_measurement_series(
+    email: str = Query(...),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    mode: str = Query("weekly", pattern="^(weekly|lttb)$"),
+    field: str = Query("weight_kg", pattern="^(weight_kg|waist_cm|hips_cm|chest_cm)$"),
+    points: int = Query(300, ge=3, le=5000),
+) -> List[Dict[str, Any]]:
+    where, params = _date_filters(email, date_from, date_to)
+
+    if mode == "weekly":
+        avgs = ", ".join(f"ROUND(AVG({f}), 2) AS {f}" for f in MEASUREMENT_FIELDS)
+        sql = f"""
+            SELECT date(date, 'weekday 0', '-6 days') AS week, COUNT(*) AS count, {avgs}
+            FROM measurements
+            WHERE {' AND '.join(where)}
+            GROUP BY week
+            ORDER BY week
+        """
+        with get_conn() as c:
+            return [dict(r) for r in c.execute(sql, params).fetchall()]
+
+    sql = f"""
+        SELECT date, julianday(date) AS x, {field} AS y
+        FROM measurements
+        WHERE {' AND '.join(where)} AND {field} IS NOT NULL AND julianday(date) IS NOT NULL
+        ORDER BY date, id
+    """
+    with get_conn() as c:
+        rows = c.execute(sql, params).fetchall()
+    kept = lttb([(r["x"], r["y"]) for r in rows], points)
+    return [{"date": rows[i]["date"], field: rows[i]["y"]} for i in kept]
+
+# -------------------------------------------------------
+# Tendances (voir trends.py)
+# - summary : résumé maintenu à chaque ajout (dernières valeurs,
+#   min/max, kg/semaine sur tout l'historique, IMC, taille/hanches)
+# - series : moyennes mobiles sur `window` jours, sur les `days`
+#   derniers jours (jusqu'à la dernière mesure) ou sur from / to
+# - weekly : poids moyen par semaine et variation
+# height_cm (non stocké ici) : nécessaire pour l'IMC
+# -------------------------------------------------------
+def _is_iso_date(value: str) -> bool:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().isoformat() == value
+    except ValueError:
+        return False
+
+
+@app.get("/tracking/measurements/trends")
+def get_measurement_trends(
+    email: str = Query(...),
+    height_cm: Optional[float] = Query(None, gt=50, lt=300),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    days: int = Query(90, ge=7, le=3650),
+    window: int = Query(7, ge=2, le=90),
+) -> Dict[str, Any]:
+    for value in (date_from, date_to):
+        if value is not None and not _is_iso_date(value):
+            raise HTTPException(400, "from / to must be YYYY-MM-DD")
+    email = email.lower()
+    c = get_conn()
+    summary = get_summary(c, email, height_cm)
+    if summary is None:
+        return {"summary": None, "series": [], "weekly": []}
+
+    end = date_to or summary["last_date"]
+    if not _is_iso_date(end):
+        # date enregistrée dans un autre format (données anciennes) : pas une erreur du client
+        logger.warning("date de mesure invalide en base", extra={"email": email, "last_date": end})
+        raise HTTPException(500, "stored measurement date is not YYYY-MM-DD")
+    start = date_from or (datetime.fromisoformat(end) - timedelta(days=days - 1)).date().isoformat()
+    series = get_series(c, email, start, end, window, height_cm)
+    return {
+        "summary": summary,
+        "series": series,
+        "weekly": get_weekly(c, email, start, end),
+    }
+
 # -------------------------------------------------------
 # Ajouter une nouvelle mesure
 # -------------------------------------------------------
@@ -311,11 +839,64 @@ def add_measurement(email: str, body: MeasurementIn):
                 body.notes,
             ),
         )
+        # résumé des tendances mis à jour dans la même transaction
+        apply_measurement(c, email.lower(), body.model_dump())
         c.commit()
         new_id = cur.lastrowid
 
     return {"ok": True, "id": new_id}
 
+# -------------------------------------------------------
+# Import en masse (CSV ou NDJSON) : le corps est lu en streaming
+# et inséré par lots (voir measurements_io.py)
+# -------------------------------------------------------
+@app.post("/tracking/measurements/import")
+async def import_measurements(
+    request: Request,
+    email: str = Query(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+) -> Dict[str, Any]:
+    ctype = request.headers.get("content-type", "")
+    fmt = format or ("ndjson" if "json" in ctype else "csv")
+
+    reader = QueueReader()
+    task = asyncio.create_task(asyncio.to_thread(import_stream, reader, fmt, email))
+    try:
+        async for chunk in request.stream():
+            if task.done():
+                break  # import interrompu (format invalide, trop de lignes)
+            if chunk:
+                await asyncio.to_thread(reader.feed, chunk)
+    finally:
+        await asyncio.to_thread(reader.close_feed)
+    result = await task
+
+    logger.info("import de mesures", extra={"format": fmt, **{k: v for k, v in result.items() if k != "errors"}})
+    if "aborted" in result:
+        raise HTTPException(400, result)
+    return result
+
+# -------------------------------------------------------
+# Export en streaming (CSV ou NDJSON), ordre chronologique
+# -------------------------------------------------------
+@app.get("/tracking/measurements/export")
+def export_measurements(
+    email: str = Query(...),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+):
+    rows = iter_measurements(email, date_from, date_to)
+    if format == "csv":
+        body, media_type = export_csv(rows), "text/csv; charset=utf-8"
+    else:
+        body, media_type = export_ndjson(rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="measurements.{format}"'},
+    )
+
 # -------------------------------------------------------
 # Exécuter le service directement (mode local)
 # -------------------------------------------------------
@@ -0,0 +1,284 @@
+# services/reco_service_fastapi/app/measurements_io.py
+
+# -------------------------------------------------------
+# Import / export en masse des mesures (CSV ou NDJSON)
+# - import : le corps de la requête est lu par morceaux et passé
+#   à un thread via une file bornée ; le thread parse ligne par ligne
+#   (csv.reader / json.loads), valide, et insère par lots avec
+#   executemany dans une table TEMP de la connexion → mémoire constante,
+#   sans tenir le verrou d'écriture de tracking.db pendant l'envoi
+# - fin de l'import : une seule transaction copie les lignes dans
+#   `measurements` en ignorant celles déjà présentes (mêmes date et
+#   valeurs) → tout ou rien, et réimporter le même fichier n'ajoute rien
+# - export : générateur paginé (date, id) sur l'index, lot par lot
+#
+# Colonnes : date, weight_kg, waist_cm, hips_cm, chest_cm, notes
+# -------------------------------------------------------
+import csv
+import io
+import json
+import os
+import queue
+from datetime import date as date_type
+from typing import Any, Dict, Iterator, List, Optional
+
+from .tracking_db import get_conn
+from .trends import rebuild_summary
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "100000"))
+EXPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 50
+NOTES_MAX_LEN = 1000
+
+COLUMNS = ("date", "weight_kg", "waist_cm", "hips_cm", "chest_cm", "notes")
+NUMERIC = ("weight_kg", "waist_cm", "hips_cm", "chest_cm")
+
+
+class ImportAborted(ValueError):
+    """Erreur bloquante (format, taille) : l'import s'arrête."""
+
+
+# =======================================================
+#                 Lecture du corps en streaming
+# =======================================================
+class QueueReader(io.RawIOBase):
+    """
+    Flux binaire alimenté par la boucle asyncio (feed / close) et lu
+    de façon bloquante par le thread d'import. La file est bornée :
+    si l'insertion prend du retard, la lecture du corps attend.
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._buffer = b""
+        self._eof = False
+
+    def feed(self, chunk: Optional[bytes]) -> None:
+        # le lecteur a abandonné (drain) : on ne bloque pas le producteur
+        while not self._eof:
+            try:
+                self._queue.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def close_feed(self) -> None:
+        self.feed(None)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer and not self._eof:
+            chunk = self._queue.get()
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer = chunk
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def drain(self) -> None:
+        """Vide la file (import interrompu) pour débloquer le producteur."""
+        self._eof = True
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+# =======================================================
+#                 Validation
+# =======================================================
+def _number(value: Any, field: str) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        number = float(str(value).replace(",", "."))
+    except ValueError:
+        raise ValueError(f"{field}: not a number")
+    if not 0 < number < 1000:
+        raise ValueError(f"{field}: out of range")
+    return number
+
+
+def validate_row(raw: Dict[str, Any], email: str) -> tuple:
+    day = (raw.get("date") or "").strip() if isinstance(raw.get("date"), str) else raw.get("date")
+    if not day:
+        raise ValueError("date is required")
+    try:
+        day = date_type.fromisoformat(str(day)[:10]).isoformat()
+    except ValueError:
+        raise ValueError("date must be YYYY-MM-DD")
+    values = [_number(raw.get(f), f) for f in NUMERIC]
+    notes = raw.get("notes")
+    notes = str(notes)[:NOTES_MAX_LEN] if notes not in (None, "") else None
+    return (email, day, *values, notes)
+
+
+# =======================================================
+#                 Import
+# =======================================================
+def _csv_records(text: io.TextIOBase) -> Iterator[tuple]:
+    reader = csv.DictReader(text)
+    if not reader.fieldnames or "date" not in [f.strip() for f in reader.fieldnames]:
+        raise ImportAborted("CSV header must contain a 'date' column")
+    reader.fieldnames = [f.strip() for f in reader.fieldnames]
+    for record in reader:
+        yield reader.line_num, record
+
+
+def _ndjson_records(text: io.TextIOBase) -> Iterator[tuple]:
+    for line_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_no, None
+            continue
+        yield line_no, record if isinstance(record, dict) else None
+
+
+_FIELDS = "email, date, weight_kg, waist_cm, hips_cm, chest_cm, notes"
+
+
+def _stage(rows: List[tuple]) -> None:
+    with get_conn() as c:
+        c.executemany(f"INSERT INTO temp.import_staging({_FIELDS}) VALUES(?,?,?,?,?,?,?)", rows)
+
+
+def _publish(email: str) -> int:
+    """Copie les lignes préparées dans `measurements` (une transaction) ; retourne le nombre ajouté."""
+    with get_conn() as c:
+        added = c.execute(
+            f"""
+            INSERT INTO measurements({_FIELDS})
+            SELECT DISTINCT {_FIELDS} FROM temp.import_staging s
+            WHERE NOT EXISTS (
+              SELECT 1 FROM measurements m
+              WHERE m.email = s.email AND m.date = s.date
+                AND m.weight_kg IS s.weight_kg AND m.waist_cm IS s.waist_cm
+                AND m.hips_cm IS s.hips_cm AND m.chest_cm IS s.chest_cm
+                AND m.notes IS s.notes
+            )
+            """
+        ).rowcount
+        if added:
+            # un recalcul après le lot plutôt qu'une mise à jour par ligne
+            rebuild_summary(c, email)
+    return added
+
+
+def import_stream(reader: QueueReader, fmt: str, email: str) -> Dict[str, Any]:
+    """
+    Parse et insère depuis `reader` (appel bloquant : à lancer dans un thread).
+    Les lignes invalides sont ignorées et signalées ; une erreur bloquante
+    annule tout l'import (imported = 0). `duplicates` : lignes valides
+    déjà présentes en base, non réinsérées.
+    """
+    text = io.TextIOWrapper(io.BufferedReader(reader), encoding="utf-8-sig", newline="")
+    records = _csv_records(text) if fmt == "csv" else _ndjson_records(text)
+    email = email.lower()
+    conn = get_conn()
+    # table propre à la connexion (donc au thread) : imports concurrents isolés
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS import_staging({_FIELDS})")
+    with conn:
+        conn.execute("DELETE FROM temp.import_staging")
+
+    staged, skipped, errors = 0, 0, []
+    chunk: List[tuple] = []
+    try:
+        for line_no, record in records:
+            if staged + len(chunk) >= IMPORT_MAX_ROWS:
+                raise ImportAborted(f"too many rows (max {IMPORT_MAX_ROWS})")
+            try:
+                if record is None:
+                    raise ValueError("invalid JSON object")
+                chunk.append(validate_row(record, email))
+            except ValueError as e:
+                skipped += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_no, "error": str(e)})
+                continue
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                _stage(chunk)
+                staged += len(chunk)
+                chunk = []
+        if chunk:
+            _stage(chunk)
+            staged += len(chunk)
+        imported = _publish(email) if staged else 0
+    except (ImportAborted, csv.Error, UnicodeDecodeError) as e:
+        return {"imported": 0, "skipped": skipped, "errors": errors, "aborted": str(e)}
+    finally:
+        reader.drain()
+        with conn:
+            conn.execute("DELETE FROM temp.import_staging")
+    return {"imported": imported, "duplicates": staged - imported, "skipped": skipped, "errors": errors}
+
+
+# =======================================================
+#                 Export
+# =======================================================
+def iter_measurements(email: str, date_from: Optional[str], date_to: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Toutes les mesures (ordre chronologique), lues par lots de EXPORT_BATCH_SIZE."""
+    last: Optional[tuple] = None
+    while True:
+        where, params = ["email=?"], [email.lower()]
+        if date_from:
+            where.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("date <= ?")
+            params.append(date_to)
+        if last:
+            where.append("(date, id) > (?, ?)")
+            params += list(last)
+        # chaque lot est une requête courte : le générateur peut changer
+        # de thread entre deux lots (StreamingResponse), pas la connexion
+        with get_conn() as c:
+            rows = c.execute(
+                f"""
+                SELECT id, {', '.join(COLUMNS)} FROM measurements
+                WHERE {' AND '.join(where)}
+                ORDER BY date, id LIMIT ?
+                """,
+                params + [EXPORT_BATCH_SIZE],
+            ).fetchall()
+        if not rows:
+            return
+        for r in rows:
+            yield dict(r)
+        last = (rows[-1]["date"], rows[-1]["id"])
+
+
+def export_csv(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    n = 0
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in COLUMNS])
+        n += 1
+        if n % 500 == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def export_ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({c: row[c] for c in COLUMNS}, ensure_ascii=False))
+        if len(lines) == 500:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,258 @@
+# services/reco_service_fastapi/app/memory_firestore.py
+
+# -------------------------------------------------------
+# Firestore "en mémoire" (stand-in local)
+# Implémente le sous-ensemble de l'API google-cloud-firestore
+# utilisé par le service reco : collection / document / get /
+# set / stream / order_by / limit / start_after / select /
+# on_snapshot / batch + SERVER_TIMESTAMP.
+# Activé avec FIRESTORE_BACKEND=memory (tests, benchmark, dev).
+# FIRESTORE_MEMORY_LATENCY_MS simule la latence d'un RPC (appel
+# bloquant, comme le SDK synchrone).
+# -------------------------------------------------------
+import os
+import threading
+import time
+import uuid
+from copy import deepcopy
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+# Sentinelle remplacée par l'heure courante à l'écriture
+SERVER_TIMESTAMP = object()
+
+LATENCY_S = float(os.getenv("FIRESTORE_MEMORY_LATENCY_MS", "0")) / 1000
+
+
+def _rpc_delay() -> None:
+    if LATENCY_S > 0:
+        time.sleep(LATENCY_S)
+
+
+def _field(doc_id: str, data: Dict[str, Any], field: str) -> Any:
+    """Valeur d'un champ ; "__name__" = identifiant du document (FieldPath.document_id())."""
+    return doc_id if field == "__name__" else data.get(field)
+
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, client: "Client", path: str, orders=None, limit_n=None,
+                 start_after=None, fields=None):
+        self._client = client
+        self._path = path
+        self._orders: List[tuple] = list(orders or [])
+        self._limit = limit_n
+        self._start_after: Optional[Dict[str, Any]] = start_after
+        self._fields: Optional[List[str]] = fields
+
+    def _copy(self, **changes) -> "Query":
+        opts = dict(orders=self._orders, limit_n=self._limit,
+                    start_after=self._start_after, fields=self._fields)
+        opts.update(changes)
+        return Query(self._client, self._path, **opts)
+
+    def order_by(self, field: str, direction: str = ASCENDING) -> "Query":
+        return self._copy(orders=self._orders + [(field, direction)])
+
+    def limit(self, n: int) -> "Query":
+        return self._copy(limit_n=n)
+
+    def start_after(self, values: Dict[str, Any]) -> "Query":
+        """Curseur : valeurs des champs de order_by du dernier document lu."""
+        return self._copy(start_after=dict(values))
+
+    def select(self, field_paths: List[str]) -> "Query":
+        return self._copy(fields=list(field_paths))
+
+    def _is_after_cursor(self, doc_id: str, data: Dict[str, Any]) -> bool:
+        for field, direction in self._orders:
+            if field not in self._start_after:
+                break
+            value, cursor = _field(doc_id, data, field), self._start_after[field]
+            if value == cursor:
+                continue
+            if value is None or cursor is None:
+                return value is None
+            return value < cursor if direction == Query.DESCENDING else value > cursor
+        return False
+
+    def stream(self) -> Iterator["DocumentSnapshot"]:
+        _rpc_delay()
+        with self._client._lock:
+            items = [
+                (doc_id, deepcopy(data))
+                for doc_id, data in self._client._store.get(self._path, {}).items()
+            ]
+
+        # tri stable : on applique les critères du dernier au premier
+        for field, direction in reversed(self._orders):
+            present = [it for it in items if _field(*it, field) is not None]
+            missing = [it for it in items if _field(*it, field) is None]
+            present.sort(key=lambda it: _field(*it, field), reverse=direction == Query.DESCENDING)
+            items = present + missing
+
+        if self._start_after is not None:
+            items = [it for it in items if self._is_after_cursor(*it)]
+        if self._fields is not None:
+            items = [(doc_id, {k: v for k, v in data.items() if k in self._fields}) for doc_id, data in items]
+        if self._limit is not None:
+            items = items[: self._limit]
+
+        for doc_id, data in items:
+            ref = DocumentReference(self._client, self._path, doc_id)
+            yield DocumentSnapshot(ref, data)
+
+    def get(self) -> List["DocumentSnapshot"]:
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, client: "Client", path: str):
+        super().__init__(client, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> "DocumentReference":
+        return DocumentReference(self._client, self._path, document_id or uuid.uuid4().hex[:20])
+
+    def on_snapshot(self, callback) -> "Watch":
+        """
+        callback(docs, changes, read_time) comme google-cloud-firestore :
+        appelé une fois avec l'état initial, puis à chaque écriture.
+        """
+        with self._client._lock:
+            self._client._watchers.setdefault(self._path, []).append(callback)
+        docs = self.get()
+        callback(docs, [DocumentChange("ADDED", d) for d in docs], datetime.now(timezone.utc))
+        return Watch(self._client, self._path, callback)
+
+
+class DocumentChange:
+    def __init__(self, type_name: str, document: "DocumentSnapshot"):
+        self.type = ChangeType(type_name)
+        self.document = document
+
+
+class ChangeType:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class Watch:
+    def __init__(self, client: "Client", path: str, callback):
+        self._client = client
+        self._path = path
+        self._callback = callback
+
+    def unsubscribe(self) -> None:
+        with self._client._lock:
+            watchers = self._client._watchers.get(self._path, [])
+            if self._callback in watchers:
+                watchers.remove(self._callback)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class DocumentReference:
+    def __init__(self, client: "Client", collection_path: str, document_id: str):
+        self._client = client
+        self._collection_path = collection_path
+        self.id = document_id
+        self.path = f"{collection_path}/{document_id}"
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self) -> DocumentSnapshot:
+        _rpc_delay()
+        with self._client._lock:
+            data = self._client._store.get(self._collection_path, {}).get(self.id)
+            return DocumentSnapshot(self, deepcopy(data))
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        _rpc_delay()
+        self._write(data, merge)
+
+    def _write(self, data: Dict[str, Any], merge: bool) -> None:
+        now = datetime.now(timezone.utc)
+        values = {k: (now if v is SERVER_TIMESTAMP else deepcopy(v)) for k, v in data.items()}
+        with self._client._lock:
+            docs = self._client._store.setdefault(self._collection_path, {})
+            change = "MODIFIED" if self.id in docs else "ADDED"
+            if merge and self.id in docs:
+                docs[self.id].update(values)
+            else:
+                docs[self.id] = values
+            data = deepcopy(docs[self.id])
+        self._client._notify(self._collection_path, change, DocumentSnapshot(self, data))
+
+    def update(self, data: Dict[str, Any]) -> None:
+        with self._client._lock:
+            if self.id not in self._client._store.get(self._collection_path, {}):
+                raise KeyError(f"No document to update: {self.path}")
+        self.set(data, merge=True)
+
+    def delete(self) -> None:
+        _rpc_delay()
+        with self._client._lock:
+            data = self._client._store.get(self._collection_path, {}).pop(self.id, None)
+        if data is not None:
+            self._client._notify(self._collection_path, "REMOVED", DocumentSnapshot(self, data))
+
+
+class WriteBatch:
+    """Écritures groupées : un seul aller-retour au commit()."""
+
+    def __init__(self, client: "Client"):
+        self._client = client
+        self._writes: List[tuple] = []
+
+    def set(self, reference: DocumentReference, data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append((reference, data, merge))
+
+    def commit(self) -> None:
+        _rpc_delay()
+        with self._client._lock:
+            for reference, data, merge in self._writes:
+                reference._write(data, merge)
+        self._writes = []
+
+
+class Client:
+    def __init__(self):
+        self._lock = threading.RLock()
+        # { "users" : { "<id>": {...} }, "users/<id>/recommendations": {...} }
+        self._store: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._watchers: Dict[str, list] = {}
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def _notify(self, path: str, change: str, snapshot: DocumentSnapshot) -> None:
+        with self._lock:
+            callbacks = list(self._watchers.get(path, []))
+        for cb in callbacks:
+            cb([snapshot], [DocumentChange(change, snapshot)], datetime.now(timezone.utc))
+
+
+def client() -> Client:
+    return Client()
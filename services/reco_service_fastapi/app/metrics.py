@@ -0,0 +1,292 @@
+# app/metrics.py
+
+# -------------------------------------------------------
+# Métriques au format Prometheus (texte), sans dépendance
+# Module identique dans les 4 services (auth, sports, reco, chatbot) :
+# - middleware ASGI : nombre de requêtes, latence (histogramme),
+#   requêtes en cours et erreurs, par route
+# - track_outbound() : durée des appels sortants (HF, OpenAI,
+#   Firestore, SMTP, chatbot…)
+# - instrument_sqlalchemy() / TimedConnection : durée des requêtes SQL
+# - endpoint GET /metrics
+# Copies vérifiées par services/check_shared_modules.py (--sync pour les réaligner).
+# -------------------------------------------------------
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+# Buckets Prometheus par défaut + 30 s / 60 s pour les appels LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# =======================================================
+#                 Types de métriques
+# =======================================================
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_fmt_labels(self.labels, k)} {v}" for k, v in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # { labels : [compteurs par bucket..., somme, total] }
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            row = self._values.get(label_values)
+            if row is None:
+                row = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self._header()
+        for k, row in items:
+            cumulative = 0
+            for i, b in enumerate(self.buckets):
+                cumulative += row[i]
+                le = 'le="%s"' % b
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, le)} {row[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, k)} {row[-2]}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, k)} {row[-1]}")
+        return lines
+
+
+# =======================================================
+#                 Registre des métriques du service
+# =======================================================
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Nombre de requêtes HTTP traitées.", ("method", "route", "status")
+)
+HTTP_ERRORS = Counter(
+    "http_request_errors_total", "Requêtes terminées en erreur serveur (5xx ou exception).", ("method", "route")
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latence des requêtes HTTP.", ("method", "route")
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requêtes HTTP en cours.", ("method", "route")
+)
+OUTBOUND_LATENCY = Histogram(
+    "outbound_request_duration_seconds", "Durée des appels sortants (LLM, Firestore, SMTP…).", ("target",)
+)
+OUTBOUND_ERRORS = Counter(
+    "outbound_request_errors_total", "Appels sortants en erreur.", ("target",)
+)
+DB_LATENCY = Histogram(
+    "db_query_duration_seconds", "Durée des requêtes SQL.", ("db", "operation")
+)
+
+REGISTRY = [
+    HTTP_REQUESTS, HTTP_ERRORS, HTTP_LATENCY, HTTP_IN_PROGRESS,
+    OUTBOUND_LATENCY, OUTBOUND_ERRORS, DB_LATENCY,
+]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# =======================================================
+#                 Appels sortants et SQL
+# =======================================================
+@contextmanager
+def track_outbound(target: str):
+    """
+    Mesure un appel sortant :
+        with track_outbound("hf_router"):
+            resp = await client.post(...)
+    Une exception est comptée comme erreur puis relancée.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        OUTBOUND_ERRORS.inc(target)
+        raise
+    finally:
+        OUTBOUND_LATENCY.observe(time.perf_counter() - t0, target)
+
+
+def _sql_operation(statement: str) -> str:
+    words = (statement or "").lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def instrument_sqlalchemy(engine, db_name: str) -> None:
+    """Chronomètre chaque requête d'un moteur SQLAlchemy."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        t0 = conn.info["_metrics_t0"].pop()
+        DB_LATENCY.observe(time.perf_counter() - t0, db_name, _sql_operation(statement))
+
+
+class TimedCursor(sqlite3.Cursor):
+    db_name = "sqlite"
+
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            DB_LATENCY.observe(time.perf_counter() - t0, self.db_name, _sql_operation(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            DB_LATENCY.observe(time.perf_counter() - t0, self.db_name, _sql_operation(sql))
+
+
+class TimedConnection(sqlite3.Connection):
+    """
+    Connexion sqlite3 chronométrée :
+        sqlite3.connect(path, factory=timed_connection("tracking"))
+    """
+
+    cursor_class = TimedCursor
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or self.cursor_class)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def timed_connection(db_name: str):
+    cursor_cls = type(f"TimedCursor_{db_name}", (TimedCursor,), {"db_name": db_name})
+    return type(f"TimedConnection_{db_name}", (TimedConnection,), {"cursor_class": cursor_cls})
+
+
+# =======================================================
+#                 Middleware HTTP + endpoint /metrics
+# =======================================================
+class MetricsMiddleware:
+    """
+    Middleware ASGI pur (pas de BaseHTTPMiddleware : pas de tâche
+    supplémentaire par requête). La route est le modèle de chemin
+    (ex: /reco/history/{user_id}) pour garder une cardinalité faible.
+    """
+
+    def __init__(self, app, fastapi_app=None):
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    def _route(self, scope) -> str:
+        routes = self.fastapi_app.router.routes if self.fastapi_app is not None else []
+        for route in routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "<unmatched>"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = self._route(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc(method, route)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_LATENCY.observe(time.perf_counter() - t0, method, route)
+            HTTP_IN_PROGRESS.dec(method, route)
+            HTTP_REQUESTS.inc(method, route, str(status["code"]))
+            if status["code"] >= 500:
+                HTTP_ERRORS.inc(method, route)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def setup_metrics(app) -> None:
+    """Ajoute le middleware de métriques et la route GET /metrics."""
+    app.add_middleware(MetricsMiddleware, fastapi_app=app)
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
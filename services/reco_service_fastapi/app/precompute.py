@@ -0,0 +1,201 @@
+# services/reco_service_fastapi/app/precompute.py
+
+# -------------------------------------------------------
+# Pré-calcul des recommandations IA pour tous les utilisateurs
+# - lit les profils `users/*` dans Firestore
+# - regroupe les profils identiques (même empreinte question + langue)
+#   → un seul appel au chatbot par groupe
+# - réutilise les réponses encore fraîches de reco_cache (sauf --force)
+# - appels au chatbot : concurrence bornée + limite de débit
+# - écritures Firestore par WriteBatch (historique + reco_cache) ;
+#   id d'historique déterministe (<empreinte>-<AAAAMMJJ>) : relancer le
+#   batch le même jour réécrit les documents au lieu de les dupliquer
+# - rapport final : débit, appels LLM, écritures validées, échecs
+#
+# Exécution manuelle :
+#   python -m app.precompute --concurrency 4 --rate 2
+# Tous les matins (cron, depuis le dossier du service) :
+#   0 5 * * *  cd services/reco_service_fastapi && python -m app.precompute
+# -------------------------------------------------------
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .firebase_client import db, fb_firestore, run_firestore
+from .main import (
+    PROFILE_FIELDS, build_question, call_chatbot, close_chatbot_client,
+    profile_from_doc, recommendation_doc, trend_email,
+)
+from . import reco_cache
+
+# Firestore limite un WriteBatch à 500 écritures
+BATCH_LIMIT = 500
+
+
+class RateLimiter:
+    """Espace les appels : au plus `rate` par seconde (0 = illimité)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _load_users(limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+    query = db.collection("users").select(PROFILE_FIELDS)
+    if limit:
+        query = query.limit(limit)
+    return [(d.id, d.to_dict() or {}) for d in query.stream()]
+
+
+def _commit(writes: List[Tuple[Any, Dict[str, Any], bool]]) -> Tuple[int, Optional[str]]:
+    """
+    Écrit les lots l'un après l'autre ; s'arrête au premier échec.
+    Retourne (écritures validées, erreur) : les lots précédents restent écrits.
+    """
+    committed = 0
+    for i in range(0, len(writes), BATCH_LIMIT):
+        chunk = writes[i:i + BATCH_LIMIT]
+        batch = db.batch()
+        for ref, data, _ in chunk:
+            batch.set(ref, data)
+        try:
+            batch.commit()
+        except Exception as e:
+            return committed, repr(e)
+        committed += len(chunk)
+    return committed, None
+
+
+async def precompute(concurrency: int = 4, rate: float = 2.0, force: bool = False, limit: int = 0) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    users = await run_firestore(_load_users, limit)
+
+    # -------- 1) Regrouper les profils identiques --------
+    # même question que /reco/generate (évolution des mesures comprise),
+    # sinon les réponses pré-calculées ne seraient jamais retrouvées
+    profiles = [profile_from_doc(data) for _, data in users]
+    questions = await asyncio.gather(*(
+        build_question(profile, trend_email(user_id)) for (user_id, _), profile in zip(users, profiles)
+    ))
+    groups: Dict[str, Dict[str, Any]] = {}
+    for (user_id, _), profile, question in zip(users, profiles, questions):
+        lang = (profile.get("lang") or "fr").lower()
+        fp = reco_cache.fingerprint(question, lang)
+        group = groups.setdefault(fp, {"question": question, "lang": lang, "members": []})
+        group["members"].append((user_id, profile))
+
+    # -------- 2) Une réponse par groupe (cache ou chatbot) --------
+    sem = asyncio.Semaphore(max(1, concurrency))
+    limiter = RateLimiter(rate)
+    stats = {"llm_calls": 0, "reused": 0, "failed_groups": 0}
+
+    async def answer_group(fp: str, group: Dict[str, Any]) -> None:
+        if not force:
+            cached = await reco_cache.lookup(fp)
+            if cached:
+                group["answer"], group["cached"] = cached, True
+                stats["reused"] += 1
+                return
+        async with sem:
+            await limiter.wait()
+            stats["llm_calls"] += 1
+            answer = await call_chatbot(group["question"], group["lang"])
+        if answer:
+            group["answer"], group["cached"] = answer, False
+        else:
+            stats["failed_groups"] += 1
+
+    await asyncio.gather(*(answer_group(fp, g) for fp, g in groups.items()))
+
+    # -------- 3) Écritures groupées --------
+    # (référence, données, document d'historique d'un utilisateur ?)
+    writes: List[Tuple[Any, Dict[str, Any], bool]] = []
+    day = datetime.now(timezone.utc).strftime("%Y%m%d")
+    failed_users = 0
+    for fp, group in groups.items():
+        answer = group.get("answer")
+        if not answer:
+            failed_users += len(group["members"])
+            continue
+        if not group["cached"]:
+            writes.append((
+                db.collection(reco_cache.RECO_CACHE_COLLECTION).document(fp),
+                {"answer": answer, "lang": group["lang"], "createdAt": fb_firestore.SERVER_TIMESTAMP},
+                False,
+            ))
+        for user_id, profile in group["members"]:
+            doc = recommendation_doc(group["question"], answer, profile, group["lang"], fp, group["cached"])
+            doc["precomputed"] = True
+            ref = db.collection("users").document(user_id).collection("recommendations").document(f"{fp}-{day}")
+            writes.append((ref, doc, True))
+
+    committed, write_error = await run_firestore(_commit, writes)
+
+    duration = time.perf_counter() - t0
+    # utilisateurs dont l'historique est réellement écrit
+    done = sum(1 for _, _, is_history in writes[:committed] if is_history)
+    return {
+        "users": len(users),
+        "fingerprints": len(groups),
+        "llm_calls": stats["llm_calls"],
+        "reused": stats["reused"],
+        "failed_groups": stats["failed_groups"],
+        "failed_users": failed_users,
+        "writes": committed,
+        "writes_planned": len(writes),
+        "users_written": done,
+        "write_error": write_error,
+        "duration_s": round(duration, 2),
+        "users_per_s": round(done / duration, 2) if duration else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-calcule une recommandation IA pour chaque utilisateur.")
+    parser.add_argument("--concurrency", type=int, default=4, help="appels simultanés au chatbot")
+    parser.add_argument("--rate", type=float, default=2.0, help="appels chatbot par seconde (0 = illimité)")
+    parser.add_argument("--force", action="store_true", help="ignorer reco_cache et rappeler le LLM")
+    parser.add_argument("--limit", type=int, default=0, help="nombre max d'utilisateurs (0 = tous)")
+    parser.add_argument("--json", action="store_true", help="rapport au format JSON")
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            return await precompute(args.concurrency, args.rate, args.force, args.limit)
+        finally:
+            await close_chatbot_client()
+
+    report = asyncio.run(run())
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+        return
+    print(
+        f"✅ {report['users']} utilisateurs, {report['fingerprints']} profils distincts, "
+        f"{report['llm_calls']} appels LLM, {report['reused']} réponses réutilisées "
+        f"en {report['duration_s']} s ({report['users_per_s']} utilisateurs/s)"
+    )
+    if report["failed_users"] or report["write_error"]:
+        print(f"⚠️  {report['failed_groups']} groupes en échec ({report['failed_users']} utilisateurs), "
+              f"{report['writes']}/{report['writes_planned']} écritures validées "
+              f"({report['users_written']} utilisateurs), erreur d'écriture : {report['write_error']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
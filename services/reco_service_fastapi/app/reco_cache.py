@@ -0,0 +1,94 @@
+# services/reco_service_fastapi/app/reco_cache.py
+
+# -------------------------------------------------------
+# Cache des recommandations IA par empreinte de profil
+# - empreinte = sha256(question construite depuis le profil + langue)
+#   → deux profils identiques (ex: le profil par défaut partagé
+#   par tous les nouveaux utilisateurs) donnent la même clé
+# - niveau 1 : TTLCache en mémoire du worker
+# - niveau 2 : collection Firestore `reco_cache/{empreinte}`
+#   partagée entre les instances
+# - une réponse plus vieille que RECO_CACHE_MAX_AGE_HOURS est
+#   régénérée par le LLM
+# -------------------------------------------------------
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from .cache import TTLCache
+from .firebase_client import db, fb_firestore, run_firestore
+from .tracing import outbound
+
+RECO_CACHE_ENABLED = os.getenv("RECO_CACHE_ENABLED", "true").lower() == "true"
+RECO_CACHE_MAX_AGE_HOURS = float(os.getenv("RECO_CACHE_MAX_AGE_HOURS", "168"))
+RECO_CACHE_SIZE = int(os.getenv("RECO_CACHE_SIZE", "5000"))
+RECO_CACHE_COLLECTION = "reco_cache"
+
+logger = logging.getLogger("reco.cache")
+
+_local = TTLCache("reco", RECO_CACHE_SIZE, RECO_CACHE_MAX_AGE_HOURS * 3600)
+_pending_writes: set = set()
+
+
+def fingerprint(question: str, lang: str) -> str:
+    return hashlib.sha256(f"{lang}\n{question}".encode("utf-8")).hexdigest()[:32]
+
+
+def _age_seconds(created_at) -> Optional[float]:
+    if not isinstance(created_at, datetime):
+        return None
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created_at).total_seconds()
+
+
+async def lookup(fp: str) -> Optional[str]:
+    """Réponse en cache encore fraîche, ou None (erreurs Firestore ignorées)."""
+    if not RECO_CACHE_ENABLED:
+        return None
+    answer = _local.get(fp)
+    if answer is not None:
+        return answer
+
+    ref = db.collection(RECO_CACHE_COLLECTION).document(fp)
+    try:
+        with outbound("firestore", "firestore.get", path=ref.path):
+            snap = await run_firestore(ref.get)
+    except Exception as e:
+        logger.warning("erreur Firestore (cache reco)", extra={"fingerprint": fp, "error": repr(e)})
+        return None
+    if not snap.exists:
+        return None
+
+    data = snap.to_dict() or {}
+    age = _age_seconds(data.get("createdAt"))
+    max_age = RECO_CACHE_MAX_AGE_HOURS * 3600
+    if not data.get("answer") or age is None or age > max_age:
+        return None
+    # le cache local expire en même temps que le document Firestore
+    _local.set(fp, data["answer"], ttl=max_age - age)
+    return data["answer"]
+
+
+def store(fp: str, answer: str, lang: str) -> None:
+    """Mémorise la réponse (mémoire tout de suite, Firestore en arrière-plan)."""
+    if not RECO_CACHE_ENABLED:
+        return
+    _local.set(fp, answer)
+    task = asyncio.create_task(_store_remote(fp, answer, lang))
+    # garder une référence : sinon la tâche peut être collectée en cours de route
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+async def _store_remote(fp: str, answer: str, lang: str) -> None:
+    ref = db.collection(RECO_CACHE_COLLECTION).document(fp)
+    data = {"answer": answer, "lang": lang, "createdAt": fb_firestore.SERVER_TIMESTAMP}
+    try:
+        with outbound("firestore", "firestore.set", path=ref.path):
+            await run_firestore(ref.set, data)
+    except Exception as e:
+        logger.warning("erreur Firestore en écrivant le cache reco", extra={"fingerprint": fp, "error": repr(e)})
@@ -0,0 +1,48 @@
+# services/reco_service_fastapi/app/series.py
+
+# -------------------------------------------------------
+# Réduction de séries temporelles pour les graphiques
+# LTTB (Largest-Triangle-Three-Buckets, S. Steinarsson 2013) :
+# garde `threshold` points en conservant la forme de la courbe
+# (pics, creux), contrairement à un simple échantillonnage.
+# -------------------------------------------------------
+from typing import List, Sequence, Tuple
+
+Point = Tuple[float, float]
+
+
+def lttb(points: Sequence[Point], threshold: int) -> List[int]:
+    """
+    Retourne les indices des points conservés (triés, premier et
+    dernier toujours inclus). `points` = [(x, y)] triés par x.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    kept = [0]
+    bucket = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # moyenne du seau suivant (3e sommet du triangle)
+        nxt_start = int((i + 1) * bucket) + 1
+        nxt_end = min(int((i + 2) * bucket) + 1, n)
+        span = points[nxt_start:nxt_end] or [points[-1]]
+        avg_x = sum(p[0] for p in span) / len(span)
+        avg_y = sum(p[1] for p in span) / len(span)
+
+        # point du seau courant formant le plus grand triangle
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+
+    kept.append(n - 1)
+    return kept
@@ -0,0 +1,349 @@
+# app/tracing.py
+
+# -------------------------------------------------------
+# Traçage distribué minimal (W3C Trace Context), sans dépendance
+# Module identique dans reco et chatbot :
+# - middleware ASGI : lit le header `traceparent` entrant, ouvre
+#   un span serveur et renvoie `traceparent` dans la réponse
+# - start_span() / outbound() : spans internes (Firestore, SQL, LLM…)
+# - traceparent() / inject() : header à propager vers nos autres
+#   services uniquement (jamais vers OpenAI, HF…)
+# - exporteurs locaux (désactivés par défaut) : mémoire ou fichier
+#   JSONL partagé entre services (TRACE_FILE)
+# - GET /traces/{trace_id} : sans authentification, monté seulement
+#   si TRACE_ENDPOINTS=1 (debug local)
+#
+# Lecture d'une trace de bout en bout depuis le fichier :
+#   python -m app.tracing traces.jsonl <trace_id>
+# Copies vérifiées par services/check_shared_modules.py (--sync pour les réaligner).
+# -------------------------------------------------------
+import contextvars
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from .metrics import TimedConnection, TimedCursor, track_outbound
+
+# -------------------------------------------------------
+# Configuration
+# -------------------------------------------------------
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").strip().lower()  # memory | file | none
+TRACE_ENDPOINTS = os.getenv("TRACE_ENDPOINTS", "0").strip().lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", "./traces.jsonl")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "5000"))
+
+SERVICE_NAME = "unknown"
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+# =======================================================
+#                 Exporteurs
+# =======================================================
+class MemoryExporter:
+    def __init__(self, size: int):
+        self._spans: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            spans = [s for s in self._spans if s["trace_id"] == trace_id]
+        return sorted(spans, key=lambda s: s["start_ns"])
+
+    def recent_roots(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            roots = [s for s in self._spans if s["kind"] == "server"]
+        return roots[-limit:][::-1]
+
+
+class FileExporter(MemoryExporter):
+    """Garde aussi un tampon mémoire pour GET /traces (TRACE_ENDPOINTS=1)."""
+
+    def __init__(self, path: str, size: int):
+        super().__init__(size)
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def export(self, span: Dict[str, Any]) -> None:
+        super().export(span)
+        line = json.dumps(span, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+
+if TRACE_EXPORTER == "file":
+    EXPORTER: Optional[MemoryExporter] = FileExporter(TRACE_FILE, TRACE_BUFFER_SIZE)
+elif TRACE_EXPORTER == "memory":
+    EXPORTER = MemoryExporter(TRACE_BUFFER_SIZE)
+else:
+    EXPORTER = None
+
+
+# =======================================================
+#                 Spans
+# =======================================================
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "attributes",
+                 "status", "start_ns", "_t0", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter()
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        if EXPORTER is None:
+            return
+        EXPORTER.export({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "service": SERVICE_NAME,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round((time.perf_counter() - self._t0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        })
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def open_span(name: str, kind: str = "internal", parent: Optional[tuple] = None, **attributes) -> Span:
+    """
+    Ouvre un span et le rend courant. `parent` = (trace_id, span_id)
+    venant d'un traceparent entrant ; sinon le span courant est le parent.
+    À refermer avec close_span().
+    """
+    if parent is not None:
+        trace_id, parent_id = parent
+    else:
+        cur = _current.get()
+        trace_id = cur.trace_id if cur else secrets.token_hex(16)
+        parent_id = cur.span_id if cur else None
+    span = Span(name, trace_id, parent_id, kind, attributes)
+    span._token = _current.set(span)
+    return span
+
+
+def close_span(span: Span, error: Optional[BaseException] = None) -> None:
+    if error is not None:
+        span.status = "error"
+        span.attributes["error"] = repr(error)[:200]
+    span.end()
+    if span._token is not None:
+        try:
+            _current.reset(span._token)
+        except ValueError:
+            # span fermé depuis un autre contexte (ex: événements SQLAlchemy)
+            pass
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", **attributes):
+    span = open_span(name, kind, **attributes)
+    try:
+        yield span
+    except BaseException as e:
+        close_span(span, e)
+        raise
+    else:
+        close_span(span)
+
+
+@contextmanager
+def outbound(target: str, name: str, **attributes):
+    """Span client + métrique d'appel sortant (voir metrics.track_outbound)."""
+    with track_outbound(target), start_span(name, kind="client", target=target, **attributes) as span:
+        yield span
+
+
+# -------------------------------------------------------
+# Propagation W3C
+# -------------------------------------------------------
+def traceparent() -> Optional[str]:
+    span = _current.get()
+    if span is None:
+        return None
+    return f"00-{span.trace_id}-{span.span_id}-01"
+
+
+def inject(headers: Dict[str, str]) -> Dict[str, str]:
+    """À réserver aux appels vers nos services (chatbot, sports…) : pas aux API tierces."""
+    tp = traceparent()
+    if tp:
+        headers["traceparent"] = tp
+    return headers
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    m = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if not m or m.group(1) == "0" * 32 or m.group(2) == "0" * 16:
+        return None
+    return m.group(1), m.group(2)
+
+
+# =======================================================
+#                 SQL : sqlite3 et SQLAlchemy
+# =======================================================
+class TracedCursor(TimedCursor):
+    def execute(self, sql, parameters=()):
+        with start_span("sqlite.query", kind="client", db=self.db_name, statement=sql.strip()[:120]):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with start_span("sqlite.query", kind="client", db=self.db_name, statement=sql.strip()[:120]):
+            return super().executemany(sql, seq_of_parameters)
+
+
+def traced_connection(db_name: str):
+    """Connexion sqlite3 chronométrée (métriques) et tracée."""
+    cursor_cls = type(f"TracedCursor_{db_name}", (TracedCursor,), {"db_name": db_name})
+    return type(f"TracedConnection_{db_name}", (TimedConnection,), {"cursor_class": cursor_cls})
+
+
+def trace_sqlalchemy(engine, db_name: str) -> None:
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        span = open_span("sql.query", kind="client", db=db_name, statement=statement.strip()[:120])
+        conn.info.setdefault("_trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        close_span(conn.info["_trace_spans"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        spans = ctx.connection.info.get("_trace_spans") if ctx.connection is not None else None
+        if spans:
+            close_span(spans.pop(), ctx.original_exception)
+
+
+# =======================================================
+#                 Middleware HTTP + endpoints /traces
+# =======================================================
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or EXPORTER is None:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        span = open_span(
+            f"{scope['method']} {scope['path']}",
+            kind="server",
+            parent=parent,
+            method=scope["method"],
+            path=scope["path"],
+        )
+        tp = f"00-{span.trace_id}-{span.span_id}-01".encode()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.attributes["status"] = message["status"]
+                if message["status"] >= 500:
+                    span.status = "error"
+                message["headers"] = list(message.get("headers", [])) + [(b"traceparent", tp)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            close_span(span, e)
+            raise
+        close_span(span)
+
+
+async def traces_endpoint(request: Request) -> JSONResponse:
+    if EXPORTER is None:
+        return JSONResponse({"detail": "tracing disabled"}, status_code=404)
+    trace_id = request.path_params.get("trace_id")
+    if trace_id:
+        return JSONResponse(EXPORTER.trace(trace_id))
+    limit = int(request.query_params.get("limit", "20"))
+    return JSONResponse(EXPORTER.recent_roots(limit))
+
+
+def setup_tracing(app, service_name: str) -> None:
+    """Ajoute le middleware de traçage (+ GET /traces, /traces/{trace_id} si TRACE_ENDPOINTS)."""
+    global SERVICE_NAME
+    SERVICE_NAME = service_name
+    app.add_middleware(TracingMiddleware)
+    if not TRACE_ENDPOINTS:
+        return
+    app.add_route("/traces", traces_endpoint, methods=["GET"], include_in_schema=False)
+    app.add_route("/traces/{trace_id}", traces_endpoint, methods=["GET"], include_in_schema=False)
+
+
+# =======================================================
+#                 Lecture d'une trace (CLI)
+# =======================================================
+def print_waterfall(spans: List[Dict[str, Any]]) -> None:
+    if not spans:
+        print("Aucun span pour cette trace.")
+        return
+    spans = sorted(spans, key=lambda s: s["start_ns"])
+    t0 = spans[0]["start_ns"]
+    children: Dict[Optional[str], list] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+
+    def walk(parent_id, depth):
+        for s in children.get(parent_id, []):
+            offset = (s["start_ns"] - t0) / 1e6
+            flag = " !" if s["status"] == "error" else ""
+            print(f"{offset:9.1f} ms {s['duration_ms']:9.1f} ms  {'  ' * depth}[{s['service']}] {s['name']}{flag}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("usage : python -m app.tracing <traces.jsonl> [trace_id]")
+        sys.exit(1)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    if len(sys.argv) > 2:
+        print_waterfall([s for s in spans if s["trace_id"] == sys.argv[2]])
+    else:
+        for s in spans:
+            if s["kind"] == "server" and not s["parent_id"]:
+                print(f"{s['trace_id']}  {s['duration_ms']:9.1f} ms  [{s['service']}] {s['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,128 @@
 # services/reco_service_fastapi/app/tracking_db.py
 
+import os
 import sqlite3
-from contextlib import closing
+import threading
 from pathlib import Path
 
+from .tracing import traced_connection
+
 # -------------------------------------------------------
-# Chemin de la base SQLite (tracking.db)
+# Chemin de la base SQLite (tracking.db, surchargeable
+# avec TRACKING_DB_PATH pour les tests / benchmarks)
 # -------------------------------------------------------
-DB_PATH = Path(__file__).resolve().parent.parent / "tracking.db"
+DB_PATH = Path(
+    os.getenv("TRACKING_DB_PATH")
+    or Path(__file__).resolve().parent.parent / "tracking.db"
+)
+# attente max (ms) quand un autre écrivain tient le verrou
+BUSY_TIMEOUT_MS = int(os.getenv("TRACKING_DB_BUSY_TIMEOUT_MS", "5000"))
+
+_local = threading.local()
 
 # -------------------------------------------------------
-# Ouvre une connexion SQLite et active l’accès par nom de colonne
+# Connexion SQLite réutilisée par thread (les routes `def` de FastAPI
+# tournent dans un pool de threads : une connexion par thread du pool)
+# - accès par nom de colonne
+# - busy_timeout : attendre le verrou au lieu de "database is locked"
+# `with get_conn() as c:` délimite une transaction, sans fermer la connexion.
 # -------------------------------------------------------
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, factory=traced_connection("tracking"), timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        # avec WAL, NORMAL reste sûr en cas de crash du processus
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
     return conn
 
 # -------------------------------------------------------
-# Initialise la base : création de la table measurements
+# Migrations des bases existantes (PRAGMA user_version)
+# Chaque entrée est appliquée une seule fois, dans l'ordre.
+# -------------------------------------------------------
+MIGRATIONS = [
+    # 1 : index pour get_measurements (WHERE email=? ORDER BY date DESC, id DESC)
+    [
+        "CREATE INDEX IF NOT EXISTS ix_measurements_email_date ON measurements(email, date, id)",
+        "ANALYZE measurements",
+    ],
+    # 2 : résumé par utilisateur pour les tendances (voir trends.py),
+    #     construit à la 1re lecture puis mis à jour à chaque mesure
+    [
+        """
+        CREATE TABLE IF NOT EXISTS measurement_summaries(
+          email TEXT PRIMARY KEY,
+          n INTEGER NOT NULL,
+          first_date TEXT,
+          last_date TEXT,
+          weight_kg REAL, weight_kg_date TEXT,
+          waist_cm REAL, waist_cm_date TEXT,
+          hips_cm REAL, hips_cm_date TEXT,
+          chest_cm REAL, chest_cm_date TEXT,
+          min_weight_kg REAL,
+          max_weight_kg REAL,
+          w_n INTEGER NOT NULL DEFAULT 0,
+          w_sx REAL NOT NULL DEFAULT 0,
+          w_sy REAL NOT NULL DEFAULT 0,
+          w_sxx REAL NOT NULL DEFAULT 0,
+          w_sxy REAL NOT NULL DEFAULT 0,
+          updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        """,
+    ],
+    # 3 : digest des tendances injecté dans le prompt de /reco/generate
+    [
+        "ALTER TABLE measurement_summaries ADD COLUMN digest TEXT",
+    ],
+]
+
+
+def _migrate(c) -> None:
+    version = c.execute("PRAGMA user_version").fetchone()[0]
+    for number, statements in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        with c:
+            for sql in statements:
+                c.execute(sql)
+        # PRAGMA ne prend pas de paramètre lié
+        c.execute(f"PRAGMA user_version={number}")
+
+# -------------------------------------------------------
+# Initialise la base : création des tables
+# - measurements : mesures corporelles
+# - pending_recommendations : historique IA en attente
+#   d'écriture dans Firestore (voir history_writer.py)
+# puis mode WAL (lectures sans bloquer les écritures) et migrations
 # -------------------------------------------------------
 def init_db():
-    with closing(get_conn()) as c:
-        cur = c.cursor()
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS measurements(
-          id INTEGER PRIMARY KEY AUTOINCREMENT,
-          email TEXT NOT NULL,
-          date TEXT NOT NULL,
-          weight_kg REAL,
-          waist_cm REAL,
-          hips_cm REAL,
-          chest_cm REAL,
-          notes TEXT
-        );
-        """)
-        # Plus tard : ajouter d’autres tables si nécessaire
-        c.commit()
+    c = get_conn()
+    c.execute("PRAGMA journal_mode=WAL")
+    cur = c.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS measurements(
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      email TEXT NOT NULL,
+      date TEXT NOT NULL,
+      weight_kg REAL,
+      waist_cm REAL,
+      hips_cm REAL,
+      chest_cm REAL,
+      notes TEXT
+    );
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS pending_recommendations(
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      user_id TEXT NOT NULL,
+      doc_id TEXT NOT NULL,
+      payload TEXT NOT NULL,
+      created_at TEXT NOT NULL,
+      attempts INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+    # Plus tard : ajouter d’autres tables si nécessaire
+    c.commit()
+    _migrate(c)
@@ -0,0 +1,258 @@
+# services/reco_service_fastapi/app/trends.py
+
+# -------------------------------------------------------
+# Tendances de composition corporelle
+# - résumé par utilisateur (table measurement_summaries) mis à jour
+#   de façon incrémentale à chaque mesure ajoutée, dans la même
+#   transaction : dernières valeurs, min/max, et sommes de la
+#   régression linéaire du poids (pente → kg/semaine)
+#   → la vue "progrès" ne ré-agrège jamais tout l'historique
+# - séries : moyennes mobiles sur N jours et variation hebdomadaire,
+#   calculées par SQLite (fonctions de fenêtre) sur la période demandée
+# -------------------------------------------------------
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+# origine des x de la régression (jours julien) : garde des sommes x² petites
+X0 = 2460000.0
+FIELDS = ("weight_kg", "waist_cm", "hips_cm", "chest_cm")
+
+
+# =======================================================
+#                 Résumé incrémental
+# =======================================================
+def _latest(field: str) -> str:
+    return f"""
+      (SELECT {field} FROM measurements WHERE email=:email AND {field} IS NOT NULL
+       ORDER BY date DESC, id DESC LIMIT 1),
+      (SELECT date FROM measurements WHERE email=:email AND {field} IS NOT NULL
+       ORDER BY date DESC, id DESC LIMIT 1)"""
+
+
+def rebuild_summary(conn, email: str) -> None:
+    """Recalcule le résumé depuis measurements (1re lecture, import en masse)."""
+    latest = ",".join(_latest(f) for f in FIELDS)
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO measurement_summaries(
+          email, n, first_date, last_date,
+          weight_kg, weight_kg_date, waist_cm, waist_cm_date,
+          hips_cm, hips_cm_date, chest_cm, chest_cm_date,
+          min_weight_kg, max_weight_kg, w_n, w_sx, w_sy, w_sxx, w_sxy, updated_at
+        )
+        SELECT :email, COUNT(*), MIN(date), MAX(date), {latest},
+          MIN(weight_kg), MAX(weight_kg),
+          COUNT(weight_kg),
+          COALESCE(SUM(CASE WHEN weight_kg IS NOT NULL THEN julianday(date) - :x0 END), 0),
+          COALESCE(SUM(weight_kg), 0),
+          COALESCE(SUM(CASE WHEN weight_kg IS NOT NULL THEN (julianday(date) - :x0) * (julianday(date) - :x0) END), 0),
+          COALESCE(SUM(weight_kg * (julianday(date) - :x0)), 0),
+          datetime('now')
+        FROM measurements WHERE email=:email
+        """,
+        {"email": email, "x0": X0},
+    )
+    refresh_digest(conn, email)
+
+
+def _keep_latest(field: str) -> str:
+    newer = f":{field} IS NOT NULL AND ({field}_date IS NULL OR :date >= {field}_date)"
+    return (
+        f"{field} = CASE WHEN {newer} THEN :{field} ELSE {field} END, "
+        f"{field}_date = CASE WHEN {newer} THEN :date ELSE {field}_date END"
+    )
+
+
+def apply_measurement(conn, email: str, row: Dict[str, Any]) -> None:
+    """
+    Met à jour le résumé après l'insertion de `row` (même transaction).
+    L'ordre d'arrivée n'a pas d'importance (saisie d'une ancienne date OK).
+    Pas encore de résumé → reconstruction complète (inclut la nouvelle ligne).
+    """
+    params = {"email": email, "date": row["date"], "x0": X0, **{f: row.get(f) for f in FIELDS}}
+    cur = conn.execute(
+        f"""
+        UPDATE measurement_summaries SET
+          n = n + 1,
+          first_date = MIN(COALESCE(first_date, :date), :date),
+          last_date = MAX(COALESCE(last_date, :date), :date),
+          {", ".join(_keep_latest(f) for f in FIELDS)},
+          min_weight_kg = COALESCE(MIN(min_weight_kg, :weight_kg), min_weight_kg, :weight_kg),
+          max_weight_kg = COALESCE(MAX(max_weight_kg, :weight_kg), max_weight_kg, :weight_kg),
+          w_n = w_n + (:weight_kg IS NOT NULL),
+          w_sx = w_sx + COALESCE((julianday(:date) - :x0) * (:weight_kg IS NOT NULL), 0),
+          w_sy = w_sy + COALESCE(:weight_kg, 0),
+          w_sxx = w_sxx + COALESCE((julianday(:date) - :x0) * (julianday(:date) - :x0) * (:weight_kg IS NOT NULL), 0),
+          w_sxy = w_sxy + COALESCE(:weight_kg * (julianday(:date) - :x0), 0),
+          updated_at = datetime('now')
+        WHERE email = :email
+        """,
+        params,
+    )
+    if cur.rowcount == 0:
+        rebuild_summary(conn, email)
+    else:
+        refresh_digest(conn, email)
+
+
+# -------------------------------------------------------
+# Digest pour le prompt de /reco/generate : variation du poids et
+# du tour de taille sur les DIGEST_WEEKS dernières semaines de mesures.
+# Recalculé à l'écriture (quelques lignes via l'index email/date),
+# lu avec une seule recherche par clé primaire.
+# Valeurs arrondies à 0,1 : le prompt (et son empreinte de cache)
+# ne change pas pour du bruit de mesure.
+# -------------------------------------------------------
+DIGEST_WEEKS = 4
+
+
+def _first_since(field: str) -> str:
+    return f"""
+      (SELECT {field} FROM measurements m WHERE m.email=s.email AND m.date >= date(s.last_date, :span)
+       AND {field} IS NOT NULL ORDER BY m.date, m.id LIMIT 1)"""
+
+
+def refresh_digest(conn, email: str) -> None:
+    row = conn.execute(
+        f"""
+        SELECT s.last_date, s.weight_kg, s.waist_cm,
+               {_first_since("weight_kg")} AS weight_start,
+               {_first_since("waist_cm")} AS waist_start,
+               (SELECT COUNT(*) FROM measurements m
+                WHERE m.email=s.email AND m.date >= date(s.last_date, :span)) AS n
+        FROM measurement_summaries s WHERE s.email=:email
+        """,
+        {"email": email, "span": f"-{DIGEST_WEEKS * 7} days"},
+    ).fetchone()
+    digest = None
+    if row is not None and row["last_date"]:
+        digest = {"weeks": DIGEST_WEEKS, "last_date": row["last_date"], "count": row["n"]}
+        if row["weight_kg"] is not None:
+            digest["weight_kg"] = row["weight_kg"]
+        if row["weight_kg"] is not None and row["weight_start"] is not None:
+            digest["weight_change_kg"] = round(row["weight_kg"] - row["weight_start"], 1)
+        if row["waist_cm"] is not None and row["waist_start"] is not None:
+            digest["waist_change_cm"] = round(row["waist_cm"] - row["waist_start"], 1)
+    conn.execute(
+        "UPDATE measurement_summaries SET digest=? WHERE email=?",
+        (json.dumps(digest) if digest else None, email),
+    )
+
+
+def _build_missing_summary(conn, email: str) -> bool:
+    """
+    Pas de résumé : utilisateur antérieur au résumé (construit une seule
+    fois) ou email inconnu → rien n'est écrit, retourne False.
+    """
+    if conn.execute("SELECT 1 FROM measurements WHERE email=? LIMIT 1", (email,)).fetchone() is None:
+        return False
+    with conn:
+        rebuild_summary(conn, email)
+    return True
+
+
+def get_digest(conn, email: str) -> Optional[Dict[str, Any]]:
+    """Digest précalculé (None : aucune mesure)."""
+    row = conn.execute("SELECT digest FROM measurement_summaries WHERE email=?", (email,)).fetchone()
+    if row is None:
+        if not _build_missing_summary(conn, email):
+            return None
+        row = conn.execute("SELECT digest FROM measurement_summaries WHERE email=?", (email,)).fetchone()
+    return json.loads(row["digest"]) if row and row["digest"] else None
+
+
+def _bmi(weight: Optional[float], height_cm: Optional[float]) -> Optional[float]:
+    if not weight or not height_cm:
+        return None
+    return round(weight / (height_cm / 100) ** 2, 1)
+
+
+def _ratio(waist: Optional[float], hips: Optional[float]) -> Optional[float]:
+    if not waist or not hips:
+        return None
+    return round(waist / hips, 3)
+
+
+def get_summary(conn, email: str, height_cm: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    row = conn.execute("SELECT * FROM measurement_summaries WHERE email=?", (email,)).fetchone()
+    if row is None:
+        # base existante (avant le résumé) : construit une fois, puis incrémental
+        if not _build_missing_summary(conn, email):
+            return None
+        row = conn.execute("SELECT * FROM measurement_summaries WHERE email=?", (email,)).fetchone()
+    if row is None or row["n"] == 0:
+        return None
+
+    # pente de la régression poids ~ jours (moindres carrés)
+    n, sx, sy, sxx, sxy = row["w_n"], row["w_sx"], row["w_sy"], row["w_sxx"], row["w_sxy"]
+    denom = n * sxx - sx * sx
+    slope = (n * sxy - sx * sy) / denom if n >= 2 and abs(denom) > 1e-9 else None
+
+    return {
+        "count": row["n"],
+        "first_date": row["first_date"],
+        "last_date": row["last_date"],
+        "latest": {f: {"value": row[f], "date": row[f"{f}_date"]} for f in FIELDS},
+        "min_weight_kg": row["min_weight_kg"],
+        "max_weight_kg": row["max_weight_kg"],
+        "weekly_rate_kg": round(slope * 7, 3) if slope is not None else None,
+        "bmi": _bmi(row["weight_kg"], height_cm),
+        "waist_to_hip": _ratio(row["waist_cm"], row["hips_cm"]),
+    }
+
+
+# =======================================================
+#                 Séries (fonctions de fenêtre SQLite)
+# =======================================================
+def get_series(conn, email: str, date_from: str, date_to: str, window_days: int,
+               height_cm: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Une ligne par mesure de [date_from, date_to] : valeurs, moyennes mobiles
+    sur `window_days` jours (fenêtre temporelle, pas en nombre de points),
+    IMC et rapport taille/hanches. Les mesures juste avant date_from
+    alimentent la fenêtre des premiers points.
+    """
+    start = (date.fromisoformat(date_from) - timedelta(days=window_days)).isoformat()
+    averages = ", ".join(
+        f"ROUND(AVG({f}) OVER w, 2) AS {f}_ma" for f in ("weight_kg", "waist_cm")
+    )
+    rows = conn.execute(
+        f"""
+        SELECT * FROM (
+          SELECT date, weight_kg, waist_cm, hips_cm, chest_cm, {averages}
+          FROM measurements
+          WHERE email=:email AND date >= :start AND date <= :to
+          WINDOW w AS (ORDER BY julianday(date) RANGE BETWEEN :span PRECEDING AND CURRENT ROW)
+        )
+        WHERE date >= :from
+        ORDER BY date
+        """,
+        {"email": email, "start": start, "from": date_from, "to": date_to, "span": window_days - 1},
+    ).fetchall()
+    series = []
+    for r in rows:
+        item = dict(r)
+        item["bmi"] = _bmi(r["weight_kg"], height_cm)
+        item["waist_to_hip"] = _ratio(r["waist_cm"], r["hips_cm"])
+        series.append(item)
+    return series
+
+
+def get_weekly(conn, email: str, date_from: str, date_to: str) -> List[Dict[str, Any]]:
+    """Poids moyen par semaine (lundi) et variation par rapport à la semaine précédente."""
+    rows = conn.execute(
+        """
+        SELECT week, weight_kg,
+               ROUND(weight_kg - LAG(weight_kg) OVER (ORDER BY week), 2) AS change_kg
+        FROM (
+          SELECT date(date, 'weekday 0', '-6 days') AS week, ROUND(AVG(weight_kg), 2) AS weight_kg
+          FROM measurements
+          WHERE email=? AND date >= ? AND date <= ? AND weight_kg IS NOT NULL
+          GROUP BY week
+        )
+        ORDER BY week
+        """,
+        (email, date_from, date_to),
+    ).fetchall()
+    return [dict(r) for r in rows]
@@ -0,0 +1,62 @@
+# services/sports_service_fastapi/app/catalog.py
+
+# -------------------------------------------------------
+# Catalogue des sports (table `sports` de sports.db)
+# Recherche plein texte via l'index FTS5 `sports_fts` (voir db.py) :
+# - sans accents : "natacion" trouve "Natación", "equipe" → "Équipe"
+# - par préfixe : "foo" trouve "Football" (chaque mot est un préfixe)
+# - sur le nom, les aliases FR / ES / EN ("swimming", "natation"),
+#   la catégorie et le niveau, classée par bm25
+#   (le nom pèse plus que les aliases, puis la catégorie, puis le niveau)
+# Fautes de frappe / mots partiels : voir fuzzy.py
+# -------------------------------------------------------
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# poids bm25 : name, categorie, level, aliases
+BM25_WEIGHTS = (10.0, 3.0, 1.0, 6.0)
+
+_COLUMNS = "s.slug AS id, s.name, s.categorie AS category, s.level"
+
+
+def fts_query(q: str) -> Optional[str]:
+    """
+    Texte libre → requête FTS5 : chaque mot devient un préfixe entre
+    guillemets (pas d'opérateurs FTS venant de l'utilisateur).
+    """
+    words = re.findall(r"\w+", q or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def catalog_version(conn) -> int:
+    """Numéro de version du catalogue : dernière entrée de sports_changes."""
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sports_changes").fetchone()[0]
+
+
+def list_sports(conn, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    sql = f"SELECT {_COLUMNS} FROM sports s ORDER BY s.id"
+    params: Tuple = ()
+    if limit:
+        sql += " LIMIT ? OFFSET ?"
+        params = (limit, offset)
+    return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def search_sports(conn, q: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+    """Résultats classés (meilleur d'abord) ; `q` vide → tout le catalogue."""
+    match = fts_query(q)
+    if match is None:
+        return list_sports(conn, limit, offset)
+    rows = conn.execute(
+        f"""
+        SELECT {_COLUMNS}
+        FROM sports_fts f JOIN sports s ON s.id = f.rowid
+        WHERE sports_fts MATCH ?
+        ORDER BY bm25(sports_fts, ?, ?, ?, ?), s.name
+        LIMIT ? OFFSET ?
+        """,
+        (match, *BM25_WEIGHTS, limit, offset),
+    ).fetchall()
+    return [dict(r) for r in rows]
@@ -1,33 +1,213 @@
+import os
+import re
 import sqlite3
+import threading
 from pathlib import Path
 
-DB_PATH = Path(__file__).resolve().parent.parent / "sports.db"
+from .exercises import SEED_EXERCISES
+from .metrics import timed_connection
 
+# SPORTS_DB_PATH : autre fichier (tests / benchmarks)
+DB_PATH = Path(os.getenv("SPORTS_DB_PATH") or Path(__file__).resolve().parent.parent / "sports.db")
+
+_local = threading.local()
+
+# Connexion réutilisée par thread (routes `def` et threads de l'outbox) ;
+# `with get_conn() as c:` délimite une transaction sans fermer la connexion.
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, factory=timed_connection("sports"), timeout=5)
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
     return conn
 
+# Catalogue initial (id public = slug) ; aliases FR / ES / EN pour la recherche
+SEED_SPORTS = [
+    ("run", "Running", "Individuel", "beginner", "course, jogging, correr, carrera, run"),
+    ("yoga", "Yoga", "Bien-être", "all", "yoga, stretching, estiramientos"),
+    ("swim", "Natación", "Individuel", "all", "natation, nage, nadar, swimming, swim"),
+    ("strength", "Fuerza", "Individuel", "intermediate", "musculation, force, pesas, strength, weights"),
+    ("football", "Football", "Équipe", "all", "fútbol, soccer, foot"),
+    ("basketball", "Basketball", "Équipe", "all", "baloncesto, basket"),
+    ("tennis", "Tennis", "Individuel", "all", "tenis"),
+    ("volleyball", "Volleyball", "Équipe", "all", "voleibol, volley"),
+]
+# lignes de l'ancien seed qui correspondent à un sport du catalogue
+LEGACY_SLUGS = {"Natation": "swim", "Course": "run"}
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _migrate_sports(c) -> None:
+    """Anciennes bases : table sports sans slug / level."""
+    columns = {r["name"] for r in c.execute("PRAGMA table_info(sports)")}
+    if "slug" in columns:
+        return
+    c.execute("ALTER TABLE sports ADD COLUMN slug TEXT")
+    c.execute("ALTER TABLE sports ADD COLUMN level TEXT NOT NULL DEFAULT 'all'")
+    seed = {s[0]: s for s in SEED_SPORTS}
+    for row in c.execute("SELECT id, name FROM sports").fetchall():
+        slug = LEGACY_SLUGS.get(row["name"]) or slugify(row["name"])
+        if slug in seed:
+            _, name, categorie, level, _ = seed[slug]
+            c.execute(
+                "UPDATE sports SET slug=?, name=?, categorie=?, level=? WHERE id=?",
+                (slug, name, categorie, level, row["id"]),
+            )
+        else:
+            c.execute("UPDATE sports SET slug=? WHERE id=?", (slug, row["id"]))
+
+
+def _add_aliases(c) -> None:
+    """Colonne aliases : l'index FTS change de colonnes → recréé (puis rebuild)."""
+    columns = {r["name"] for r in c.execute("PRAGMA table_info(sports)")}
+    if "aliases" in columns:
+        return
+    c.execute("ALTER TABLE sports ADD COLUMN aliases TEXT")
+    c.executemany("UPDATE sports SET aliases=? WHERE slug=?", [(s[4], s[0]) for s in SEED_SPORTS])
+    for trigger in ("sports_fts_ai", "sports_fts_ad", "sports_fts_au"):
+        c.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    c.execute("DROP TABLE IF EXISTS sports_fts")
+
+
 def init_db():
-    with get_conn() as c:
+    c = get_conn()
+    # lectures du catalogue pendant les écritures de l'outbox
+    c.execute("PRAGMA journal_mode=WAL")
+    with c:
         c.execute("""
         CREATE TABLE IF NOT EXISTS sports (
           id INTEGER PRIMARY KEY AUTOINCREMENT,
           name TEXT NOT NULL,
-          categorie TEXT
+          categorie TEXT,
+          slug TEXT,
+          level TEXT NOT NULL DEFAULT 'all',
+          aliases TEXT
         )
         """)
-        # seed si está vacío
-        cur = c.execute("SELECT COUNT(*) AS n FROM sports").fetchone()
-        if cur["n"] == 0:
-            c.executemany(
-                "INSERT INTO sports(name,categorie) VALUES(?,?)",
-                [
-                    ("Football", "Équipe"),
-                    ("Basketball", "Équipe"),
-                    ("Tennis", "Individuel"),
-                    ("Natation", "Individuel"),
-                    ("Course", "Individuel"),
-                    ("Volleyball", "Équipe"),
-                ],
-            )
+        _migrate_sports(c)
+        _add_aliases(c)
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_sports_slug ON sports(slug)")
+        c.executemany(
+            "INSERT OR IGNORE INTO sports(slug, name, categorie, level, aliases) VALUES(?,?,?,?,?)",
+            SEED_SPORTS,
+        )
+
+        # bibliothèque d'exercices (voir exercises.py et plans.py)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS exercises (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          slug TEXT NOT NULL UNIQUE,
+          name_fr TEXT NOT NULL,
+          name_es TEXT NOT NULL,
+          name_en TEXT NOT NULL,
+          kind TEXT NOT NULL,
+          muscles TEXT NOT NULL,
+          equipment TEXT NOT NULL DEFAULT 'none',
+          level TEXT NOT NULL DEFAULT 'beginner',
+          duration_min INTEGER NOT NULL,
+          intensity INTEGER NOT NULL DEFAULT 2,
+          impact TEXT NOT NULL DEFAULT 'low',
+          sport_slug TEXT
+        )
+        """)
+        c.executemany(
+            """INSERT OR IGNORE INTO exercises(slug, name_fr, name_es, name_en, kind, muscles, equipment,
+                 level, duration_min, intensity, impact, sport_slug) VALUES(?,?,?,?,?,?,?,?,?,?,?,?)""",
+            SEED_EXERCISES,
+        )
+
+        # journal des modifications du catalogue (rempli par les triggers) :
+        # son dernier seq sert de version (ETag, plans.py) et l'index
+        # approximatif (fuzzy.py) ne relit que les sports modifiés
+        # kind : 'sport' (sport_id = sports.id) ou 'exercise' (exercises.id)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS sports_changes (
+          seq INTEGER PRIMARY KEY AUTOINCREMENT,
+          sport_id INTEGER NOT NULL,
+          kind TEXT NOT NULL DEFAULT 'sport'
+        )
+        """)
+        columns = {r["name"] for r in c.execute("PRAGMA table_info(sports_changes)")}
+        if "kind" not in columns:
+            c.execute("ALTER TABLE sports_changes ADD COLUMN kind TEXT NOT NULL DEFAULT 'sport'")
+        for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+            c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS exercises_changes_{event.lower()} AFTER {event} ON exercises BEGIN
+              INSERT INTO sports_changes(sport_id, kind) VALUES ({row}.id, 'exercise');
+            END
+            """)
+
+        # index plein texte (voir catalog.py) : sans accents, préfixes 2-3 lettres,
+        # tenu à jour par triggers depuis la table sports
+        fts_exists = c.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sports_fts'"
+        ).fetchone()
+        c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS sports_fts USING fts5(
+          name, categorie, level, aliases,
+          content='sports', content_rowid='id',
+          tokenize='unicode61 remove_diacritics 2',
+          prefix='2 3'
+        )
+        """)
+        c.execute("""
+        CREATE TRIGGER IF NOT EXISTS sports_fts_ai AFTER INSERT ON sports BEGIN
+          INSERT INTO sports_fts(rowid, name, categorie, level, aliases)
+          VALUES (new.id, new.name, new.categorie, new.level, new.aliases);
+          INSERT INTO sports_changes(sport_id) VALUES (new.id);
+        END
+        """)
+        c.execute("""
+        CREATE TRIGGER IF NOT EXISTS sports_fts_ad AFTER DELETE ON sports BEGIN
+          INSERT INTO sports_fts(sports_fts, rowid, name, categorie, level, aliases)
+          VALUES ('delete', old.id, old.name, old.categorie, old.level, old.aliases);
+          INSERT INTO sports_changes(sport_id) VALUES (old.id);
+        END
+        """)
+        c.execute("""
+        CREATE TRIGGER IF NOT EXISTS sports_fts_au AFTER UPDATE ON sports BEGIN
+          INSERT INTO sports_fts(sports_fts, rowid, name, categorie, level, aliases)
+          VALUES ('delete', old.id, old.name, old.categorie, old.level, old.aliases);
+          INSERT INTO sports_fts(rowid, name, categorie, level, aliases)
+          VALUES (new.id, new.name, new.categorie, new.level, new.aliases);
+          INSERT INTO sports_changes(sport_id) VALUES (new.id);
+        END
+        """)
+        if not fts_exists:
+            c.execute("INSERT INTO sports_fts(sports_fts) VALUES('rebuild')")
+
+        # compactage du journal au démarrage : l'index approximatif est
+        # reconstruit juste après (main.py), seule la dernière entrée
+        # (= version du catalogue) doit rester. Un autre processus en retard
+        # voit le trou dans les seq et recharge tout (fuzzy.refresh).
+        c.execute("DELETE FROM sports_changes WHERE seq < (SELECT MAX(seq) FROM sports_changes)")
+
+        # outbox : e-mails à envoyer (voir outbox.py)
+        # next_attempt_at (epoch) : prochain essai, ou fin du bail pendant l'envoi
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+          id TEXT PRIMARY KEY,
+          batch_id TEXT,
+          to_email TEXT NOT NULL,
+          subject TEXT NOT NULL,
+          body TEXT NOT NULL,
+          html TEXT,
+          status TEXT NOT NULL DEFAULT 'pending',
+          attempts INTEGER NOT NULL DEFAULT 0,
+          next_attempt_at REAL NOT NULL,
+          last_error TEXT,
+          created_at TEXT NOT NULL DEFAULT (datetime('now')),
+          sent_at TEXT
+        )
+        """)
+        # outbox créée avant les envois groupés / les variantes HTML
+        columns = {r["name"] for r in c.execute("PRAGMA table_info(outbox)")}
+        for column in ("batch_id", "html"):
+            if column not in columns:
+                c.execute(f"ALTER TABLE outbox ADD COLUMN {column} TEXT")
+        c.execute("CREATE INDEX IF NOT EXISTS ix_outbox_due ON outbox(status, next_attempt_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS ix_outbox_batch ON outbox(batch_id)")
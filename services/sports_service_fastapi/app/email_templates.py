@@ -0,0 +1,66 @@
+# services/sports_service_fastapi/app/email_templates.py
+
+# -------------------------------------------------------
+# Modèles d'e-mails (Jinja2), dossier app/templates/
+#   daily_summary.{fr,es,en}.txt   → texte brut
+#   daily_summary.{fr,es,en}.html  → HTML (hérite de _layout.html)
+# Tous les modèles sont compilés une seule fois au chargement du module
+# et gardés en mémoire (auto_reload désactivé) : un envoi groupé ne
+# fait que les exécuter, sans relire ni re-parser les fichiers.
+# Échappement HTML automatique pour les .html uniquement.
+# -------------------------------------------------------
+from pathlib import Path
+from typing import Dict, Tuple
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+LANGS = ("fr", "es", "en")
+DEFAULT_LANG = "fr"
+
+SUBJECTS = {
+    "daily_summary": {
+        "fr": "Résumé de votre journée d’entraînement - SportConnectIA",
+        "es": "Resumen de tu jornada de entrenamiento - SportConnectIA",
+        "en": "Your training day summary - SportConnectIA",
+    },
+}
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=False),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+)
+
+# (nom, langue, "txt" | "html") → modèle compilé
+TEMPLATES: Dict[Tuple[str, str, str], Template] = {
+    (name, lang, kind): env.get_template(f"{name}.{lang}.{kind}")
+    for name in SUBJECTS
+    for lang in LANGS
+    for kind in ("txt", "html")
+}
+
+
+def normalize_lang(lang: str) -> str:
+    """'es-MX' → 'es' ; langue inconnue → français."""
+    lang = (lang or DEFAULT_LANG).lower()
+    return next((code for code in LANGS if lang.startswith(code)), DEFAULT_LANG)
+
+
+def render_variant(name: str, lang: str, kind: str, **context) -> str:
+    """Une seule variante ("txt" ou "html") du modèle `name`."""
+    lang = normalize_lang(lang)
+    context.update(lang=lang, subject=SUBJECTS[name][lang])
+    return TEMPLATES[(name, lang, kind)].render(context)
+
+
+def render(name: str, lang: str, **context) -> Tuple[str, str, str]:
+    """Retourne (sujet, texte, html) du modèle `name` dans la langue demandée."""
+    lang = normalize_lang(lang)
+    subject = SUBJECTS[name][lang]
+    context.update(lang=lang, subject=subject)
+    text = TEMPLATES[(name, lang, "txt")].render(context)
+    html = TEMPLATES[(name, lang, "html")].render(context)
+    return subject, text, html
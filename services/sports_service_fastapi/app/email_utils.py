@@ -2,12 +2,18 @@
 
 import os
 import smtplib
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import make_msgid
 from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
 
+from .email_templates import render, render_variant
+from .metrics import track_outbound
+
 # =========================
 #  Charger les variables du fichier .env à la racine
 #  .../PrjBackendRCWSportConnectIA/.env
@@ -22,43 +28,102 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))  # 587 = TLS
 SMTP_USER = os.getenv("SMTP_USER")  # adresse e-mail de l’application
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")      # mot de passe ou app password
 FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USER) # adresse visible par le client
+# false uniquement pour un serveur SMTP local sans TLS (tests, benchmark)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))  # secondes
+
+
+def render_daily_summary(
+    client_name: str,
+    checklist: list[str],
+    evolution_text: str,
+    lang: str = "fr",
+) -> tuple[str, str, str]:
+    """
+    Résumé quotidien dans la langue du client (fr, es, en) :
+    retourne (sujet, texte brut, HTML). Voir email_templates.py.
+    """
+    return render(
+        "daily_summary", lang,
+        client_name=client_name, checklist=checklist, evolution=evolution_text,
+    )
 
 
 def build_daily_summary_message(
     client_name: str,
     checklist: list[str],
     evolution_text: str,
+    lang: str = "fr",
 ) -> str:
     """
-    Construit le contenu du message :
+    Construit le contenu du message (texte brut) :
     - nom du client
     - checklist du jour
     - résumé de l'évolution
     """
+    return render_variant(
+        "daily_summary", lang, "txt",
+        client_name=client_name, checklist=checklist, evolution=evolution_text,
+    )
 
-    lines = [
-        f"Bonjour {client_name},",
-        "",
-        "Voici le résumé de votre journée d’entraînement :",
-        "",
-        "✅ Checklist du jour :",
-    ]
 
-    for item in checklist:
-        lines.append(f"  - {item}")
+def check_smtp_config() -> None:
+    if not (SMTP_USER and SMTP_PASSWORD):
+        # Éviter une erreur silencieuse si .env n’est pas configuré
+        raise RuntimeError(
+            "SMTP_USER ou SMTP_PASSWORD n’est pas défini dans le fichier .env. "
+            "Veuillez configurer ces variables avant d’envoyer des e-mails."
+        )
 
-    lines += [
-        "",
-        "📈 Évolution d’aujourd’hui :",
-        evolution_text,
-        "",
-        "Continuez comme ça ! Si vous avez des questions, n'hésitez pas à contacter votre coach 😊",
-        "",
-        "Équipe SportConnectIA",
-    ]
 
-    # Retourne toutes les lignes sous forme d’un texte unique
-    return "\n".join(lines)
+def build_mime_message(
+    to_email: str,
+    subject: str,
+    body_text: str,
+    message_id: Optional[str] = None,
+    body_html: Optional[str] = None,
+) -> MIMEMultipart:
+    """
+    Message MIME : texte brut, ou texte + HTML (multipart/alternative).
+    `message_id` = identifiant de l'outbox.
+    """
+    msg = MIMEMultipart("alternative" if body_html else "mixed")
+    msg["Subject"] = subject
+    msg["From"] = FROM_EMAIL
+    msg["To"] = to_email
+    domain = (FROM_EMAIL or "").rpartition("@")[2] or "sportconnectia.local"
+    msg["Message-ID"] = f"<{message_id}@{domain}>" if message_id else make_msgid(domain=domain)
+
+    # Ajouter le corps du message (texte brut, puis HTML : le client
+    # de messagerie affiche la dernière variante qu'il sait lire)
+    msg.attach(MIMEText(body_text, "plain", "utf-8"))
+    if body_html:
+        msg.attach(MIMEText(body_html, "html", "utf-8"))
+    return msg
+
+
+def connect_smtp() -> smtplib.SMTP:
+    """Ouvre une connexion SMTP authentifiée (STARTTLS + login)."""
+    check_smtp_config()
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        if SMTP_STARTTLS:
+            server.starttls()  # active la connexion sécurisée TLS
+        server.login(SMTP_USER, SMTP_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+@contextmanager
+def smtp_session():
+    """
+    Connexion SMTP authentifiée (STARTTLS + login une seule fois),
+    réutilisable pour envoyer plusieurs messages.
+    """
+    with connect_smtp() as server:
+        yield server
 
 
 def send_daily_summary_email(
@@ -66,36 +131,19 @@ def send_daily_summary_email(
     client_name: str,
     checklist: list[str],
     evolution_text: str,
+    lang: str = "fr",
 ) -> None:
     """
-    Envoie un e-mail au client en utilisant le protocole SMTP.
+    Envoie un e-mail au client en utilisant le protocole SMTP
+    (envoi direct ; /send-daily-summary passe par l'outbox).
     """
 
-    if not (SMTP_USER and SMTP_PASSWORD):
-        # Éviter une erreur silencieuse si .env n’est pas configuré
-        raise RuntimeError(
-            "SMTP_USER ou SMTP_PASSWORD n’est pas défini dans le fichier .env. "
-            "Veuillez configurer ces variables avant d’envoyer des e-mails."
-        )
-
-    # 1) Construire le texte du message
-    body_text = build_daily_summary_message(
-        client_name=client_name,
-        checklist=checklist,
-        evolution_text=evolution_text,
-    )
+    # 1) Construire le message (texte + HTML)
+    subject, body_text, body_html = render_daily_summary(client_name, checklist, evolution_text, lang)
 
     # 2) Créer l’objet du message (MIME)
-    msg = MIMEMultipart()
-    msg["Subject"] = "Résumé de votre journée d’entraînement - SportConnectIA"
-    msg["From"] = FROM_EMAIL
-    msg["To"] = to_email
-
-    # Ajouter le corps du message (texte brut)
-    msg.attach(MIMEText(body_text, "plain", "utf-8"))
+    msg = build_mime_message(to_email, subject, body_text, body_html=body_html)
 
     # 3) Connexion au serveur SMTP et envoi du message
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()  # active la connexion sécurisée TLS
-        server.login(SMTP_USER, SMTP_PASSWORD)
+    with track_outbound("smtp"), smtp_session() as server:
         server.send_message(msg)
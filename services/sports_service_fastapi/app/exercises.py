@@ -0,0 +1,166 @@
+# services/sports_service_fastapi/app/exercises.py
+
+# -------------------------------------------------------
+# Bibliothèque d'exercices (table `exercises` de sports.db)
+# Chaque exercice : nom FR / ES / EN, type (cardio, strength, mobility),
+# groupes musculaires, matériel, niveau, durée d'un bloc (repos compris),
+# intensité (1 facile, 2 modérée, 3 difficile), impact (low / high)
+# et sport du catalogue associé (run, swim…) le cas échéant.
+# Sert au générateur de plans (plans.py) et à GET /exercises.
+# -------------------------------------------------------
+from typing import Any, Dict, List, Optional
+
+LEVELS = ("beginner", "intermediate", "advanced")
+KINDS = ("cardio", "strength", "mobility")
+MUSCLES = ("legs", "glutes", "core", "chest", "back", "shoulders", "arms", "full_body")
+# matériel supposé toujours disponible
+BASIC_EQUIPMENT = ("none", "mat")
+
+# (slug, nom fr, nom es, nom en, type, muscles, matériel, niveau, minutes, intensité, impact, sport)
+SEED_EXERCISES = [
+    # --- mobilité : échauffement, retour au calme, séances souplesse ---
+    ("joint_mobility", "Mobilité articulaire", "Movilidad articular", "Joint mobility",
+     "mobility", "full_body", "none", "beginner", 5, 1, "low", None),
+    ("dynamic_warmup", "Échauffement dynamique", "Calentamiento dinámico", "Dynamic warm-up",
+     "mobility", "full_body", "none", "beginner", 8, 1, "low", None),
+    ("hip_stretch", "Étirements des hanches", "Estiramiento de cadera", "Hip stretch",
+     "mobility", "legs,glutes", "mat", "beginner", 5, 1, "low", None),
+    ("hamstring_stretch", "Étirement des ischio-jambiers", "Estiramiento de isquiotibiales", "Hamstring stretch",
+     "mobility", "legs", "none", "beginner", 5, 1, "low", None),
+    ("shoulder_stretch", "Étirements des épaules", "Estiramiento de hombros", "Shoulder stretch",
+     "mobility", "shoulders,chest,arms", "none", "beginner", 5, 1, "low", None),
+    ("cat_cow", "Chat-vache", "Gato-vaca", "Cat-cow",
+     "mobility", "back,core", "mat", "beginner", 5, 1, "low", None),
+    ("yoga_flow", "Enchaînement de yoga doux", "Secuencia de yoga suave", "Gentle yoga flow",
+     "mobility", "full_body,core", "mat", "beginner", 20, 1, "low", "yoga"),
+    ("yoga_vinyasa", "Yoga vinyasa", "Yoga vinyasa", "Vinyasa yoga",
+     "mobility", "full_body,core", "mat", "intermediate", 30, 2, "low", "yoga"),
+    # --- cardio ---
+    ("brisk_walk", "Marche rapide", "Caminata rápida", "Brisk walk",
+     "cardio", "legs", "none", "beginner", 30, 1, "low", None),
+    ("easy_run", "Footing léger", "Trote suave", "Easy run",
+     "cardio", "legs", "none", "beginner", 25, 2, "high", "run"),
+    ("long_run", "Sortie longue", "Tirada larga", "Long run",
+     "cardio", "legs", "none", "intermediate", 50, 2, "high", "run"),
+    ("tempo_run", "Course au seuil", "Carrera a ritmo umbral", "Tempo run",
+     "cardio", "legs", "none", "intermediate", 30, 3, "high", "run"),
+    ("run_intervals", "Fractionné course", "Intervalos de carrera", "Running intervals",
+     "cardio", "legs", "none", "advanced", 25, 3, "high", "run"),
+    ("cycling", "Vélo", "Ciclismo", "Cycling",
+     "cardio", "legs", "bike", "beginner", 40, 2, "low", None),
+    ("swim_easy", "Nage continue", "Nado continuo", "Easy swim",
+     "cardio", "full_body,back,shoulders", "pool", "beginner", 30, 2, "low", "swim"),
+    ("swim_intervals", "Fractionné natation", "Series de natación", "Swim intervals",
+     "cardio", "full_body,back,shoulders", "pool", "intermediate", 30, 3, "low", "swim"),
+    ("hiit_bodyweight", "HIIT au poids du corps", "HIIT con peso corporal", "Bodyweight HIIT",
+     "cardio", "full_body", "none", "intermediate", 20, 3, "high", None),
+    ("football_game", "Match de football", "Partido de fútbol", "Football game",
+     "cardio", "legs", "ball", "beginner", 60, 2, "high", "football"),
+    ("basketball_game", "Basket (jeu libre)", "Baloncesto (juego libre)", "Basketball pickup game",
+     "cardio", "legs,arms", "ball", "beginner", 45, 2, "high", "basketball"),
+    ("tennis_match", "Match de tennis", "Partido de tenis", "Tennis match",
+     "cardio", "legs,arms", "racket", "beginner", 60, 2, "high", "tennis"),
+    ("volleyball_game", "Match de volley", "Partido de voleibol", "Volleyball game",
+     "cardio", "legs,shoulders", "ball", "beginner", 45, 2, "high", "volleyball"),
+    # --- renforcement ---
+    ("squat", "Squats", "Sentadillas", "Squats",
+     "strength", "legs,glutes", "none", "beginner", 8, 2, "low", "strength"),
+    ("lunge", "Fentes", "Zancadas", "Lunges",
+     "strength", "legs,glutes", "none", "beginner", 8, 2, "low", "strength"),
+    ("glute_bridge", "Pont fessier", "Puente de glúteos", "Glute bridge",
+     "strength", "glutes,core", "mat", "beginner", 6, 1, "low", "strength"),
+    ("jump_squat", "Squats sautés", "Sentadillas con salto", "Jump squats",
+     "strength", "legs,glutes", "none", "intermediate", 6, 3, "high", "strength"),
+    ("goblet_squat", "Squat gobelet", "Sentadilla goblet", "Goblet squat",
+     "strength", "legs,glutes,core", "dumbbells", "intermediate", 8, 2, "low", "strength"),
+    ("romanian_deadlift", "Soulevé de terre roumain", "Peso muerto rumano", "Romanian deadlift",
+     "strength", "legs,glutes,back", "dumbbells", "intermediate", 8, 2, "low", "strength"),
+    ("incline_pushup", "Pompes inclinées", "Flexiones inclinadas", "Incline push-ups",
+     "strength", "chest,arms,shoulders", "none", "beginner", 6, 1, "low", "strength"),
+    ("pushup", "Pompes", "Flexiones", "Push-ups",
+     "strength", "chest,arms,core", "none", "intermediate", 6, 2, "low", "strength"),
+    ("floor_press", "Développé au sol haltères", "Press de suelo con mancuernas", "Dumbbell floor press",
+     "strength", "chest,arms", "dumbbells", "beginner", 8, 2, "low", "strength"),
+    ("dumbbell_row", "Rowing haltère", "Remo con mancuerna", "Dumbbell row",
+     "strength", "back,arms", "dumbbells", "beginner", 8, 2, "low", "strength"),
+    ("band_row", "Tirage élastique", "Remo con banda", "Band row",
+     "strength", "back,arms", "band", "beginner", 6, 1, "low", "strength"),
+    ("shoulder_press", "Développé épaules haltères", "Press de hombros con mancuernas", "Dumbbell shoulder press",
+     "strength", "shoulders,arms", "dumbbells", "beginner", 8, 2, "low", "strength"),
+    ("superman", "Superman", "Superman", "Superman",
+     "strength", "back,glutes", "mat", "beginner", 5, 1, "low", "strength"),
+    ("chair_dips", "Dips sur chaise", "Fondos en silla", "Chair dips",
+     "strength", "arms,chest", "none", "intermediate", 5, 2, "low", "strength"),
+    ("plank", "Gainage", "Plancha", "Plank",
+     "strength", "core", "none", "beginner", 5, 1, "low", "strength"),
+    ("side_plank", "Gainage latéral", "Plancha lateral", "Side plank",
+     "strength", "core", "none", "intermediate", 5, 2, "low", "strength"),
+    ("dead_bug", "Dead bug", "Dead bug", "Dead bug",
+     "strength", "core", "mat", "beginner", 5, 1, "low", "strength"),
+    ("burpees", "Burpees", "Burpees", "Burpees",
+     "strength", "full_body", "none", "advanced", 6, 3, "high", None),
+]
+
+_COLUMNS = (
+    "slug, name_fr, name_es, name_en, kind, muscles, equipment, level,"
+    " duration_min, intensity, impact, sport_slug"
+)
+
+
+def from_row(row) -> Dict[str, Any]:
+    """Ligne sqlite → exercice (muscles en liste, noms par langue)."""
+    return {
+        "id": row["slug"],
+        "names": {"fr": row["name_fr"], "es": row["name_es"], "en": row["name_en"]},
+        "kind": row["kind"],
+        "muscles": row["muscles"].split(","),
+        "equipment": row["equipment"],
+        "level": row["level"],
+        "duration_min": row["duration_min"],
+        "intensity": row["intensity"],
+        "impact": row["impact"],
+        "sport": row["sport_slug"],
+    }
+
+
+def load_exercises(conn) -> List[Dict[str, Any]]:
+    rows = conn.execute(f"SELECT {_COLUMNS} FROM exercises ORDER BY id").fetchall()
+    return [from_row(r) for r in rows]
+
+
+def list_exercises(
+    conn,
+    lang: str = "fr",
+    kind: Optional[str] = None,
+    muscle: Optional[str] = None,
+    equipment: Optional[str] = None,
+    level: Optional[str] = None,
+    sport: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Exercices filtrés ; `level` = niveau max, `name` dans la langue demandée."""
+    where, params = [], []
+    if kind:
+        where.append("kind = ?")
+        params.append(kind)
+    if muscle:
+        where.append("(',' || muscles || ',') LIKE ?")
+        params.append(f"%,{muscle},%")
+    if equipment:
+        where.append("equipment = ?")
+        params.append(equipment)
+    if level in LEVELS:
+        where.append("level IN ({})".format(",".join("?" * (LEVELS.index(level) + 1))))
+        params.extend(LEVELS[:LEVELS.index(level) + 1])
+    if sport:
+        where.append("sport_slug = ?")
+        params.append(sport)
+    sql = f"SELECT {_COLUMNS} FROM exercises"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id"
+    items = []
+    for row in conn.execute(sql, params).fetchall():
+        item = from_row(row)
+        item["name"] = item.pop("names").get(lang) or row["name_fr"]
+        items.append(item)
+    return items
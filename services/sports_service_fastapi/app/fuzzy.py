@@ -0,0 +1,150 @@
+# services/sports_service_fastapi/app/fuzzy.py
+
+# -------------------------------------------------------
+# Recherche approximative dans le catalogue (fautes de frappe)
+# Index de trigrammes en mémoire sur le nom et les aliases FR / ES / EN :
+#   "runing" → Running, "nataciòn" / "natacion" → Natación,
+#   "swiming" → Natación (alias), "ball" → Basketball, Football…
+# - mots sans accents, en minuscules, bordés d'espaces ("  run ")
+# - score d'un mot = moyenne de la similarité de Jaccard et de la part
+#   des trigrammes de la requête retrouvés (mots partiels)
+# - score d'un sport = moyenne, sur les mots de la requête, du meilleur
+#   score parmi les mots du sport ; seuil FUZZY_THRESHOLD
+# Latence bornée : requête tronquée (FUZZY_MAX_WORDS mots) et seuls les
+# FUZZY_MAX_CANDIDATES sports partageant le plus de trigrammes sont notés.
+# Construit au démarrage, puis mis à jour sport par sport à partir du
+# journal `sports_changes` (triggers de db.py), relu avant chaque
+# recherche (une lecture d'index) : les écritures d'un autre processus
+# sont prises en compte aussi. Pas de délai entre deux relectures :
+# les résultats correspondent toujours à la version du catalogue
+# annoncée dans l'ETag (main.py). Le journal est compacté au démarrage
+# (db.py) : un trou dans les seq → reconstruction complète.
+# -------------------------------------------------------
+import heapq
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .catalog import catalog_version
+
+FUZZY_THRESHOLD = float(os.getenv("FUZZY_THRESHOLD", "0.3"))
+FUZZY_MAX_CANDIDATES = int(os.getenv("FUZZY_MAX_CANDIDATES", "200"))
+FUZZY_MAX_WORDS = 5
+MAX_WORD_LEN = 32
+
+_SELECT = "SELECT id, slug, name, categorie, level, aliases FROM sports"
+
+
+def fold(text: Optional[str]) -> List[str]:
+    """'Natación, Fútbol' → ['natacion', 'futbol']"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.findall(r"[^\W_]+", text.casefold())
+
+
+def trigrams(word: str) -> FrozenSet[str]:
+    padded = f"  {word[:MAX_WORD_LEN]} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(query: FrozenSet[str], word: FrozenSet[str]) -> float:
+    common = len(query & word)
+    if not common:
+        return 0.0
+    return (common / len(query | word) + common / len(query)) / 2
+
+
+class TrigramIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # id sqlite → (sport renvoyé par l'API, trigrammes de chaque mot)
+        self._docs: Dict[int, Tuple[Dict[str, Any], List[FrozenSet[str]]]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self.seq: Optional[int] = None   # dernier sports_changes.seq appliqué
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------------- mise à jour ----------------
+    def _add(self, row) -> None:
+        words = dict.fromkeys(fold(row["name"]) + fold(row["aliases"]))
+        grams = [trigrams(w) for w in words]
+        item = {"id": row["slug"], "name": row["name"], "category": row["categorie"], "level": row["level"]}
+        self._docs[row["id"]] = (item, grams)
+        for g in frozenset().union(*grams):
+            self._postings.setdefault(g, set()).add(row["id"])
+
+    def _remove(self, doc_id: int) -> None:
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for g in frozenset().union(*doc[1]):
+            ids = self._postings.get(g)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._postings[g]
+
+    def load(self, conn) -> None:
+        """Construction complète (démarrage)."""
+        seq = catalog_version(conn)
+        rows = conn.execute(_SELECT).fetchall()
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            for row in rows:
+                self._add(row)
+            self.seq = seq
+
+    def refresh(self, conn) -> None:
+        """Applique les modifications du catalogue depuis le dernier passage."""
+        if self.seq is None:
+            self.load(conn)
+            return
+        changes = conn.execute(
+            "SELECT seq, sport_id, kind FROM sports_changes WHERE seq > ? ORDER BY seq", (self.seq,)
+        ).fetchall()
+        if not changes:
+            return
+        if changes[0]["seq"] != self.seq + 1:
+            # entrées supprimées par le compactage : on ne sait plus quoi relire
+            self.load(conn)
+            return
+        # les exercices (kind='exercise') font avancer la version, pas l'index
+        ids = list({r["sport_id"] for r in changes if r["kind"] == "sport"})
+        marks = ",".join("?" * len(ids))
+        rows = conn.execute(f"{_SELECT} WHERE id IN ({marks})", ids).fetchall() if ids else []
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+            for row in rows:
+                self._add(row)
+            self.seq = changes[-1]["seq"]
+
+    # ---------------- recherche ----------------
+    def search(self, q: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        """Sports classés par similarité (meilleur d'abord), avec leur `score`."""
+        words = list(dict.fromkeys(fold(q)))[:FUZZY_MAX_WORDS]
+        if not words:
+            return []
+        queries = [trigrams(w) for w in words]
+        with self._lock:
+            shared: Counter = Counter()
+            for grams in queries:
+                for g in grams:
+                    shared.update(self._postings.get(g, ()))
+            candidates = heapq.nlargest(FUZZY_MAX_CANDIDATES, shared, key=shared.__getitem__)
+            scored = []
+            for doc_id in candidates:
+                item, doc_grams = self._docs[doc_id]
+                score = sum(max(similarity(qg, dg) for dg in doc_grams) for qg in queries) / len(queries)
+                if score >= FUZZY_THRESHOLD:
+                    scored.append((-score, item["name"], item))
+        scored.sort(key=lambda s: s[:2])
+        return [dict(item, score=round(-neg, 3)) for neg, _, item in scored[offset:offset + limit]]
+
+
+index = TrigramIndex()
@@ -0,0 +1,108 @@
+# app/http_cache.py
+
+# -------------------------------------------------------
+# Cache HTTP (ETag / If-None-Match / Cache-Control)
+# Module identique dans les services auth, sports et reco :
+# - make_etag() : ETag fort calculé sur le corps JSON
+# - version_etag() : ETag dérivé d'un numéro de version des données
+#   (ex. catalogue des sports) → 304 sans relire ni sérialiser
+# - json_response() : 304 si le client a déjà cette version,
+#   sinon le corps JSON déjà sérialisé (bytes)
+# - BytesCache : LRU de réponses sérialisées, valables pour une version
+# Compteur http_cache_total{route, outcome} (not_modified / full).
+# Copies vérifiées par services/check_shared_modules.py (--sync pour les réaligner).
+# -------------------------------------------------------
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .metrics import REGISTRY, Counter
+
+HTTP_CACHE = Counter(
+    "http_cache_total", "Réponses avec ETag : 304 (not_modified) ou corps complet (full).", ("route", "outcome")
+)
+REGISTRY.append(HTTP_CACHE)
+
+
+def dumps(content: Any) -> bytes:
+    """Même sérialisation que JSONResponse (datetime, modèles Pydantic…)."""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{_digest(body)}"'
+
+
+def version_etag(version: int, key: Hashable) -> str:
+    """ETag d'une vue (`key` : route + paramètres) d'une version des données."""
+    return f'"v{version}-{_digest(repr(key).encode())}"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # comparaison faible (RFC 9110) : W/"x" == "x"
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def json_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    cache_control: str,
+    route: str,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": cache_control}
+    if not_modified(request, etag):
+        HTTP_CACHE.inc(route, "not_modified")
+        return Response(status_code=304, headers=headers)
+    HTTP_CACHE.inc(route, "full")
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class BytesCache:
+    """LRU thread-safe : clé → (version, corps sérialisé, headers)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[int, bytes, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] != version:
+                return None
+            self._data.move_to_end(key)
+            return item[1], item[2]
+
+    def set(self, key: Hashable, version: int, body: bytes, headers: Dict[str, str]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (version, body, headers)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
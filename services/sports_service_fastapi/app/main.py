@@ -1,15 +1,24 @@
 # services/sports_service_fastapi/app/main.py
 
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+from typing import Optional
 
 
-# Import pour l’envoi d’e-mails
-from .email_utils import send_daily_summary_email
-from pydantic import BaseModel
+# Import pour l’envoi d’e-mails (outbox + envoi en arrière-plan)
+from .email_utils import check_smtp_config, render_daily_summary
+from .outbox import enqueue, enqueue_many, get_batch, get_message, outbox_sender
+from .db import init_db, get_conn
+from . import catalog, fuzzy
+from .exercises import KINDS, LEVELS, MUSCLES, list_exercises
+from .plans import generate_plan, get_library
+from .http_cache import BytesCache, dumps, json_response, not_modified, version_etag
+from .metrics import setup_metrics
+from .logs import setup_logging
+from pydantic import BaseModel, Field
 
 # -------------------------------------------------------
 # Charger le fichier .env depuis la racine du projet
@@ -22,10 +31,34 @@ load_dotenv(ROOT_ENV)
 # -------------------------------------------------------
 SPORTS_PORT = int(os.getenv("SPORTS_PORT") or os.getenv("PORT", "8002"))
 
+# -------------------------------------------------------
+# Cache HTTP du catalogue : ETag = version du catalogue (sports_changes)
+# + paramètres ; réponses JSON gardées sérialisées pour cette version
+# -------------------------------------------------------
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "512"))
+catalog_responses = BytesCache(CATALOG_CACHE_SIZE)
+
 # -------------------------------------------------------
 # Création de l’application FastAPI
 # -------------------------------------------------------
 app = FastAPI(title="Sports Service")
+setup_metrics(app)
+setup_logging(app, "sports")
+
+# -------------------------------------------------------
+# Démarrage / arrêt : base SQLite et envoi des e-mails en attente
+# -------------------------------------------------------
+@app.on_event("startup")
+async def startup():
+    init_db()
+    fuzzy.index.load(get_conn())
+    await outbox_sender.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await outbox_sender.stop()
 
 # -------------------------------------------------------
 # CORS : autoriser les appels du frontend Vite
@@ -41,32 +74,128 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Offset", "X-Search-Mode", "ETag"],
 )
 
 # -------------------------------------------------------
-# Petite base statique de sports disponibles
+# Réponse du catalogue avec ETag / 304 : la version est lue avant tout,
+# un client à jour reçoit un 304 sans requête sur le catalogue ;
+# sinon corps déjà sérialisé pour cette version, ou `build(conn)`
+# (→ contenu, headers) puis mis en cache.
 # -------------------------------------------------------
-SPORTS = [
-    {"id": "run", "name": "Running", "level": "beginner"},
-    {"id": "yoga", "name": "Yoga", "level": "all"},
-    {"id": "swim", "name": "Natación", "level": "all"},
-    {"id": "strength", "name": "Fuerza", "level": "intermediate"},
-]
+def _catalog_response(request: Request, key: tuple, build):
+    conn = get_conn()
+    version = catalog.catalog_version(conn)
+    etag = version_etag(version, key)
+    cache_control = f"public, max-age={CATALOG_MAX_AGE}"
+    if not_modified(request, etag):
+        return json_response(request, b"", etag, cache_control, "catalog")
+    cached = catalog_responses.get(key, version)
+    if cached is None:
+        content, headers = build(conn)
+        cached = (dumps(content), headers)
+        catalog_responses.set(key, version, *cached)
+    body, headers = cached
+    return json_response(request, body, etag, cache_control, "catalog", headers)
 
 # -------------------------------------------------------
-# Retourne la liste complète des sports
+# Retourne la liste des sports (toute la liste sans `limit`)
+# Source : table `sports` de sports.db (seed dans db.py)
 # -------------------------------------------------------
 @app.get("/sports")
-def list_sports():
-    return SPORTS
+def list_sports(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    return _catalog_response(
+        request, ("list", limit, offset),
+        lambda conn: (catalog.list_sports(conn, limit, offset), {}),
+    )
 
 # -------------------------------------------------------
-# Recherche simple par nom (filtre sur la liste)
+# Recherche plein texte (nom, aliases, catégorie, niveau), sans accents
+# et par préfixe, classée par pertinence.
+# mode=auto : si le plein texte ne trouve rien, recherche approximative
+# (fautes de frappe, mots partiels ; résultats avec un `score`).
+# mode=fts / mode=fuzzy : un seul des deux.
+# Page suivante : header X-Next-Offset ; moteur utilisé : X-Search-Mode
 # -------------------------------------------------------
+def _search(conn, q: str, limit: int, offset: int, mode: str):
+    # une ligne de plus pour savoir s'il reste une page
+    results = [] if mode == "fuzzy" else catalog.search_sports(conn, q, limit + 1, offset)
+    # en auto, les pages suivantes restent sur le moteur de la 1re page
+    if mode == "fuzzy" or (
+        mode == "auto" and not results and q.strip()
+        and (offset == 0 or not catalog.search_sports(conn, q, 1))
+    ):
+        mode = "fuzzy"
+        # l'index doit correspondre à la version annoncée dans l'ETag
+        fuzzy.index.refresh(conn)
+        results = fuzzy.index.search(q, limit + 1, offset)
+    headers = {"X-Search-Mode": "fuzzy" if mode == "fuzzy" else "fts"}
+    if len(results) > limit:
+        results = results[:limit]
+        headers["X-Next-Offset"] = str(offset + limit)
+    return results, headers
+
+
 @app.get("/sports/search")
-def search(q: str = Query("")):
-    ql = q.lower()
-    return [s for s in SPORTS if ql in s["name"].lower()]
+def search(
+    request: Request,
+    q: str = Query(""),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    mode: str = Query("auto", pattern="^(auto|fts|fuzzy)$"),
+):
+    return _catalog_response(
+        request, ("search", q, limit, offset, mode),
+        lambda conn: _search(conn, q, limit, offset, mode),
+    )
+
+# -------------------------------------------------------
+# Bibliothèque d'exercices (filtres optionnels, `level` = niveau max)
+# Même cache HTTP que le catalogue (ETag = version du catalogue)
+# -------------------------------------------------------
+@app.get("/exercises")
+def exercises(
+    request: Request,
+    lang: str = Query("fr", pattern="^(fr|es|en)$"),
+    kind: Optional[str] = Query(None, pattern=f"^({'|'.join(KINDS)})$"),
+    muscle: Optional[str] = Query(None, pattern=f"^({'|'.join(MUSCLES)})$"),
+    equipment: Optional[str] = None,
+    level: Optional[str] = Query(None, pattern=f"^({'|'.join(LEVELS)})$"),
+    sport: Optional[str] = None,
+):
+    return _catalog_response(
+        request, ("exercises", lang, kind, muscle, equipment, level, sport),
+        lambda conn: (list_exercises(conn, lang, kind, muscle, equipment, level, sport), {}),
+    )
+
+# -------------------------------------------------------
+# Plan d'entraînement hebdomadaire (moteur local, voir plans.py)
+# Déterministe : même profil → même plan ; `week` (1, 2, 3…) fait
+# progresser le volume sur un cycle de 4 semaines.
+# `goal_matched` = objectif reconnu (sinon plan "forme générale").
+# -------------------------------------------------------
+class PlanRequest(BaseModel):
+    goal: Optional[str] = None                 # texte libre FR / ES / EN
+    level: str = "beginner"                    # beginner, intermediate, advanced
+    days_per_week: int = Field(3, ge=1, le=6)
+    session_minutes: int = Field(45, ge=20, le=120)
+    equipment: list[str] = []                  # dumbbells, band, bike, pool, ball, racket…
+    sports: list[str] = []                     # slugs du catalogue (run, swim…)
+    age: Optional[int] = None
+    weight_kg: Optional[float] = None
+    height_cm: Optional[float] = None
+    low_impact: bool = False
+    week: int = Field(1, ge=1, le=52)
+    lang: str = "fr"
+
+
+@app.post("/plans/generate")
+def plans_generate(data: PlanRequest):
+    return generate_plan(get_library(get_conn()), **data.model_dump())
 
 # =======================================================
 # 📧 NOUVEL ENDPOINT : ENVOYER UN RÉSUMÉ PAR E-MAIL
@@ -77,20 +206,77 @@ class DailySummaryRequest(BaseModel):
     client_name: str
     checklist: list[str]
     evolution: str
+    lang: str = "fr"          # fr, es ou en (texte + HTML)
 
 
-@app.post("/send-daily-summary")
+@app.post("/send-daily-summary", status_code=202)
 def send_summary(data: DailySummaryRequest):
     """
-    Envoie au client un résumé quotidien d'entraînement par e-mail.
+    Met en file un résumé quotidien d'entraînement pour le client.
+    L'e-mail part en arrière-plan (voir outbox.py) ; suivi avec
+    GET /send-daily-summary/{message_id}.
     """
-    send_daily_summary_email(
-        to_email=data.email,
+    try:
+        check_smtp_config()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    subject, body, html = render_daily_summary(
         client_name=data.client_name,
         checklist=data.checklist,
-        evolution_text=data.evolution
+        evolution_text=data.evolution,
+        lang=data.lang,
     )
-    return {"message": "Résumé envoyé avec succès."}
+    message_id = enqueue(data.email, subject, body, html)
+    return {"message": "Résumé en cours d'envoi.", "message_id": message_id, "status": "pending"}
+
+
+# -------------------------------------------------------
+# Envoi groupé : une requête pour tous les clients d'un coach
+# (messages envoyés par connexions SMTP persistantes, voir outbox.py)
+# -------------------------------------------------------
+BATCH_MAX_ENTRIES = int(os.getenv("BATCH_MAX_ENTRIES", "5000"))
+
+
+class DailySummaryBatch(BaseModel):
+    entries: list[DailySummaryRequest]
+
+
+@app.post("/send-daily-summary/batch", status_code=202)
+def send_summary_batch(data: DailySummaryBatch):
+    if not data.entries:
+        raise HTTPException(status_code=400, detail="entries is empty")
+    if len(data.entries) > BATCH_MAX_ENTRIES:
+        raise HTTPException(status_code=413, detail=f"too many entries (max {BATCH_MAX_ENTRIES})")
+    try:
+        check_smtp_config()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    messages = [
+        (e.email, *render_daily_summary(e.client_name, e.checklist, e.evolution, e.lang))
+        for e in data.entries
+    ]
+    batch_id, message_ids = enqueue_many(messages)
+    return {"batch_id": batch_id, "count": len(message_ids), "status": "pending"}
+
+
+@app.get("/send-daily-summary/batch/{batch_id}")
+def summary_batch_status(batch_id: str):
+    """Avancement d'un envoi groupé (pending / sent / failed)."""
+    batch = get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="batch not found")
+    return batch
+
+
+@app.get("/send-daily-summary/{message_id}")
+def summary_status(message_id: str):
+    """Statut d'un e-mail : pending, sent ou failed."""
+    message = get_message(message_id)
+    if message is None:
+        raise HTTPException(status_code=404, detail="message not found")
+    return message
 
 
 # -------------------------------------------------------
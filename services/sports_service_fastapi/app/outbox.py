@@ -0,0 +1,268 @@
+# services/sports_service_fastapi/app/outbox.py
+
+# -------------------------------------------------------
+# Outbox des e-mails (table `outbox` de sports.db)
+# - /send-daily-summary enregistre le message et répond tout de suite
+#   avec son identifiant (aussi utilisé pour l'en-tête Message-ID)
+# - une tâche de fond prend les messages dus par lots et les envoie
+#   en parallèle sur les connexions persistantes de smtp_pool
+#   (STARTTLS + login une fois par connexion, pas par message),
+#   au rythme des limites par fournisseur (SMTP_RATE_LIMITS)
+# - envoi groupé : enqueue_many (un lot = un batch_id)
+# - échec temporaire : nouvel essai avec backoff exponentiel ;
+#   erreur 5xx ou OUTBOX_MAX_ATTEMPTS atteint → status "failed"
+# Chaque lot est "loué" (next_attempt_at = fin du bail) : après un
+# crash, ou avec plusieurs workers, un message n'est repris qu'à la
+# fin du bail. Livraison "au moins une fois".
+# -------------------------------------------------------
+import asyncio
+import logging
+import os
+import smtplib
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from .db import get_conn
+from .email_utils import build_mime_message
+from .metrics import REGISTRY, Counter, track_outbound
+from .smtp_pool import SMTP_RATE_LIMITS, ProviderRateLimits, SmtpPool
+
+# -------------------------------------------------------
+# Configuration
+# -------------------------------------------------------
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+# après un réveil, on laisse arriver les messages suivants pour remplir le lot
+OUTBOX_FLUSH_MS = float(os.getenv("OUTBOX_FLUSH_MS", "100"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+
+EMAILS = Counter(
+    "sports_emails_total",
+    "E-mails de l'outbox (queued, sent, retried, failed).",
+    ("outcome",),
+)
+REGISTRY.append(EMAILS)
+
+logger = logging.getLogger("sports.outbox")
+
+smtp_pool = SmtpPool()
+rate_limits = ProviderRateLimits(SMTP_RATE_LIMITS)
+
+
+# =======================================================
+#                 Table outbox
+# =======================================================
+def enqueue(to_email: str, subject: str, body: str, html: Optional[str] = None) -> str:
+    """Enregistre un message à envoyer ; retourne son identifiant."""
+    message_id = uuid.uuid4().hex
+    with get_conn() as c:
+        c.execute(
+            "INSERT INTO outbox(id, to_email, subject, body, html, next_attempt_at) VALUES(?,?,?,?,?,?)",
+            (message_id, to_email, subject, body, html, time.time()),
+        )
+    EMAILS.inc("queued")
+    outbox_sender.wake()
+    return message_id
+
+
+def enqueue_many(messages: List[Tuple[str, str, str, Optional[str]]]) -> Tuple[str, List[str]]:
+    """Enregistre (to_email, subject, body, html)… en une transaction ; retourne (batch_id, ids)."""
+    batch_id = uuid.uuid4().hex
+    now = time.time()
+    rows = [(uuid.uuid4().hex, batch_id, *message, now) for message in messages]
+    with get_conn() as c:
+        c.executemany(
+            "INSERT INTO outbox(id, batch_id, to_email, subject, body, html, next_attempt_at) VALUES(?,?,?,?,?,?,?)",
+            rows,
+        )
+    EMAILS.inc("queued", amount=len(rows))
+    outbox_sender.wake()
+    return batch_id, [r[0] for r in rows]
+
+
+def get_batch(batch_id: str) -> Optional[Dict]:
+    """Nombre de messages du lot par statut."""
+    with get_conn() as c:
+        rows = c.execute(
+            "SELECT status, COUNT(*) AS n FROM outbox WHERE batch_id=? GROUP BY status",
+            (batch_id,),
+        ).fetchall()
+    if not rows:
+        return None
+    counts = {"pending": 0, "sent": 0, "failed": 0}
+    counts.update({r["status"]: r["n"] for r in rows})
+    return {"batch_id": batch_id, "total": sum(counts.values()), **counts}
+
+
+def get_message(message_id: str) -> Optional[Dict]:
+    with get_conn() as c:
+        row = c.execute(
+            "SELECT id, to_email, status, attempts, last_error, created_at, sent_at FROM outbox WHERE id=?",
+            (message_id,),
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def _claim(limit: int) -> List[Dict]:
+    """Prend les messages dus et les loue pour OUTBOX_LEASE_SECONDS."""
+    now = time.time()
+    with get_conn() as c:
+        rows = c.execute(
+            """
+            UPDATE outbox SET next_attempt_at = ?
+            WHERE id IN (
+              SELECT id FROM outbox WHERE status='pending' AND next_attempt_at <= ?
+              ORDER BY next_attempt_at LIMIT ?
+            )
+            RETURNING id, to_email, subject, body, html, attempts
+            """,
+            (now + OUTBOX_LEASE_SECONDS, now, limit),
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def _next_due() -> Optional[float]:
+    with get_conn() as c:
+        row = c.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status='pending'").fetchone()
+    return row[0]
+
+
+def _backoff(attempts: int) -> float:
+    return min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX_SECONDS)
+
+
+def _permanent(error: Exception) -> bool:
+    """Refus définitif (5xx) : inutile de réessayer."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        # pas de smtp_code : un code par destinataire refusé
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(code >= 500 for code in codes)
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def _record(results: Dict[str, Optional[Exception]], messages: List[Dict]) -> None:
+    now = time.time()
+    sent, retry, failed = [], [], []
+    for m in messages:
+        error = results.get(m["id"])
+        attempts = m["attempts"] + 1
+        if error is None:
+            sent.append((attempts, m["id"]))
+            continue
+        if _permanent(error) or attempts >= OUTBOX_MAX_ATTEMPTS:
+            failed.append((attempts, repr(error)[:500], m["id"]))
+        else:
+            retry.append((attempts, now + _backoff(attempts), repr(error)[:500], m["id"]))
+
+    with get_conn() as c:
+        c.executemany(
+            "UPDATE outbox SET status='sent', attempts=?, last_error=NULL, sent_at=datetime('now') WHERE id=?",
+            sent,
+        )
+        c.executemany(
+            "UPDATE outbox SET attempts=?, next_attempt_at=?, last_error=? WHERE id=?",
+            retry,
+        )
+        c.executemany(
+            "UPDATE outbox SET status='failed', attempts=?, last_error=? WHERE id=?",
+            failed,
+        )
+    EMAILS.inc("sent", amount=len(sent))
+    EMAILS.inc("retried", amount=len(retry))
+    EMAILS.inc("failed", amount=len(failed))
+    for _, error, message_id in failed:
+        logger.warning("e-mail abandonné", extra={"message_id": message_id, "error": error})
+
+
+# =======================================================
+#                 Envoi (threads, connexions du pool)
+# =======================================================
+def _deliver(messages: List[Dict]) -> Dict[str, Optional[Exception]]:
+    """
+    Envoie une partie d'un lot sur une connexion du pool (appel bloquant).
+    Retourne {id: None si envoyé, sinon l'exception}.
+    """
+    results: Dict[str, Optional[Exception]] = {}
+    try:
+        with track_outbound("smtp"), smtp_pool.connection() as server:
+            for m in messages:
+                rate_limits.wait(m["to_email"])
+                msg = build_mime_message(m["to_email"], m["subject"], m["body"], m["id"], m["html"])
+                try:
+                    server.send_message(msg)
+                    results[m["id"]] = None
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                    # refus de ce message seulement : la session reste utilisable
+                    results[m["id"]] = e
+    except Exception as e:
+        # connexion / login / coupure : les messages non envoyés seront réessayés
+        for m in messages:
+            results.setdefault(m["id"], e)
+    return results
+
+
+class OutboxSender:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    def wake(self) -> None:
+        """Appelable depuis n'importe quel thread (routes `def`)."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def send_due(self) -> int:
+        """Envoie tous les messages dus ; retourne le nombre de lots traités."""
+        batches = 0
+        while True:
+            messages = await asyncio.to_thread(_claim, OUTBOX_BATCH_SIZE)
+            if not messages:
+                return batches
+            # une part du lot par connexion du pool, envoyées en parallèle
+            parts = [messages[i::smtp_pool.size] for i in range(min(smtp_pool.size, len(messages)))]
+            results: Dict[str, Optional[Exception]] = {}
+            for part in await asyncio.gather(*(asyncio.to_thread(_deliver, p) for p in parts)):
+                results.update(part)
+            await asyncio.to_thread(_record, results, messages)
+            batches += 1
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.send_due()
+                due = await asyncio.to_thread(_next_due)
+            except Exception:
+                logger.exception("erreur de l'outbox")
+                due = None
+            # dort jusqu'au prochain message dû (au plus OUTBOX_POLL_SECONDS)
+            delay = OUTBOX_POLL_SECONDS if due is None else min(max(due - time.time(), 0.05), OUTBOX_POLL_SECONDS)
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+                await asyncio.sleep(OUTBOX_FLUSH_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def stop(self) -> None:
+        # les messages restent dans la table : repris au prochain démarrage
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        await asyncio.to_thread(smtp_pool.close)
+        self._loop = None
+
+
+outbox_sender = OutboxSender()
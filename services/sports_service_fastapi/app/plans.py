@@ -0,0 +1,422 @@
+# services/sports_service_fastapi/app/plans.py
+
+# -------------------------------------------------------
+# Générateur de plans d'entraînement (local, déterministe, sans LLM)
+# Profil → semaine de séances en quelques millisecondes ;
+# mêmes entrées → même plan.
+# Règles :
+# - objectif en texte libre FR / ES / EN ("Perte de poids", "ganar masa
+#   muscular"…) → weight_loss, muscle_gain, endurance, flexibility ou
+#   general ; un modèle de semaine par objectif (WEEK_TEMPLATES)
+# - jours répartis dans la semaine (WEEK_DAYS)
+# - exercices retenus : niveau ≤ niveau de l'utilisateur, matériel
+#   disponible (ou sport préféré), faible impact si IMC ≥ 30, âge ≥ 60
+#   ou demandé ; les sports préférés passent en premier
+# - séance = échauffement + bloc principal + retour au calme dans la
+#   durée demandée ; séries / répétitions selon l'objectif et le niveau
+# - progression sur 4 semaines (WEEK_FACTORS : la 4e est allégée)
+# La bibliothèque (exercises.py) est gardée en mémoire et relue quand la
+# version du catalogue (sports_changes) change.
+# Vérifier qu'aucune séance ne dépasse la durée demandée (20-120 min) :
+#   python -m app.plans
+# -------------------------------------------------------
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .catalog import catalog_version
+from .exercises import BASIC_EQUIPMENT, LEVELS, load_exercises
+from .fuzzy import fold
+
+LANGS = ("fr", "es", "en")
+
+GOAL_KEYWORDS = {
+    "weight_loss": (
+        "perte de poids", "perdre du poids", "maigrir", "mincir", "perder peso", "bajar de peso",
+        "adelgazar", "weight loss", "lose weight", "fat loss",
+    ),
+    "muscle_gain": (
+        "prise de masse", "muscl", "muscu", "masa muscular", "ganar masa", "hipertrofia", "tonifier",
+        "tonificar", "build muscle", "fuerza", "strength",
+    ),
+    "endurance": ("endurance", "resistencia", "cardio", "marathon", "maraton", "trail", "triathlon"),
+    "flexibility": ("souplesse", "mobilite", "flexibilidad", "movilidad", "flexibility", "mobility", "yoga"),
+    "general": ("forme", "sante", "bien etre", "salud", "en forma", "fitness", "health", "general"),
+}
+# mots-clés sans accents ni ponctuation, comme le texte de l'objectif
+_GOAL_KEYWORDS = {goal: [" ".join(fold(k)) for k in kws] for goal, kws in GOAL_KEYWORDS.items()}
+
+# focus des séances par objectif, par priorité : les n premiers pour n séances
+WEEK_TEMPLATES = {
+    "weight_loss": ("cardio", "strength:full", "cardio", "strength:full", "mobility", "cardio:intervals"),
+    "muscle_gain": ("strength:lower", "strength:upper", "strength:full", "cardio", "strength:upper", "strength:lower"),
+    "endurance": ("cardio", "strength:full", "cardio:long", "cardio:intervals", "mobility", "cardio"),
+    "flexibility": ("mobility", "strength:full", "mobility", "cardio", "mobility", "strength:full"),
+    "general": ("strength:full", "cardio", "mobility", "strength:full", "cardio", "mobility"),
+}
+# jours d'entraînement (0 = lundi) selon le nombre de séances
+WEEK_DAYS = {1: (2,), 2: (0, 3), 3: (0, 2, 4), 4: (0, 1, 3, 4), 5: (0, 1, 2, 4, 5), 6: (0, 1, 2, 3, 4, 5)}
+# volume par semaine du cycle de 4 semaines
+WEEK_FACTORS = (1.0, 1.1, 1.2, 0.8)
+
+# focus → type d'exercice, muscles visés, intensités retenues (cardio)
+FOCUS = {
+    "cardio": {"kind": "cardio", "muscles": ("legs",), "intensity": (1, 2)},
+    # sortie longue : exercice au format long (>= LONG_MIN_MINUTES), sans
+    # dépasser la durée de séance demandée
+    "cardio:long": {"kind": "cardio", "muscles": ("legs",), "intensity": (1, 2), "long": True},
+    # fractionné : durée de l'exercice, pas toute la séance
+    "cardio:intervals": {"kind": "cardio", "muscles": ("legs",), "intensity": (3,), "cap": True},
+    "strength:lower": {"kind": "strength", "muscles": ("legs", "glutes", "core")},
+    "strength:upper": {"kind": "strength", "muscles": ("chest", "back", "shoulders", "arms", "core")},
+    "strength:full": {"kind": "strength", "muscles": ("legs", "back", "chest", "glutes", "core", "shoulders")},
+    "mobility": {"kind": "mobility", "muscles": ("full_body", "back", "legs", "shoulders")},
+}
+LONG_MIN_MINUTES = 40
+# durée minimale du bloc principal (avant échauffement / retour au calme)
+MIN_MAIN_MINUTES = 10
+# focus de remplacement si aucun exercice ne convient (ex. fractionné débutant)
+FOCUS_FALLBACK = {"cardio:intervals": "cardio", "cardio:long": "cardio", "cardio": "mobility"}
+
+# séries et répétitions par objectif (débutant : une série de moins)
+SETS_REPS = {
+    "weight_loss": (3, "12-15"),
+    "muscle_gain": (4, "8-10"),
+    "endurance": (2, "15-20"),
+    "flexibility": (2, "10-12"),
+    "general": (3, "10-12"),
+}
+HOLD = {"beginner": "20-30 s", "intermediate": "30-45 s", "advanced": "45-60 s"}
+
+# ---------------- libellés ----------------
+DAY_NAMES = {
+    "fr": ("Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"),
+    "es": ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"),
+    "en": ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"),
+}
+FOCUS_TITLES = {
+    "cardio": {"fr": "Cardio", "es": "Cardio", "en": "Cardio"},
+    "cardio:long": {"fr": "Endurance longue", "es": "Fondo largo", "en": "Long endurance"},
+    "cardio:intervals": {"fr": "Fractionné", "es": "Intervalos", "en": "Intervals"},
+    "strength:lower": {"fr": "Renforcement bas du corps", "es": "Fuerza tren inferior", "en": "Lower-body strength"},
+    "strength:upper": {"fr": "Renforcement haut du corps", "es": "Fuerza tren superior", "en": "Upper-body strength"},
+    "strength:full": {"fr": "Renforcement complet", "es": "Fuerza cuerpo completo", "en": "Full-body strength"},
+    "mobility": {"fr": "Mobilité et souplesse", "es": "Movilidad y flexibilidad", "en": "Mobility and flexibility"},
+}
+GOAL_LABELS = {
+    "weight_loss": {"fr": "perte de poids", "es": "pérdida de peso", "en": "weight loss"},
+    "muscle_gain": {"fr": "prise de muscle", "es": "ganancia muscular", "en": "muscle gain"},
+    "endurance": {"fr": "endurance", "es": "resistencia", "en": "endurance"},
+    "flexibility": {"fr": "souplesse", "es": "flexibilidad", "en": "flexibility"},
+    "general": {"fr": "forme générale", "es": "forma general", "en": "general fitness"},
+}
+LEVEL_LABELS = {
+    "beginner": {"fr": "débutant", "es": "principiante", "en": "beginner"},
+    "intermediate": {"fr": "intermédiaire", "es": "intermedio", "en": "intermediate"},
+    "advanced": {"fr": "avancé", "es": "avanzado", "en": "advanced"},
+}
+INTENSITY_LABELS = {
+    1: {"fr": "intensité facile", "es": "intensidad suave", "en": "easy effort"},
+    2: {"fr": "intensité modérée", "es": "intensidad moderada", "en": "moderate effort"},
+    3: {"fr": "intensité soutenue", "es": "intensidad alta", "en": "hard effort"},
+}
+TEXTS = {
+    "title": {
+        "fr": "Plan d'entraînement – semaine {week} ({goal}, {level}, {sessions} séances)",
+        "es": "Plan de entrenamiento – semana {week} ({goal}, {level}, {sessions} sesiones)",
+        "en": "Training plan – week {week} ({goal}, {level}, {sessions} sessions)",
+    },
+    "tips": {"fr": "Conseils :", "es": "Consejos:", "en": "Tips:"},
+    "warmup": {
+        "fr": "Commencez toujours par l'échauffement et augmentez l'intensité progressivement.",
+        "es": "Empieza siempre con el calentamiento y aumenta la intensidad de forma progresiva.",
+        "en": "Always start with the warm-up and increase intensity gradually.",
+    },
+    "low_impact": {
+        "fr": "Exercices à faible impact privilégiés pour ménager les articulations.",
+        "es": "Se priorizan ejercicios de bajo impacto para cuidar las articulaciones.",
+        "en": "Low-impact exercises are favoured to protect your joints.",
+    },
+    "deload": {
+        "fr": "Semaine allégée : volume réduit pour bien récupérer.",
+        "es": "Semana de descarga: volumen reducido para recuperarte bien.",
+        "en": "Deload week: reduced volume to recover well.",
+    },
+    "rest": {
+        "fr": "Dormez 7 à 9 h et gardez au moins un jour de repos complet.",
+        "es": "Duerme de 7 a 9 h y guarda al menos un día de descanso completo.",
+        "en": "Sleep 7 to 9 hours and keep at least one full rest day.",
+    },
+    "medical": {
+        "fr": "En cas de douleur ou de condition médicale, consultez un professionnel de la santé.",
+        "es": "Ante dolor o una condición médica, consulta a un profesional de la salud.",
+        "en": "If you feel pain or have a medical condition, consult a health professional.",
+    },
+}
+
+
+def normalize_goal(goal: Optional[str]) -> Tuple[str, bool]:
+    """Texte libre → (objectif, reconnu ?) ; inconnu → ("general", False)."""
+    text = " ".join(fold(goal))
+    for key, keywords in _GOAL_KEYWORDS.items():
+        if any(k in text for k in keywords):
+            return key, True
+    return "general", False
+
+
+def _lang(lang: Optional[str]) -> str:
+    lang = (lang or "fr").lower()[:2]
+    return lang if lang in LANGS else "fr"
+
+
+# ---------------- bibliothèque en mémoire ----------------
+_library_lock = threading.Lock()
+_library: Tuple[Optional[int], List[Dict[str, Any]]] = (None, [])
+
+
+def get_library(conn) -> List[Dict[str, Any]]:
+    """Exercices en mémoire, relus si le catalogue a changé."""
+    global _library
+    version = catalog_version(conn)
+    if _library[0] != version:
+        with _library_lock:
+            if _library[0] != version:
+                _library = (version, load_exercises(conn))
+    return _library[1]
+
+
+# ---------------- construction des séances ----------------
+def _pick(options: List[Dict[str, Any]], turn: int, sports: Sequence[str]) -> Dict[str, Any]:
+    """Choix stable : sports préférés d'abord, puis rotation selon `turn`."""
+    preferred = [o for o in options if o["sport"] in sports]
+    group = preferred or options
+    return group[turn % len(group)]
+
+
+def _block(ex: Dict[str, Any], part: str, minutes: int, lang: str, **extra) -> Dict[str, Any]:
+    return {"part": part, "exercise": ex["id"], "name": ex["names"][lang], "duration_min": minutes, **extra}
+
+
+def _strength_blocks(cands, muscles, minutes, turn, goal, level, sports, lang) -> List[Dict[str, Any]]:
+    sets, reps = SETS_REPS[goal]
+    if level == "beginner":
+        sets -= 1
+    blocks, used = [], set()
+    # jusqu'à deux tours des muscles visés, tant qu'il reste du temps
+    for i in range(len(muscles) * 2):
+        muscle = muscles[i % len(muscles)]
+        options = [
+            c for c in cands
+            if c["id"] not in used and c["duration_min"] <= minutes
+            and (muscle in c["muscles"] or "full_body" in c["muscles"])
+        ]
+        if not options:
+            continue
+        ex = _pick(options, turn + i, sports)
+        used.add(ex["id"])
+        minutes -= ex["duration_min"]
+        hold = ex["muscles"] == ["core"]
+        blocks.append(_block(
+            ex, "main", ex["duration_min"], lang,
+            sets=sets, reps=HOLD[level] if hold else reps,
+        ))
+    return blocks
+
+
+def _minutes(*blocks) -> int:
+    return sum(b["duration_min"] for b in blocks if b)
+
+
+def _session(focus, day, turn, total, factor, cands, goal, level, sports, lang) -> Dict[str, Any]:
+    spec = FOCUS[focus]
+    mobility = [c for c in cands if c["kind"] == "mobility"]
+    warmups = [c for c in mobility if "full_body" in c["muscles"] and c["duration_min"] <= 10]
+    warmup = warmups[turn % len(warmups)] if warmups else None
+    stretches = [
+        c for c in mobility
+        if c["duration_min"] <= 5 and c is not warmup and set(c["muscles"]) & set(spec["muscles"] + ("legs",))
+    ]
+    cooldown = stretches[turn % len(stretches)] if stretches else None
+    # petit budget (ex. 20 min en semaine allégée) : échauffement le plus
+    # court, puis sans retour au calme, puis sans échauffement ; la séance
+    # ne dépasse jamais `total`
+    if _minutes(warmup, cooldown) + MIN_MAIN_MINUTES > total:
+        shorter = [c for c in warmups if c is not cooldown]
+        warmup = min(shorter, key=lambda c: c["duration_min"]) if shorter else None
+    if _minutes(warmup, cooldown) + MIN_MAIN_MINUTES > total:
+        cooldown = None
+    if _minutes(warmup) + MIN_MAIN_MINUTES > total:
+        warmup = None
+    main = total - _minutes(warmup, cooldown)
+
+    blocks = []
+    if warmup:
+        blocks.append(_block(warmup, "warmup", warmup["duration_min"], lang))
+    if spec["kind"] == "strength":
+        strength = [c for c in cands if c["kind"] == "strength"]
+        blocks += _strength_blocks(strength, spec["muscles"], main, turn, goal, level, sports, lang)
+    elif spec["kind"] == "cardio":
+        options = [c for c in cands if c["kind"] == "cardio" and c["intensity"] in spec["intensity"]]
+        if spec.get("long"):
+            options = [c for c in options if c["duration_min"] >= LONG_MIN_MINUTES] or options
+        if options:
+            ex = _pick(options, turn, sports)
+            if spec.get("cap"):
+                main = min(main, round(ex["duration_min"] * factor))
+            blocks.append(_block(
+                ex, "main", main, lang,
+                intensity=INTENSITY_LABELS[ex["intensity"]][lang],
+            ))
+    else:
+        used = {b["exercise"] for b in blocks} | ({cooldown["id"]} if cooldown else set())
+        for ex in sorted(mobility, key=lambda c: (c["sport"] not in sports, -c["duration_min"])):
+            if ex["id"] not in used and ex["duration_min"] <= main:
+                blocks.append(_block(ex, "main", ex["duration_min"], lang))
+                main -= ex["duration_min"]
+    if cooldown:
+        blocks.append(_block(cooldown, "cooldown", cooldown["duration_min"], lang))
+
+    return {
+        "day": day,
+        "day_name": DAY_NAMES[lang][day],
+        "focus": focus,
+        "title": FOCUS_TITLES[focus][lang],
+        "duration_min": sum(b["duration_min"] for b in blocks),
+        "blocks": blocks,
+    }
+
+
+def _has_options(focus: str, cands: List[Dict[str, Any]]) -> bool:
+    spec = FOCUS[focus]
+    return any(
+        c["kind"] == spec["kind"] and c["intensity"] in spec.get("intensity", (1, 2, 3))
+        for c in cands
+    )
+
+
+def generate_plan(
+    library: List[Dict[str, Any]],
+    goal: Optional[str] = None,
+    level: str = "beginner",
+    days_per_week: int = 3,
+    session_minutes: int = 45,
+    equipment: Sequence[str] = (),
+    sports: Sequence[str] = (),
+    age: Optional[int] = None,
+    weight_kg: Optional[float] = None,
+    height_cm: Optional[float] = None,
+    low_impact: bool = False,
+    week: int = 1,
+    lang: str = "fr",
+) -> Dict[str, Any]:
+    """Plan de la semaine `week` : { goal, goal_matched, sessions, notes, text… }."""
+    lang = _lang(lang)
+    goal_key, matched = normalize_goal(goal)
+    level = level if level in LEVELS else "beginner"
+    days_per_week = min(max(days_per_week, 1), 6)
+    bmi = weight_kg / (height_cm / 100) ** 2 if weight_kg and height_cm else None
+    low_impact = low_impact or (bmi is not None and bmi >= 30) or (age is not None and age >= 60)
+    factor = WEEK_FACTORS[(week - 1) % len(WEEK_FACTORS)]
+    total = round(session_minutes * factor)
+
+    available = set(BASIC_EQUIPMENT) | set(equipment)
+    cands = [
+        ex for ex in library
+        if LEVELS.index(ex["level"]) <= LEVELS.index(level)
+        and not (low_impact and ex["impact"] == "high")
+        and (ex["equipment"] in available or ex["sport"] in sports)
+    ]
+
+    sessions = []
+    for day, focus in zip(WEEK_DAYS[days_per_week], WEEK_TEMPLATES[goal_key]):
+        while not _has_options(focus, cands) and focus in FOCUS_FALLBACK:
+            focus = FOCUS_FALLBACK[focus]
+        # rotation : 2 séances du même focus n'ont pas les mêmes exercices,
+        # et le choix change d'une semaine à l'autre
+        turn = week - 1 + sum(1 for s in sessions if s["focus"] == focus)
+        sessions.append(_session(focus, day, turn, total, factor, cands, goal_key, level, sports, lang))
+
+    notes = [TEXTS["warmup"][lang]]
+    if low_impact:
+        notes.append(TEXTS["low_impact"][lang])
+    if factor < 1:
+        notes.append(TEXTS["deload"][lang])
+    notes += [TEXTS["rest"][lang], TEXTS["medical"][lang]]
+
+    plan = {
+        "goal": goal_key,
+        "goal_matched": matched,
+        "level": level,
+        "week": week,
+        "lang": lang,
+        "low_impact": low_impact,
+        "sessions": sessions,
+        "notes": notes,
+    }
+    plan["text"] = render_text(plan)
+    return plan
+
+
+def render_text(plan: Dict[str, Any]) -> str:
+    """Plan en texte brut (réponse de /reco/generate)."""
+    lang = plan["lang"]
+    lines = [TEXTS["title"][lang].format(
+        week=plan["week"],
+        goal=GOAL_LABELS[plan["goal"]][lang],
+        level=LEVEL_LABELS[plan["level"]][lang],
+        sessions=len(plan["sessions"]),
+    )]
+    for s in plan["sessions"]:
+        lines.append("")
+        lines.append(f"{s['day_name']} – {s['title']} ({s['duration_min']} min)")
+        for b in s["blocks"]:
+            if "sets" in b:
+                detail = f"{b['sets']} × {b['reps']}"
+            elif "intensity" in b:
+                detail = f"{b['duration_min']} min, {b['intensity']}"
+            else:
+                detail = f"{b['duration_min']} min"
+            lines.append(f"  • {b['name']} – {detail}")
+    lines.append("")
+    lines.append(TEXTS["tips"][lang])
+    lines += [f"- {note}" for note in plan["notes"]]
+    return "\n".join(lines)
+
+
+# =======================================================
+#                 Vérification (CLI)
+# =======================================================
+def check_budgets() -> int:
+    """
+    Génère tous les plans possibles (objectif, niveau, séances, durée
+    20-120 min, semaine du cycle) sur la bibliothèque de départ et
+    affiche ceux dont une séance dépasse la durée demandée.
+    """
+    import sqlite3
+    from itertools import product
+
+    from .exercises import SEED_EXERCISES, _COLUMNS
+
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"CREATE TABLE exercises(id INTEGER PRIMARY KEY, {_COLUMNS})")
+    conn.executemany(f"INSERT INTO exercises({_COLUMNS}) VALUES({','.join('?' * 12)})", SEED_EXERCISES)
+    library = load_exercises(conn)
+    equipment = sorted({ex["equipment"] for ex in library})
+
+    overruns = 0
+    for goal, level, days, minutes, week, gear, low in product(
+        WEEK_TEMPLATES, LEVELS, range(1, 7), range(20, 121), range(1, 5), ((), equipment), (False, True)
+    ):
+        plan = generate_plan(library, goal, level, days, minutes, gear, (), low_impact=low, week=week)
+        budget = round(minutes * WEEK_FACTORS[week - 1])
+        for session in plan["sessions"]:
+            if sum(b["duration_min"] for b in session["blocks"]) > budget:
+                overruns += 1
+                print(f"{goal} {level} {days}j {minutes} min S{week} : {session['focus']} "
+                      f"{session['duration_min']} min > {budget}")
+    print(f"{overruns} séance(s) au-delà de la durée demandée")
+    return overruns
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if check_budgets() else 0)
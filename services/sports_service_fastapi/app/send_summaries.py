@@ -0,0 +1,99 @@
+# services/sports_service_fastapi/app/send_summaries.py
+
+# -------------------------------------------------------
+# Envoi groupé des résumés quotidiens (ligne de commande)
+# - entrées : fichier JSON (liste) ou NDJSON de
+#   {"email", "client_name", "checklist", "evolution", "lang"}
+# - met tout dans l'outbox (un batch_id), puis envoie tout de suite
+#   depuis ce processus : connexions SMTP persistantes + limites
+#   par fournisseur (SMTP_POOL_SIZE, SMTP_RATE_LIMITS)
+# - rapport final : envoyés, en échec, débit
+# Si le service tourne, il peut aussi prendre une partie du lot
+# (les messages sont loués : pas de double envoi).
+#
+#   python -m app.send_summaries clients.json
+#   python -m app.send_summaries clients.ndjson --json
+# -------------------------------------------------------
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .db import init_db
+from .email_utils import check_smtp_config, render_daily_summary
+from .outbox import enqueue_many, get_batch, outbox_sender, smtp_pool
+
+
+def load_entries(path: str) -> List[Dict[str, Any]]:
+    text = sys.stdin.read() if path == "-" else Path(path).read_text(encoding="utf-8")
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        return json.loads(stripped)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+async def dispatch(entries: List[Dict[str, Any]], timeout: float) -> Dict[str, Any]:
+    messages = [
+        (
+            e["email"],
+            *render_daily_summary(
+                e.get("client_name", ""), e.get("checklist") or [], e.get("evolution", ""), e.get("lang", "fr"),
+            ),
+        )
+        for e in entries
+    ]
+    t0 = time.perf_counter()
+    batch_id, _ = await asyncio.to_thread(enqueue_many, messages)
+
+    # nouveaux essais (backoff) compris, jusqu'à `timeout`
+    while True:
+        await outbox_sender.send_due()
+        batch = await asyncio.to_thread(get_batch, batch_id)
+        if batch["pending"] == 0 or time.perf_counter() - t0 > timeout:
+            break
+        await asyncio.sleep(1)
+    duration = time.perf_counter() - t0
+    await asyncio.to_thread(smtp_pool.close)
+
+    return {
+        **batch,
+        "connections": smtp_pool.size,
+        "logins": smtp_pool.logins,
+        "duration_s": round(duration, 3),
+        "sent_per_s": round(batch["sent"] / duration, 1) if duration > 0 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Envoie le résumé quotidien à une liste de clients.")
+    parser.add_argument("entries", help="fichier JSON / NDJSON des clients ('-' = stdin)")
+    parser.add_argument("--timeout", type=float, default=300, help="attente max des nouveaux essais (s)")
+    parser.add_argument("--json", action="store_true", help="rapport au format JSON")
+    args = parser.parse_args()
+
+    check_smtp_config()
+    init_db()
+    entries = load_entries(args.entries)
+    if not entries:
+        print("Aucun client dans le fichier.")
+        return
+    report = asyncio.run(dispatch(entries, args.timeout))
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        print(
+            f"✅ {report['sent']}/{report['total']} e-mails envoyés en {report['duration_s']} s "
+            f"({report['sent_per_s']} /s, {report['logins']} connexions SMTP)"
+        )
+    if report["failed"] or report["pending"]:
+        if not args.json:
+            print(f"⚠️  {report['failed']} en échec, {report['pending']} encore en attente (batch {report['batch_id']})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# services/sports_service_fastapi/app/smtp_pool.py
+
+# -------------------------------------------------------
+# Connexions SMTP persistantes + limites de débit par fournisseur
+# - SmtpPool : au plus SMTP_POOL_SIZE connexions authentifiées,
+#   gardées ouvertes entre deux lots (NOOP avant réutilisation,
+#   fermées après SMTP_IDLE_SECONDS sans envoi)
+# - ProviderRateLimits : espace les envois par domaine destinataire
+#   (gmail.com, outlook.com…) selon SMTP_RATE_LIMITS, ex.
+#   "gmail.com:20,outlook.com:10,*:50" (messages / seconde, 0 = illimité)
+# Utilisé depuis les threads d'envoi de l'outbox (appels bloquants).
+# -------------------------------------------------------
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from .email_utils import connect_smtp
+
+SMTP_POOL_SIZE = max(1, int(os.getenv("SMTP_POOL_SIZE", "4")))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+
+
+def _parse_rate_limits(raw: str) -> Dict[str, float]:
+    rates = {}
+    for part in (raw or "").split(","):
+        if ":" not in part:
+            continue
+        domain, rate = part.rsplit(":", 1)
+        try:
+            rates[domain.strip().lower()] = max(0.0, float(rate))
+        except ValueError:
+            continue
+    return rates
+
+
+SMTP_RATE_LIMITS = _parse_rate_limits(os.getenv("SMTP_RATE_LIMITS", ""))
+
+
+class ProviderRateLimits:
+    """Au plus `rate` messages par seconde et par domaine (sans rafale)."""
+
+    def __init__(self, rates: Dict[str, float]):
+        self.rates = rates
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, to_email: str) -> None:
+        domain = to_email.rpartition("@")[2].lower()
+        rate = self.rates.get(domain, self.rates.get("*", 0.0))
+        if rate <= 0:
+            return
+        key = domain if domain in self.rates else "*"
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(key, 0.0))
+            self._next[key] = slot + 1.0 / rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SmtpPool:
+    def __init__(self, size: int = SMTP_POOL_SIZE, idle_seconds: float = SMTP_IDLE_SECONDS):
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self.logins = 0
+
+    def _take(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            if time.monotonic() - last_used > self.idle_seconds:
+                self._discard(server)
+                continue
+            try:
+                # le serveur a pu fermer une connexion inactive
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(server)
+        server = connect_smtp()
+        with self._lock:
+            self.logins += 1
+        return server
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @contextmanager
+    def connection(self):
+        """Connexion authentifiée ; rendue au pool, ou fermée après une erreur."""
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._take()
+            yield server
+        except Exception:
+            if server is not None:
+                self._discard(server)
+                server = None
+            raise
+        finally:
+            if server is not None:
+                with self._lock:
+                    self._idle.append((server, time.monotonic()))
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._discard(server)
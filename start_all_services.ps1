@@ -31,6 +31,12 @@ Write-Host "DÉMARRAGE DES MICROSERVICES FASTAPI" -ForegroundColor Green
 Write-Host "Racine du projet : $RACINE" -ForegroundColor DarkGray
 Write-Host "==========================================="
 
+# Modules partagés (metrics, logs, tracing, http_cache) : copies identiques ?
+& "$PYTHON" (Join-Path $RACINE "services\check_shared_modules.py") | Out-Null
+if ($LASTEXITCODE -ne 0) {
+  Write-Host "Attention : modules partagés divergents (python services\check_shared_modules.py)" -ForegroundColor Yellow
+}
+
 foreach ($svc in $SERVICES) {
   $CheminService = Join-Path $RACINE ("services\" + $svc.Dossier)
 